@@ -0,0 +1,329 @@
+import os
+import gzip
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from catalog import REPO_DIR
+from pricing import get_default_segment
+from pricing_rules import RULES, RULE_CONSTANTS
+
+# ----------------------------------------
+# Pricing Audit Log
+# An append-only record of every exported quote. Each record holds:
+# - the quote as exported (line items and totals, in its currency)
+# - the catalog rows it was priced from: seat prices, M365 rows with their
+#   ProductId/SkuId, Meraki SKUs and resale prices
+# - the rule rows that decided each total, e.g. the discount scope and the
+#   onboarding minimum
+# Callers only enqueue what they already hold (AuditLog.record): the quote
+# and what it was priced from, as pricing.trace_quote returns it. A
+# background thread turns those into records, without pricing anything again,
+# and batches them into gzip JSON-lines segments. It flushes each batch and rotates to a new segment by size or
+# age. A segment is written as .part and renamed once it is closed; close()
+# (also run at exit) writes whatever is still queued first. A .part left by
+# a process that died can be read up to its last flushed batch.
+#   result, pricing = trace_quote(spec, index)
+#   AUDIT_LOG.record("csv", "Acme", spec, convert_quote(result, ...), pricing, price_book="Ariento")
+#   for record in read_audit_log(): ...
+#   python audit_log.py --tail 5
+# The directory comes from QUOTE_AUDIT_DIR.
+# ----------------------------------------
+AUDIT_DIR = os.environ.get("QUOTE_AUDIT_DIR", os.path.join(REPO_DIR, ".audit_log"))
+# A batch is written when it has this many records or its first record is this old
+AUDIT_BATCH_RECORDS = 256
+AUDIT_FLUSH_SECONDS = 1.0
+# A segment is closed at this much JSON (before compression) or this age
+AUDIT_SEGMENT_BYTES = 16 * 2**20
+AUDIT_SEGMENT_SECONDS = 3600
+# Records waiting for the writer; beyond this record() waits for it
+AUDIT_QUEUE_LIMIT = 10000
+SEGMENT_SUFFIX = ".jsonl.gz"
+OPEN_SUFFIX = ".part"
+logger = logging.getLogger("audit_log")
+
+_STOP = object()
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+# ----------------------------------------
+# Traces
+# ----------------------------------------
+def catalog_rows(spec, resolved):
+    # The catalog row behind every priced line of resolve_quote(spec, index)
+    values = resolved["values"]
+    plan = resolved["ariento_plan"]
+    segment = get_default_segment(plan) if plan else None
+    rows = {"seats": [], "m365": [], "meraki": [], "resale": []}
+    for line in resolved["lines"]:
+        kind = line["kind"]
+        sel = spec[kind][line["source"]]
+        if kind == "seats":
+            rows["seats"].append({"plan": plan, "seat_type": line["item"], "price": line["price"], "tiered": line["tiered"]})
+        elif kind == "m365":
+            row = line["row"]
+            rows["m365"].append({
+                "segment": segment, "term": values["m365_term"], "billing": values["m365_billing"],
+                "sku_title": sel["sku_title"], "product_id": row["ProductID"], "sku_id": row["SkuId"], "price": row["Price"],
+            })
+        elif kind == "meraki":
+            row = line["row"]
+            rows["meraki"].append({"description": sel["description"], "sku": row["SKU"], "price": row["Price"]})
+        else:
+            rows["resale"].append({"vendor": sel["vendor"], "item": sel["item"], "price": line["price"]})
+    return rows
+
+
+def rule_trace(values):
+    # Every rule target's value (in USD) and the rule row that decided it
+    return [
+        {"row": row, "stage": stage, "target": target, "when": when, "rule": value, "value": values[target]}
+        for row, stage, target, when, value in RULES.explain(values)
+    ]
+
+
+def pricing_trace(capture):
+    # The audit record for one record() call
+    event, quote_name, spec, result, pricing, context, rules_version, recorded_at, record_id = capture
+    trace = {
+        "id": record_id,
+        "recorded_at": datetime.fromtimestamp(recorded_at, timezone.utc).isoformat(),
+        "event": event,
+        "quote": quote_name,
+        "context": context,
+        "rules_version": rules_version,
+        "constants": RULE_CONSTANTS,
+        "spec": spec,
+        "line_items": result["line_items"],
+        "totals": result["totals"],
+    }
+    try:
+        trace["catalog_rows"] = catalog_rows(spec, pricing["resolved"])
+        trace["rules"] = rule_trace(pricing["values"])
+    except Exception as e:
+        # The export happened either way; keep what was exported
+        trace["trace_error"] = f"{type(e).__name__}: {e}"
+    return trace
+
+
+# ----------------------------------------
+# Writer
+# ----------------------------------------
+class AuditLog:
+    def __init__(self, path=AUDIT_DIR, batch_records=AUDIT_BATCH_RECORDS, flush_seconds=AUDIT_FLUSH_SECONDS,
+                 segment_bytes=AUDIT_SEGMENT_BYTES, segment_seconds=AUDIT_SEGMENT_SECONDS,
+                 queue_limit=AUDIT_QUEUE_LIMIT):
+        self.path = path
+        self.batch_records = batch_records
+        self.flush_seconds = flush_seconds
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self._queue = queue.Queue(maxsize=queue_limit)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._segment = None
+        self.enqueued = 0
+        # record() calls that found the queue full and waited for the writer
+        self.waits = 0
+        self.written = 0
+        self.batches = 0
+        self.segments = 0
+        self.json_bytes = 0
+        self.errors = 0
+
+    def _start(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The audit log is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def record(self, event, quote_name, spec, result, pricing, **context):
+        # Queue one exported quote: `result` as exported (a price_quote result,
+        # possibly converted) priced from `spec`, and `pricing`, what
+        # trace_quote(spec, index) returned with it. The record is built from
+        # these on the writer thread, so they must not be changed afterwards.
+        # `context` (price book, catalog version, ...) is stored as is.
+        if self._thread is None or self._closed:
+            self._start()
+        capture = (event, quote_name, spec, result, pricing, context, RULES.version, time.time(), uuid.uuid4().hex)
+        try:
+            self._queue.put_nowait(capture)
+        except queue.Full:
+            with self._lock:
+                self.waits += 1
+            self._queue.put(capture)
+        with self._lock:
+            self.enqueued += 1
+
+    def flush(self, timeout=None):
+        # Wait until every record queued so far is written; False on timeout
+        if self._thread is None:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self):
+        # Write what is queued and close the open segment
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch, markers = [], []
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stopping or markers or len(batch) >= self.batch_records:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.done.set()
+        self._close_segment()
+
+    def _write(self, batch):
+        lines = []
+        for capture in batch:
+            try:
+                lines.append(json.dumps(pricing_trace(capture), default=_json_default, separators=(",", ":")))
+            except Exception:
+                logger.exception("Could not encode an audit record")
+                self.errors += 1
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        try:
+            segment = self._open_segment(len(data))
+            segment["file"].write(data)
+            # A sync flush: every batch so far can be read back even if the process dies
+            segment["file"].flush()
+        except OSError:
+            logger.exception("Could not write %d audit records", len(lines))
+            self.errors += len(lines)
+            return
+        segment["bytes"] += len(data)
+        self.written += len(lines)
+        self.batches += 1
+        self.json_bytes += len(data)
+
+    def _open_segment(self, incoming):
+        segment = self._segment
+        if segment is not None and (
+            segment["bytes"] + incoming > self.segment_bytes or time.monotonic() - segment["opened"] > self.segment_seconds
+        ):
+            self._close_segment()
+            segment = None
+        if segment is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.segments += 1
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            name = f"audit-{stamp}-{os.getpid()}-{self.segments:05d}{SEGMENT_SUFFIX}"
+            path = os.path.join(self.path, name + OPEN_SUFFIX)
+            segment = {"path": path, "file": gzip.open(path, "ab"), "bytes": 0, "opened": time.monotonic()}
+            self._segment = segment
+        return segment
+
+    def _close_segment(self):
+        segment, self._segment = self._segment, None
+        if segment is not None:
+            segment["file"].close()
+            os.replace(segment["path"], segment["path"][:-len(OPEN_SUFFIX)])
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(), "enqueued": self.enqueued, "waits": self.waits, "written": self.written,
+            "batches": self.batches, "segments": self.segments, "json_bytes": self.json_bytes, "errors": self.errors,
+        }
+
+
+AUDIT_LOG = AuditLog()
+
+
+# ----------------------------------------
+# Reading
+# ----------------------------------------
+def audit_segments(path=AUDIT_DIR):
+    # Closed and open segment paths, oldest first
+    if not os.path.isdir(path):
+        return []
+    names = [name for name in os.listdir(path) if name.endswith((SEGMENT_SUFFIX, SEGMENT_SUFFIX + OPEN_SUFFIX))]
+    return [os.path.join(path, name) for name in sorted(names)]
+
+
+def read_audit_log(path=AUDIT_DIR, quote=None):
+    # Every record (optionally only one quote's), segment by segment; an open
+    # segment is read up to its last flushed batch
+    for segment in audit_segments(path):
+        with gzip.open(segment, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    record = json.loads(line)
+                    if quote is None or record["quote"] == quote:
+                        yield record
+            except EOFError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read the pricing audit log")
+    parser.add_argument("--path", default=AUDIT_DIR, help="Audit log directory")
+    parser.add_argument("--quote", help="Only this quote's records")
+    parser.add_argument("--tail", type=int, default=10, help="Records to show (the most recent)")
+    parser.add_argument("--full", action="store_true", help="Print the whole records as JSON")
+    args = parser.parse_args()
+
+    segments = audit_segments(args.path)
+    records = list(read_audit_log(args.path, args.quote))
+    print(f"{len(records)} records in {len(segments)} segments under {args.path}")
+    for record in records[-args.tail:] if args.tail else []:
+        if args.full:
+            print(json.dumps(record, indent=2))
+            continue
+        totals = record["totals"]
+        rows = record.get("catalog_rows", {})
+        print(f"{record['recorded_at']}  {record['event']:<6}{record['quote']:<28}"
+              f"{totals.get('currency', 'USD')} {totals['quote_total']:>12,.2f}  "
+              f"rows: {', '.join(f'{len(v)} {k}' for k, v in rows.items() if v) or record.get('trace_error', '-')}")
+
+
+if __name__ == "__main__":
+    main()
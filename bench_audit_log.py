@@ -0,0 +1,98 @@
+import io
+import os
+import gzip
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from catalog import ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, load_catalog
+from golden_quotes import generate_specs
+from pricing import build_price_index, price_quote, trace_quote
+from pricing_rules import RULES
+from audit_log import AuditLog, _json_default, audit_segments, pricing_trace, read_audit_log
+
+# ----------------------------------------
+# Benchmark for audit_log.py
+# Times what the interactive path pays per exported quote, AuditLog.record
+# (an enqueue), against tracing and writing the same record synchronously,
+# then waits for the background writer and checks every record was written.
+# Exits 1 when the p99 enqueue time is over --max-enqueue-us.
+#   python bench_audit_log.py --quotes 20000
+# ----------------------------------------
+
+
+def _percentiles(samples_ns):
+    p50, p99 = np.percentile(np.asarray(samples_ns) / 1000.0, [50, 99])
+    return p50, p99, max(samples_ns) / 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pricing audit log's enqueue cost and writer throughput")
+    parser.add_argument("--quotes", type=int, default=10_000, help="Quotes to record")
+    parser.add_argument("--sync-quotes", type=int, default=500, help="Quotes traced and written synchronously for comparison")
+    parser.add_argument("--max-enqueue-us", type=float, default=50.0, help="Fail when the p99 enqueue time is over this")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index = build_price_index(load_catalog(ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH))
+    specs = generate_specs(index, per_combination=1, seed=args.seed)
+    priced = [(spec, *trace_quote(spec, index)) for spec in specs]
+    start = time.perf_counter()
+    for spec, _, _ in priced:
+        price_quote(spec, index)
+    price_us = (time.perf_counter() - start) / len(priced) * 1e6
+
+    # Synchronous: what the caller would pay without the background writer
+    sync_ns = []
+    out = gzip.GzipFile(fileobj=io.BytesIO(), mode="wb")
+    for i in range(args.sync_quotes):
+        spec, result, pricing = priced[i % len(priced)]
+        start = time.perf_counter_ns()
+        capture = ("csv", f"Quote {i}", spec, result, pricing, {}, RULES.version, time.time(), f"{i:032x}")
+        out.write(json.dumps(pricing_trace(capture), default=_json_default, separators=(",", ":")).encode() + b"\n")
+        out.flush()
+        sync_ns.append(time.perf_counter_ns() - start)
+
+    path = tempfile.mkdtemp(prefix="audit_log_")
+    try:
+        log = AuditLog(path)
+        enqueue_ns = []
+        start_all = time.perf_counter()
+        for i in range(args.quotes):
+            spec, result, pricing = priced[i % len(priced)]
+            start = time.perf_counter_ns()
+            log.record("csv", f"Quote {i}", spec, result, pricing, price_book="bench")
+            enqueue_ns.append(time.perf_counter_ns() - start)
+        enqueue_done = time.perf_counter() - start_all
+        log.close()
+        written = time.perf_counter() - start_all
+        stats = log.stats()
+        stored = sum(1 for _ in read_audit_log(path))
+        compressed = sum(os.path.getsize(segment) for segment in audit_segments(path))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    p50, p99, worst = _percentiles(enqueue_ns)
+    s50, s99, sworst = _percentiles(sync_ns)
+    print(f"price_quote: {price_us:.1f} us per quote")
+    print(f"{'per exported quote':<24}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    print(f"{'enqueue (record)':<24}{p50:>10.1f}{p99:>10.1f}{worst:>10.1f}")
+    print(f"{'synchronous trace+write':<24}{s50:>10.1f}{s99:>10.1f}{sworst:>10.1f}")
+    print(f"Enqueued {args.quotes:,} records in {enqueue_done:.2f}s; all written after {written:.2f}s "
+          f"({args.quotes / written:,.0f} records/s) in {stats['batches']} batches, {stats['segments']} segments; "
+          f"{stats['waits']} records waited for a full queue")
+    print(f"JSON {stats['json_bytes'] / 2**20:.1f} MB -> {compressed / 2**20:.2f} MB compressed "
+          f"({stats['json_bytes'] / max(compressed, 1):.1f}x)")
+    if stored != args.quotes or stats["errors"]:
+        raise SystemExit(f"FAILED: {stored} of {args.quotes} records read back, {stats['errors']} errors")
+    if p99 > args.max_enqueue_us:
+        raise SystemExit(f"FAILED: p99 enqueue {p99:.1f} us is over {args.max_enqueue_us:.1f} us")
+    print("PASSED")
+
+
+if __name__ == "__main__":
+    main()
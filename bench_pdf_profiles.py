@@ -0,0 +1,63 @@
+import argparse
+import time
+
+import numpy as np
+
+from catalog import ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, LOGO_PATH, load_catalog, load_logo
+from pricing import build_price_index, format_summary, price_quote
+from quote_pdf import PDF_PROFILES, generate_pdf
+from bench_quote_bundle import random_specs
+
+# ----------------------------------------
+# Benchmark for PDF output profiles
+# Renders the benchmark quote set (the random quotes of bench_quote_bundle.py)
+# once per profile in quote_pdf.PDF_PROFILES and reports output bytes and
+# render time against "standard", the PDF as the app has always rendered it.
+#   python bench_pdf_profiles.py --quotes 50 --out-prefix sample
+# ----------------------------------------
+
+
+def render_all(quotes, logo_bytes, profile):
+    sizes, times, first = [], [], None
+    for name, result in quotes:
+        start = time.perf_counter()
+        pdf = generate_pdf(format_summary(result["line_items"]), name, result["totals"], logo_bytes, profile)
+        times.append(time.perf_counter() - start)
+        sizes.append(len(pdf))
+        first = first or pdf
+    return np.asarray(sizes), np.asarray(times) * 1000.0, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quote PDF size and render time per output profile")
+    parser.add_argument("--quotes", type=int, default=50, help="Random quotes to render")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-prefix", help="Also write the first quote as <prefix>-<profile>.pdf")
+    args = parser.parse_args()
+
+    index = build_price_index(load_catalog(ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH))
+    logo_bytes = load_logo(LOGO_PATH)
+    quotes = [(spec["name"], price_quote(spec, index)) for spec in random_specs(index, args.quotes, args.seed)]
+    # One warm-up render per profile, so one-time work is not in the timings
+    for profile in PDF_PROFILES:
+        render_all(quotes[:1], logo_bytes, profile)
+
+    print(f"Quotes: {len(quotes)}")
+    print(f"{'profile':<10}{'total bytes':>14}{'bytes/quote':>13}{'p50 ms':>9}{'p95 ms':>9}{'total s':>9}")
+    baseline = None
+    for profile in PDF_PROFILES:
+        sizes, times, first = render_all(quotes, logo_bytes, profile)
+        p50, p95 = np.percentile(times, [50, 95])
+        print(f"{profile:<10}{sizes.sum():>14,}{sizes.mean():>13,.0f}{p50:>9.1f}{p95:>9.1f}{times.sum() / 1000:>9.2f}")
+        if baseline is None:
+            baseline = sizes.sum(), times.sum()
+        else:
+            print(f"  {profile} is {100.0 * sizes.sum() / baseline[0]:.1f}% of the standard size "
+                  f"and renders in {100.0 * times.sum() / baseline[1]:.1f}% of the time")
+        if args.out_prefix:
+            with open(f"{args.out_prefix}-{profile}.pdf", "wb") as f:
+                f.write(first)
+
+
+if __name__ == "__main__":
+    main()
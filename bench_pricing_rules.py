@@ -0,0 +1,171 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from pricing import BUSINESS_MODELS, DISCOUNT_OPTIONS, DISCOUNT_SCOPES, ONBOARDING_TYPES
+from pricing_rules import ONBOARDING_MINIMUM, PRICING_RULES, RULE_INPUTS, RULES
+
+# ----------------------------------------
+# Benchmark for pricing_rules.py
+# Times the quote-level rules (billing, onboarding, discount, totals) three
+# ways on the same random inputs and checks they agree:
+#   inline    the hand-written if/else flow the app and price_quote used before
+#   compiled  RULES.evaluate_quote, one quote at a time
+#   columns   RULES.evaluate_columns, every quote at once
+#   python bench_pricing_rules.py --quotes 200000
+# ----------------------------------------
+CHECK_FIELDS = [
+    "ariento_billing", "m365_term", "m365_billing", "microsoft_label", "raw_ariento_cost", "show_onboarding",
+    "onboarding_price", "discount_scope", "total_discount", "new_ariento_cost", "quote_total",
+]
+
+
+def inline_rules(values):
+    # The previous inline flow, kept only as the baseline for this benchmark
+    business_model = values["business_model"]
+    gcc_high = values["gcc_high"]
+    if business_model == "Enclave One" and gcc_high:
+        ariento_billing = "Annual"
+    else:
+        ariento_billing = values["selected_ariento_billing"]
+    annualize = ariento_billing == "Annual" and not gcc_high
+    ariento_base_cost = values["ariento_base_cost"]
+    raw_ariento_cost = 12 * ariento_base_cost if annualize else ariento_base_cost
+    if gcc_high:
+        m365_term = m365_billing = "Annual"
+    else:
+        m365_term = values["selected_m365_term"]
+        m365_billing = values["selected_m365_billing"]
+    service_cost = values["raw_meraki_cost"] + values["raw_resale_cost"]
+
+    onboarding_type = values["onboarding_type"]
+    if business_model == "Resale" or onboarding_type == "None":
+        onboarding_price = 0.0
+        show_onboarding = False
+    elif onboarding_type == "Other":
+        onboarding_price = values["other_onboarding_price"]
+        show_onboarding = True
+    else:
+        base = ariento_base_cost if ariento_billing == "Annual" else ariento_base_cost * 2
+        onboarding_price = max(base, ONBOARDING_MINIMUM)
+        show_onboarding = True
+
+    discount_option = values["discount_option"]
+    if discount_option == "10% Discount":
+        discount_percentage = 0.10
+    elif discount_option == "Percentage Discount":
+        discount_percentage = values["requested_discount_percentage"] / 100.0
+    else:
+        discount_percentage = 0.0
+    if discount_option != "No Discount" and show_onboarding:
+        discount_scope = values["selected_discount_scope"]
+    else:
+        discount_scope = DISCOUNT_SCOPES[0]
+    if discount_option != "No Discount":
+        discount_base = raw_ariento_cost
+        if discount_scope == "Ariento Licenses + Onboarding" and show_onboarding:
+            discount_base += onboarding_price
+        total_discount = discount_percentage * discount_base
+        new_ariento_cost = raw_ariento_cost - discount_percentage * raw_ariento_cost
+    else:
+        total_discount = 0.0
+        new_ariento_cost = raw_ariento_cost
+
+    if business_model != "Resale" and (gcc_high or m365_billing == "Annual"):
+        microsoft_label = "Microsoft Licenses Costs (Annual Recurring)"
+    else:
+        microsoft_label = "Microsoft Licenses Costs (Monthly Recurring)"
+    quote_total = raw_ariento_cost + values["microsoft_cost"] + service_cost + onboarding_price
+    if discount_option != "No Discount" and total_discount > 0:
+        quote_total -= total_discount
+
+    return {
+        "ariento_billing": ariento_billing, "m365_term": m365_term, "m365_billing": m365_billing,
+        "microsoft_label": microsoft_label, "raw_ariento_cost": raw_ariento_cost, "show_onboarding": show_onboarding,
+        "onboarding_price": onboarding_price, "discount_scope": discount_scope, "total_discount": total_discount,
+        "new_ariento_cost": new_ariento_cost, "quote_total": quote_total,
+    }
+
+
+def random_inputs(count, seed):
+    rnd = random.Random(seed)
+    quotes = []
+    for _ in range(count):
+        business_model = rnd.choice(BUSINESS_MODELS)
+        quotes.append({
+            "business_model": business_model,
+            "gcc_high": business_model != "Resale" and rnd.random() < 0.3,
+            "selected_ariento_billing": rnd.choice(["Monthly", "Annual"]),
+            "selected_m365_term": rnd.choice(["Annual", "Monthly"]),
+            "selected_m365_billing": rnd.choice(["Annual", "Monthly"]),
+            "ariento_base_cost": 0.0 if business_model == "Resale" else round(rnd.uniform(0, 20000), 2),
+            "microsoft_cost": round(rnd.uniform(0, 5000), 2),
+            "raw_meraki_cost": round(rnd.uniform(0, 2000), 2),
+            "raw_resale_cost": round(rnd.uniform(0, 2000), 2) if business_model == "Resale" else 0.0,
+            "onboarding_type": rnd.choice(ONBOARDING_TYPES),
+            "other_onboarding_price": round(rnd.uniform(0, 10000), 2),
+            "discount_option": rnd.choice(DISCOUNT_OPTIONS),
+            "requested_discount_percentage": round(rnd.uniform(0, 50), 1),
+            "selected_discount_scope": rnd.choice(DISCOUNT_SCOPES),
+        })
+    return quotes
+
+
+def as_columns(quotes):
+    names = RULE_INPUTS["terms"] + RULE_INPUTS["totals"]
+    return {name: np.array([q[name] for q in quotes], dtype=object if isinstance(quotes[0][name], str) else None) for name in names}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled pricing rules against the inline flow")
+    parser.add_argument("--quotes", type=int, default=100000, help="Random quotes to evaluate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    quotes = random_inputs(args.quotes, args.seed)
+    columns = as_columns(quotes)
+    n = len(quotes)
+    targets = len({target for _, target, _, _ in PRICING_RULES})
+
+    inline, inline_time = _timed(lambda: [inline_rules(q) for q in quotes])
+    compiled, compiled_time = _timed(lambda: [RULES.evaluate_quote(q) for q in quotes])
+
+    def run_columns():
+        values = dict(columns)
+        values.update(RULES.evaluate_columns("terms", values, n))
+        values.update(RULES.evaluate_columns("totals", values, n))
+        return values
+    vector, vector_time = _timed(run_columns)
+
+    mismatches = 0
+    for i, expected in enumerate(inline):
+        for field in CHECK_FIELDS:
+            a, b, c = expected[field], compiled[i][field], vector[field][i]
+            if isinstance(a, float):
+                same = np.isclose(a, b) and np.isclose(a, c)
+            else:
+                same = a == b == c
+            if not same:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"quote {i} {field}: inline={a!r} compiled={b!r} columns={c!r}")
+                break
+
+    print(f"Quotes: {n} | rule targets per quote: {targets} | mismatches: {mismatches}")
+    print(f"{'flow':<10}{'seconds':>10}{'quotes/s':>14}{'rule evals/s':>16}")
+    for name, elapsed in (("inline", inline_time), ("compiled", compiled_time), ("columns", vector_time)):
+        print(f"{name:<10}{elapsed:>10.3f}{n / elapsed:>14,.0f}{n * targets / elapsed:>16,.0f}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
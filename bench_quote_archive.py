@@ -0,0 +1,93 @@
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from catalog import ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, load_catalog
+from golden_quotes import generate_specs
+from pricing import build_price_index, price_quote
+from quote_archive import QuoteArchive
+
+# ----------------------------------------
+# Benchmark for quote_archive.py
+# Archives priced quotes spread over a year in batches (as repeated appends
+# would), then times the canned reports before and after compaction.
+# Quotes are priced once and archived repeatedly under new names and times,
+# so a large archive does not wait on pricing.
+#   python bench_quote_archive.py --line-items 500000 --batch 500
+# ----------------------------------------
+REPORT_RUNS = 5
+
+
+def _timed_best(fn, runs=REPORT_RUNS):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def time_reports(archive, start, end):
+    reports = {
+        "top-m365 GCC-High quarter": lambda: archive.top_m365_skus("GCC-High NON GOV", start, end),
+        "meraki pipeline by month": lambda: archive.pipeline_by_month("Cisco Meraki"),
+        "category totals": lambda: archive.category_totals(),
+    }
+    return {name: _timed_best(fn) for name, fn in reports.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark appends and reports on the Parquet quote archive")
+    parser.add_argument("--line-items", type=int, default=300_000, help="Line items to archive")
+    parser.add_argument("--batch", type=int, default=1000, help="Quotes per append")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--archive", help="Archive directory (default: a temporary one, removed afterwards)")
+    args = parser.parse_args()
+
+    index = build_price_index(load_catalog(ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH))
+    priced = [price_quote(spec, index) for spec in generate_specs(index, per_combination=1, seed=args.seed)]
+    rnd = random.Random(args.seed)
+    year_start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    path = args.archive or tempfile.mkdtemp(prefix="quote_archive_")
+    archive = QuoteArchive(path)
+
+    try:
+        written = quotes = appends = 0
+        append_time = 0.0
+        while written < args.line_items:
+            batch = []
+            for _ in range(args.batch):
+                result = priced[rnd.randrange(len(priced))]
+                batch.append((f"Quote {quotes}", result, year_start + timedelta(seconds=rnd.randrange(365 * 86400))))
+                quotes += 1
+            start = time.perf_counter()
+            written += archive.append(batch)
+            append_time += time.perf_counter() - start
+            appends += 1
+        stats = archive.stats()
+        print(f"Archived {written:,} line items from {quotes:,} quotes in {appends} appends: "
+              f"{append_time:.2f}s ({written / append_time:,.0f} line items/s), {stats['files']} files")
+
+        quarter = (datetime(2026, 7, 1, tzinfo=timezone.utc), datetime(2026, 10, 1, tzinfo=timezone.utc))
+        before = time_reports(archive, *quarter)
+        start = time.perf_counter()
+        archive.compact()
+        print(f"Compacted to {archive.stats()['files']} files in {time.perf_counter() - start:.2f}s")
+        after = time_reports(archive, *quarter)
+
+        print(f"{'report':<28}{'rows':>6}{'ms':>10}{'compacted ms':>14}")
+        for name, (report, seconds) in after.items():
+            print(f"{name:<28}{len(report):>6}{before[name][1] * 1000:>10.1f}{seconds * 1000:>14.1f}")
+        print()
+        print(after["top-m365 GCC-High quarter"][0].head(5).to_string(index=False))
+    finally:
+        if not args.archive:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import random
+import time
+
+from catalog import ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, LOGO_PATH, load_catalog, load_logo
+from pricing import PLAN_OPTIONS, DISCOUNT_OPTIONS, build_price_index, format_summary, get_default_segment, price_quote
+from quote_pdf import generate_pdf, generate_bundle_pdf
+
+# ----------------------------------------
+# Benchmark for quote bundle PDFs
+# Renders the same random priced quotes two ways and compares output size
+# and render time:
+#   separate  one generate_pdf() per quote, sizes summed as if concatenated
+#   bundle    generate_bundle_pdf(), one document with a table of contents
+#             and a grand-total page
+#   python bench_quote_bundle.py --quotes 20 --out bundle.pdf
+# ----------------------------------------
+
+
+def random_specs(index, count, seed):
+    rnd = random.Random(seed)
+    meraki = list(index["meraki"])
+    specs = []
+    for i in range(count):
+        business_model = rnd.choice(["Enclave One", "Custom Enclave", "MSSP"])
+        plan = rnd.choice(PLAN_OPTIONS[business_model])
+        segment = get_default_segment(plan)
+        titles = index["m365_options"].get((segment, "Annual", "Annual"), [])
+        seats = index["seat_options"].get(plan, [])
+        specs.append({
+            "name": f"Location {i + 1}",
+            "business_model": business_model,
+            "plan": plan,
+            "ariento_billing": rnd.choice(["Monthly", "Annual"]),
+            "seats": [{"seat_type": seat, "quantity": rnd.randint(1, 50)} for seat in rnd.sample(seats, min(len(seats), 3))],
+            "m365_term": "Annual",
+            "m365_billing": "Annual",
+            "m365": [{"sku_title": title, "quantity": rnd.randint(1, 50)} for title in rnd.sample(titles, min(len(titles), 4))],
+            "meraki": [{"description": desc, "quantity": rnd.randint(1, 4)} for desc in rnd.sample(meraki, min(len(meraki), 2))],
+            "discount_option": rnd.choice(DISCOUNT_OPTIONS),
+        })
+    return specs
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a quote bundle PDF with one PDF per quote")
+    parser.add_argument("--quotes", type=int, default=20, help="Random quotes to render")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Also write the bundle PDF to this file")
+    args = parser.parse_args()
+
+    index = build_price_index(load_catalog(ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH))
+    logo_bytes = load_logo(LOGO_PATH)
+    quotes = [(spec["name"], price_quote(spec, index)) for spec in random_specs(index, args.quotes, args.seed)]
+
+    separate, separate_time = _timed(lambda: [
+        generate_pdf(format_summary(result["line_items"]), name, result["totals"], logo_bytes) for name, result in quotes
+    ])
+    bundle, bundle_time = _timed(lambda: generate_bundle_pdf(quotes, "Benchmark Co", logo_bytes))
+    separate_bytes = sum(len(pdf) for pdf in separate)
+
+    print(f"Quotes: {len(quotes)}")
+    print(f"{'output':<10}{'bytes':>12}{'seconds':>10}{'bytes/quote':>14}")
+    for name, size, elapsed in (("separate", separate_bytes, separate_time), ("bundle", len(bundle), bundle_time)):
+        print(f"{name:<10}{size:>12,}{elapsed:>10.3f}{size / len(quotes):>14,.0f}")
+    print(f"Bundle is {100.0 * len(bundle) / separate_bytes:.1f}% of the separate size "
+          f"and renders in {100.0 * bundle_time / separate_time:.1f}% of the time")
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(bundle)
+        print(f"Bundle written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import os
+import re
+import time
+import pickle
+import hashlib
+import logging
+import zipfile
+import requests
+import pandas as pd
+from io import BytesIO
+from xml.etree import ElementTree
+
+from tiers import TIER_SHEET, TIER_MODES, TIER_COLUMNS
+
+# ----------------------------------------
+# Catalog Sources
+# ----------------------------------------
+BASE_URL = "https://raw.githubusercontent.com/Robi-Show/Quote-Tool/main/"
+ARIENTO_PRICING_URL = BASE_URL + "Ariento%20Pricing%202025.xlsx"
+SERVICE_CATALOGUE_URL = BASE_URL + "Service+Catalogue.xlsx"
+LOGO_URL = BASE_URL + "Ariento%20Logo%20Blue.png"
+
+# Local copies shipped alongside the app, used by the service and scripts
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+ARIENTO_PRICING_PATH = os.path.join(REPO_DIR, "Ariento Pricing 2025.xlsx")
+SERVICE_CATALOGUE_PATH = os.path.join(REPO_DIR, "Service+Catalogue.xlsx")
+LOGO_PATH = os.path.join(REPO_DIR, "Ariento Logo Blue.png")
+# With QUOTE_TOOL_OFFLINE set, these URLs are read from the local copies
+# instead (e.g. by loadtest_app.py, or to run the app without network access)
+LOCAL_COPIES = {ARIENTO_PRICING_URL: ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_URL: SERVICE_CATALOGUE_PATH, LOGO_URL: LOGO_PATH}
+
+EXCLUDED_PRICES = ["Quote Only", "Custom", "Ad Hoc as needed"]
+EXCLUDED_SEGMENTS = ["Education", "Charity", "GCC-High GOV ONLY"]
+# Seconds to wait for a workbook URL to connect or send data
+SOURCE_TIMEOUT_SECONDS = 30
+
+
+logger = logging.getLogger("catalog")
+
+
+class CatalogError(Exception):
+    pass
+
+
+def read_source(source, label):
+    # A source is either a URL (fetched over HTTP) or a local file path
+    if os.environ.get("QUOTE_TOOL_OFFLINE"):
+        source = LOCAL_COPIES.get(source, source)
+    if source.startswith("http://") or source.startswith("https://"):
+        try:
+            response = requests.get(source, timeout=SOURCE_TIMEOUT_SECONDS)
+        except requests.RequestException as e:
+            raise CatalogError(f"Failed to fetch the {label} file: {e}")
+        if response.status_code != 200:
+            raise CatalogError(f"Failed to fetch the {label} file. Please check the file URL.")
+        return response.content
+    try:
+        with open(source, "rb") as f:
+            return f.read()
+    except OSError:
+        raise CatalogError(f"Failed to read the {label} file: {source}")
+
+
+# ----------------------------------------
+# Sheet Cleaning
+# ----------------------------------------
+def clean_columns(df):
+    df.columns = df.columns.str.strip()
+    for col in ["Notes", "Minimum Specs"]:
+        if col in df.columns:
+            df = df.drop(columns=[col])
+    return df
+
+
+ARIENTO_SHEETS = {
+    "ariento_plans": "Ariento Plans",
+    "license_types": "Ariento License Type",
+    # Volume tiers are optional (see tiers.py)
+    "seat_tiers": TIER_SHEET,
+}
+RESALE_SHEET = "Third Party Resale "
+SERVICE_TABLES = ["cisco_meraki", "m365", "resale_sheet"]
+
+
+def clean_sheet(table, df):
+    # Per-table cleaning between the raw sheet and validation; df is None for
+    # an optional sheet the workbook does not have
+    if table == "seat_tiers":
+        return pd.DataFrame(columns=TIER_COLUMNS) if df is None else clean_columns(df)
+    if table == "resale_sheet":
+        if df is None or df.empty:
+            return pd.DataFrame(columns=CATALOG_SCHEMA["resale_sheet"]["required"])
+        return clean_columns(df).rename(columns={"SKU": "Item"})
+    if table in ("cisco_meraki", "m365"):
+        df = clean_columns(df)
+        if table == "m365" and "Segment" in df.columns:
+            df = df[~df["Segment"].isin(EXCLUDED_SEGMENTS)]
+    return df
+
+
+def load_ariento_pricing(content):
+    try:
+        ariento_file = pd.ExcelFile(BytesIO(content))
+        ariento_plans = pd.read_excel(ariento_file, sheet_name=ARIENTO_SHEETS["ariento_plans"])
+        license_types = pd.read_excel(ariento_file, sheet_name=ARIENTO_SHEETS["license_types"])
+        seat_tiers = None
+        if TIER_SHEET in ariento_file.sheet_names:
+            seat_tiers = pd.read_excel(ariento_file, sheet_name=TIER_SHEET)
+    except (KeyError, ValueError) as e:
+        raise CatalogError(f"Missing sheet or column in Ariento Pricing file: {e}")
+    return ariento_plans, license_types, clean_sheet("seat_tiers", seat_tiers)
+
+
+def read_workbook(content, label):
+    try:
+        return pd.read_excel(BytesIO(content), sheet_name=None)
+    except Exception as e:
+        raise CatalogError(f"Error loading {label} file: {e}")
+
+
+def load_service_catalogue(content):
+    return build_service_catalogue(read_workbook(content, "Service Catalogue Excel"))
+
+
+def find_service_sheets(sheet_names):
+    # Service Catalogue sheet names vary in case and spacing
+    found = {}
+    for sheet_name in sheet_names:
+        lower_name = sheet_name.lower().replace(" ", "")
+        if "ciscomeraki" in lower_name:
+            found["cisco_meraki"] = sheet_name
+        if "m365" in lower_name:
+            found["m365"] = sheet_name
+    if "cisco_meraki" not in found or "m365" not in found:
+        raise CatalogError("Required sheets (Cisco Meraki, M365) not found. Available: " + ", ".join(sheet_names))
+    if RESALE_SHEET in sheet_names:
+        found["resale_sheet"] = RESALE_SHEET
+    return found
+
+
+def build_service_catalogue(all_sheets):
+    found = find_service_sheets(list(all_sheets.keys()))
+    try:
+        return tuple(clean_sheet(table, all_sheets.get(found.get(table))) for table in SERVICE_TABLES)
+    except Exception as e:
+        raise CatalogError(f"Error loading Service Catalogue Excel file: {e}")
+
+
+# ----------------------------------------
+# Catalog Validation
+# Runs once per load. Every table must carry its required columns; rows with
+# a missing key, a missing or non-numeric Price, or a repeated key are moved
+# to the validation report. Prices come out as floats and the M365 segment,
+# term and billing values are normalized, so lookups can trust the result.
+# ----------------------------------------
+CATALOG_SCHEMA = {
+    "license_types": {
+        "required": ["Plan", "Seat Type", "Price"],
+        "key": ["Plan", "Seat Type"],
+    },
+    "seat_tiers": {
+        "required": ["Plan", "Seat Type", "Min Quantity", "Price"],
+        "key": ["Plan", "Seat Type", "Min Quantity"],
+    },
+    "m365": {
+        "required": ["SkuTitle", "ProductId", "SkuId", "Term Commit", "Billing Cycle", "Price", "Segment"],
+        "key": ["Segment", "Term Commit", "Billing Cycle", "SkuTitle"],
+    },
+    "cisco_meraki": {
+        "required": ["SKU", "Description", "Price"],
+        "key": ["Description"],
+    },
+    "resale_sheet": {
+        "required": ["Vendor", "Item", "Price"],
+        "key": ["Vendor", "Item"],
+    },
+}
+TERM_BILLING_NAMES = {"Month": "Monthly", "month": "Monthly", "Annual": "Annual"}
+REPORT_COLUMNS = ["Table", "Row", "Reason", "Key", "Price"]
+
+
+def _quarantine(df, mask, table, reason, key_cols):
+    rows = df[mask]
+    return pd.DataFrame({
+        "Table": table,
+        # Spreadsheet row number: data starts on row 2, under the header
+        "Row": rows.index + 2,
+        "Reason": reason if isinstance(reason, str) else reason[mask],
+        "Key": [" | ".join(map(str, values)) for values in rows[key_cols].itertuples(index=False)],
+        "Price": [str(value) for value in rows["Price"]],
+    })
+
+
+def validate_table(df, table):
+    schema = CATALOG_SCHEMA[table]
+    missing = [col for col in schema["required"] if col not in df.columns]
+    if missing:
+        raise CatalogError(f"Missing required columns in {table}: {', '.join(missing)}")
+    key_cols = schema["key"]
+    df = df.copy()
+    if table == "m365":
+        df["Segment"] = df["Segment"].where(df["Segment"].isna(), df["Segment"].astype(str).str.strip())
+        for col in ["Term Commit", "Billing Cycle"]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str).str.strip().replace(TERM_BILLING_NAMES))
+
+    quarantined = []
+    missing_key = df[key_cols].isna().any(axis=1)
+    quarantined.append(_quarantine(df, missing_key, table, "missing key value", key_cols))
+    df = df[~missing_key]
+    if table == "seat_tiers":
+        quantities = pd.to_numeric(df["Min Quantity"], errors="coerce")
+        bad_quantity = quantities.isna() | (quantities < 1) | (quantities % 1 != 0)
+        quarantined.append(_quarantine(df, bad_quantity, table, "invalid tier quantity", key_cols))
+        df = df[~bad_quantity].assign(**{"Min Quantity": quantities[~bad_quantity].astype("int64")})
+
+    prices = pd.to_numeric(df["Price"], errors="coerce")
+    price_text = df["Price"].astype(str).str.strip()
+    bad_price = prices.isna()
+    reasons = pd.Series("invalid price", index=df.index)
+    reasons[df["Price"].isna()] = "missing price"
+    reasons[price_text.isin(EXCLUDED_PRICES)] = "quote-only price"
+    quarantined.append(_quarantine(df, bad_price, table, reasons, key_cols))
+    df = df[~bad_price].assign(Price=prices[~bad_price].astype(float))
+
+    # Lookups always used the first row for a key; later rows are reported
+    duplicate = df.duplicated(key_cols)
+    quarantined.append(_quarantine(df, duplicate, table, "duplicate key", key_cols))
+    df = df[~duplicate]
+    if table == "seat_tiers":
+        df, tier_report = _validate_tier_groups(df, key_cols)
+        quarantined.append(tier_report)
+
+    return df, pd.concat(quarantined, ignore_index=True)
+
+
+def _validate_tier_groups(df, key_cols):
+    # Each (Plan, Seat Type) needs one valid Tier Mode and a first tier at
+    # quantity 1; otherwise all of its tiers are reported and the flat price applies
+    if "Tier Mode" not in df.columns:
+        df = df.assign(**{"Tier Mode": TIER_MODES[0]})
+    df = df.assign(**{"Tier Mode": df["Tier Mode"].fillna(TIER_MODES[0]).astype(str).str.strip().str.title()})
+    group_keys = [df["Plan"], df["Seat Type"]]
+    reasons = pd.Series("", index=df.index)
+    reasons[df.groupby(group_keys)["Min Quantity"].transform("min") != 1] = "tiers do not start at 1"
+    reasons[df.groupby(group_keys)["Tier Mode"].transform("nunique") > 1] = "mixed tier modes"
+    reasons[(~df["Tier Mode"].isin(TIER_MODES)).groupby(group_keys).transform("any")] = "invalid tier mode"
+    bad_group = reasons != ""
+    return df[~bad_group][TIER_COLUMNS], _quarantine(df, bad_group, "seat_tiers", reasons, key_cols)
+
+
+def validate_catalog(raw_catalog):
+    catalog = dict(raw_catalog)
+    reports = []
+    for table in CATALOG_SCHEMA:
+        catalog[table], report = validate_table(raw_catalog[table], table)
+        reports.append(report)
+    report = pd.concat(reports, ignore_index=True).reindex(columns=REPORT_COLUMNS)
+    return catalog, report
+
+
+def summarize_report(report):
+    if report.empty:
+        return "Catalog validation: no rows quarantined."
+    counts = report.groupby(["Table", "Reason"]).size()
+    lines = [f"Catalog validation: {len(report)} rows quarantined."]
+    lines += [f"  {table}: {count} {reason}" for (table, reason), count in counts.items()]
+    return "\n".join(lines)
+
+
+# ----------------------------------------
+# Catalog Loading
+# ----------------------------------------
+def load_catalog(ariento_source=ARIENTO_PRICING_URL, service_source=SERVICE_CATALOGUE_URL, cache_dir=None):
+    if cache_dir:
+        return load_catalog_incremental(ariento_source, service_source, cache_dir)
+    ariento_plans, license_types, seat_tiers = load_ariento_pricing(read_source(ariento_source, "Ariento Pricing Excel"))
+    cisco_meraki, m365, resale_sheet = load_service_catalogue(read_source(service_source, "Service Catalogue Excel"))
+    catalog, report = validate_catalog({
+        "ariento_plans": ariento_plans,
+        "license_types": license_types,
+        "seat_tiers": seat_tiers,
+        "cisco_meraki": cisco_meraki,
+        "m365": m365,
+        "resale_sheet": resale_sheet,
+    })
+    catalog["validation_report"] = report
+    return catalog
+
+
+# ----------------------------------------
+# Incremental Loading
+# With a cache directory each catalog table is keyed on a hash of its
+# sheet's raw cell data: the <sheetData> part of the sheet XML inside the
+# .xlsx, the shared strings it refers to and the workbook styles. Tables
+# whose sheet is unchanged are read back from the cache; only changed sheets
+# are parsed, cleaned and validated again.
+# ----------------------------------------
+CATALOG_CACHE_DIR = os.path.join(REPO_DIR, ".catalog_cache")
+# Bump when clean_sheet or validate_table change, so cached tables are rebuilt
+CACHE_VERSION = 2
+_CACHE_SALT = repr((CACHE_VERSION, CATALOG_SCHEMA, EXCLUDED_PRICES, EXCLUDED_SEGMENTS, TERM_BILLING_NAMES)).encode()
+_XLSX_NS = {
+    "m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+}
+_SHARED_STRING = re.compile(rb"<si>.*?</si>", re.S)
+_SHARED_STRING_REF = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>.*?<v>(\d+)</v>', re.S)
+
+
+def sheet_fingerprints(content, label):
+    # {sheet name: digest of the sheet's cell data} without parsing any cells
+    try:
+        with zipfile.ZipFile(BytesIO(content)) as book:
+            names = set(book.namelist())
+            workbook = ElementTree.fromstring(book.read("xl/workbook.xml"))
+            rels = ElementTree.fromstring(book.read("xl/_rels/workbook.xml.rels"))
+            targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+            strings = _SHARED_STRING.findall(book.read("xl/sharedStrings.xml")) if "xl/sharedStrings.xml" in names else []
+            styles = book.read("xl/styles.xml") if "xl/styles.xml" in names else b""
+            fingerprints = {}
+            for sheet in workbook.iterfind("m:sheets/m:sheet", _XLSX_NS):
+                target = targets[sheet.get(f"{{{_XLSX_NS['r']}}}id")]
+                data = book.read(target.lstrip("/") if target.startswith("/") else "xl/" + target)
+                start, end = data.find(b"<sheetData"), data.rfind(b"</sheetData>")
+                cells = data[start:end] if start >= 0 and end > start else b""
+                digest = hashlib.sha256(_CACHE_SALT)
+                digest.update(hashlib.sha256(styles).digest())
+                digest.update(cells)
+                for i in sorted({int(v) for v in _SHARED_STRING_REF.findall(cells)}):
+                    digest.update(strings[i])
+                fingerprints[sheet.get("name")] = digest.hexdigest()
+    except (zipfile.BadZipFile, KeyError, IndexError, ElementTree.ParseError) as e:
+        raise CatalogError(f"Error reading sheets from the {label} file: {e}")
+    return fingerprints
+
+
+def _table_sheets(label, sheet_names):
+    if label == "Ariento Pricing Excel":
+        missing = [sheet for table, sheet in ARIENTO_SHEETS.items() if table != "seat_tiers" and sheet not in sheet_names]
+        if missing:
+            raise CatalogError(f"Missing sheet or column in Ariento Pricing file: {', '.join(missing)}")
+        return {table: sheet if sheet in sheet_names else None for table, sheet in ARIENTO_SHEETS.items()}
+    found = find_service_sheets(sheet_names)
+    return {table: found.get(table) for table in SERVICE_TABLES}
+
+
+def build_table(table, df):
+    # One raw sheet to its catalog table and quarantine report
+    df = clean_sheet(table, df)
+    if table in CATALOG_SCHEMA:
+        return validate_table(df, table)
+    return df, pd.DataFrame(columns=REPORT_COLUMNS)
+
+
+def read_cached(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def write_cached(cache_dir, table, path, entry):
+    # The cache only speeds up loading, so a read-only disk is not an error
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        for name in os.listdir(cache_dir):
+            if name.startswith(f"{table}-") and name.endswith(".pkl") and name != os.path.basename(path):
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as e:
+        logger.warning("Could not write catalog cache %s: %s", path, e)
+
+
+def catalog_sheets(ariento_source, service_source):
+    # Yields (table, sheet, fingerprint, read) for every catalog table, where
+    # read() parses that sheet; sheet is None for an optional missing sheet
+    for label, source in (("Ariento Pricing Excel", ariento_source), ("Service Catalogue Excel", service_source)):
+        content = read_source(source, label)
+        fingerprints = sheet_fingerprints(content, label)
+        workbook = []
+
+        def read(sheet, content=content, label=label, workbook=workbook):
+            try:
+                if not workbook:
+                    workbook.append(pd.ExcelFile(BytesIO(content)))
+                return pd.read_excel(workbook[0], sheet_name=sheet)
+            except Exception as e:
+                raise CatalogError(f"Error loading {label} file: {e}")
+
+        for table, sheet in _table_sheets(label, list(fingerprints)).items():
+            yield table, sheet, fingerprints.get(sheet), read
+
+
+def cached_table(cache_dir, table, sheet, fingerprint, read):
+    # (table, quarantine report) from the cache, rebuilt if the sheet changed
+    path = os.path.join(cache_dir, f"{table}-{fingerprint[:32]}.pkl")
+    entry = read_cached(path)
+    if entry is not None:
+        logger.info("Catalog %s: sheet %r unchanged, reused cached table", table, sheet)
+        return entry
+    start = time.perf_counter()
+    entry = build_table(table, read(sheet))
+    write_cached(cache_dir, table, path, entry)
+    logger.info("Catalog %s: sheet %r changed, rebuilt in %.1f ms", table, sheet, 1000 * (time.perf_counter() - start))
+    return entry
+
+
+def load_catalog_incremental(ariento_source, service_source, cache_dir=CATALOG_CACHE_DIR):
+    catalog, reports = {}, {}
+    for table, sheet, fingerprint, read in catalog_sheets(ariento_source, service_source):
+        if sheet is None:
+            catalog[table], reports[table] = build_table(table, None)
+        else:
+            catalog[table], reports[table] = cached_table(cache_dir, table, sheet, fingerprint, read)
+    report = pd.concat([reports[table] for table in CATALOG_SCHEMA], ignore_index=True).reindex(columns=REPORT_COLUMNS)
+    catalog["validation_report"] = report
+    return catalog
+
+
+def load_logo(source=LOGO_URL):
+    try:
+        return read_source(source, "logo")
+    except CatalogError:
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Validate the pricing workbooks and list quarantined rows")
+    parser.add_argument("--ariento", default=ARIENTO_PRICING_PATH, help="Ariento Pricing workbook path or URL")
+    parser.add_argument("--service-catalogue", default=SERVICE_CATALOGUE_PATH, help="Service Catalogue workbook path or URL")
+    parser.add_argument("--out", help="Write the quarantined rows to this CSV file")
+    parser.add_argument("--cache-dir", help="Rebuild only changed sheets, caching tables in this directory")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        validated = load_catalog(args.ariento, args.service_catalogue, args.cache_dir)
+    except CatalogError as e:
+        raise SystemExit(str(e))
+    print(summarize_report(validated["validation_report"]))
+    if args.out:
+        validated["validation_report"].to_csv(args.out, index=False)
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from catalog import (
+    ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, CatalogError, read_source, read_workbook,
+    load_ariento_pricing, build_service_catalogue, validate_catalog,
+)
+from pricing import build_price_tables, flatten_quotes, price_flattened
+from tiers import TIER_SHEET
+
+# ----------------------------------------
+# Catalog diff and repricing impact report
+#   python catalog_diff.py --old-ariento "Ariento Pricing 2025 (old1).xlsx" \
+#       --new-ariento "Ariento Pricing 2025.xlsx" --quotes saved_quotes.jsonl --out diff.xlsx
+# Compares two catalog versions row by row on each sheet's natural key, then
+# reprices a set of saved quote specs under both versions in one batch.
+# ----------------------------------------
+LICENSE_TYPE_KEYS = ["Plan", "Seat Type"]
+SEAT_TIER_KEYS = ["Plan", "Seat Type", "Min Quantity"]
+# Keys for the Service Catalogue sheets (names are matched after stripping);
+# any other sheet is keyed on its first column
+SERVICE_SHEET_KEYS = {
+    "M365": ["SkuTitle", "Segment", "Term Commit", "Billing Cycle"],
+    "Cisco Meraki": ["SKU"],
+    "Third Party Resale": ["Vendor", "SKU"],
+    "Project Services": ["Services"],
+    "Managed Services": ["Services"],
+    "LMS - Training Catalog": ["Course Name"],
+}
+DIFF_COLUMNS = ["Change", "Field", "Old", "New", "Delta"]
+REPRICE_COLUMNS = ["new_ariento_cost", "microsoft_cost", "service_cost", "onboarding_price", "total_discount", "quote_total"]
+
+
+# ----------------------------------------
+# Keyed Diff
+# ----------------------------------------
+def _prepare(df, key_cols):
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.dropna(subset=[c for c in key_cols if c in df.columns], how="all")
+    duplicates = int(df.duplicated(key_cols).sum())
+    # Lookups use the first row for a key, so the diff does too
+    return df.drop_duplicates(key_cols), duplicates
+
+
+def diff_frames(old, new, key_cols, value_cols=None):
+    old, old_duplicates = _prepare(old, key_cols)
+    new, new_duplicates = _prepare(new, key_cols)
+    if value_cols is None:
+        value_cols = [
+            c for c in old.columns
+            if c in new.columns and c not in key_cols and not c.startswith("Unnamed")
+        ]
+    merged = old[key_cols + value_cols].merge(
+        new[key_cols + value_cols], on=key_cols, how="outer", suffixes=("_old", "_new"), indicator=True
+    )
+
+    parts = []
+    for change, side in (("removed", "left_only"), ("added", "right_only")):
+        rows = merged.loc[merged["_merge"] == side, key_cols].copy()
+        rows["Change"] = change
+        parts.append(rows)
+
+    both = merged[merged["_merge"] == "both"]
+    for col in value_cols:
+        old_values, new_values = both[f"{col}_old"], both[f"{col}_new"]
+        old_num = pd.to_numeric(old_values, errors="coerce")
+        new_num = pd.to_numeric(new_values, errors="coerce")
+        numeric = old_num.notna() & new_num.notna()
+        same_text = (old_values.astype(str) == new_values.astype(str)) | (old_values.isna() & new_values.isna())
+        same = np.where(numeric, np.isclose(old_num.fillna(0), new_num.fillna(0)), same_text)
+        changed = both.loc[~same, key_cols].copy()
+        changed["Change"] = "changed"
+        changed["Field"] = col
+        changed["Old"] = old_values[~same].to_numpy()
+        changed["New"] = new_values[~same].to_numpy()
+        changed["Delta"] = (new_num - old_num)[~same].to_numpy()
+        parts.append(changed)
+
+    diff = pd.concat(parts, ignore_index=True).reindex(columns=key_cols + DIFF_COLUMNS)
+    stats = {
+        "added": int((diff["Change"] == "added").sum()),
+        "removed": int((diff["Change"] == "removed").sum()),
+        "changed": int(diff.loc[diff["Change"] == "changed", key_cols].drop_duplicates().shape[0]),
+        "duplicate_keys_old": old_duplicates,
+        "duplicate_keys_new": new_duplicates,
+    }
+    return diff, stats
+
+
+def diff_service_sheets(old_sheets, new_sheets):
+    old_sheets = {name.strip(): df for name, df in old_sheets.items()}
+    new_sheets = {name.strip(): df for name, df in new_sheets.items()}
+    results = {}
+    for name in old_sheets.keys() | new_sheets.keys():
+        if name not in old_sheets or name not in new_sheets:
+            results[name] = (None, {"sheet": "added" if name in new_sheets else "removed"})
+            continue
+        old, new = old_sheets[name], new_sheets[name]
+        if old.empty and new.empty:
+            continue
+        columns = [str(c).strip() for c in old.columns]
+        key_cols = SERVICE_SHEET_KEYS.get(name, columns[:1])
+        results[name] = diff_frames(old, new, key_cols)
+    return results
+
+
+# ----------------------------------------
+# Catalog Versions
+# ----------------------------------------
+def load_version(ariento_source, service_source):
+    # Parse each workbook once: the raw sheets feed the diff, the cleaned
+    # catalog feeds repricing
+    ariento_plans, license_types, seat_tiers = load_ariento_pricing(read_source(ariento_source, "Ariento Pricing Excel"))
+    service_sheets = read_workbook(read_source(service_source, "Service Catalogue Excel"), "Service Catalogue Excel")
+    raw_service_sheets = {name: df.copy() for name, df in service_sheets.items()}
+    cisco_meraki, m365, resale_sheet = build_service_catalogue(service_sheets)
+    catalog, _ = validate_catalog({
+        "ariento_plans": ariento_plans,
+        "license_types": license_types,
+        "seat_tiers": seat_tiers,
+        "cisco_meraki": cisco_meraki,
+        "m365": m365,
+        "resale_sheet": resale_sheet,
+    })
+    return catalog, raw_service_sheets
+
+
+def diff_catalogs(old_version, new_version):
+    old_catalog, old_sheets = old_version
+    new_catalog, new_sheets = new_version
+    diffs = {"Ariento License Type": diff_frames(
+        old_catalog["license_types"], new_catalog["license_types"], LICENSE_TYPE_KEYS, ["Price"]
+    )}
+    old_tiers, new_tiers = old_catalog["seat_tiers"], new_catalog["seat_tiers"]
+    if not (old_tiers.empty and new_tiers.empty):
+        diffs[TIER_SHEET] = diff_frames(old_tiers, new_tiers, SEAT_TIER_KEYS, ["Price", "Tier Mode"])
+    diffs.update(diff_service_sheets(old_sheets, new_sheets))
+    return diffs
+
+
+# ----------------------------------------
+# Repricing
+# ----------------------------------------
+def load_quote_specs(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def reprice_quotes(specs, old_catalog, new_catalog):
+    quotes, lines = flatten_quotes(specs)
+    old = price_flattened(quotes, lines, build_price_tables(old_catalog))
+    new = price_flattened(quotes, lines, build_price_tables(new_catalog))
+    report = pd.DataFrame({
+        "quote": [spec.get("name") or spec.get("company_name") or f"quote_{i}" for i, spec in enumerate(specs)],
+        "business_model": new["business_model"],
+        "ariento_plan": new["ariento_plan"],
+    })
+    for col in REPRICE_COLUMNS:
+        report[f"{col}_old"] = old[col]
+        report[f"{col}_new"] = new[col]
+    report["quote_total_delta"] = new["quote_total"] - old["quote_total"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        report["quote_total_delta_pct"] = np.where(
+            old["quote_total"] != 0, 100.0 * report["quote_total_delta"] / old["quote_total"], np.nan
+        )
+    report["unmatched_lines_old"] = old["unmatched_lines"]
+    report["unmatched_lines_new"] = new["unmatched_lines"]
+    return report
+
+
+def summarize_repricing(report):
+    changed = ~np.isclose(report["quote_total_old"], report["quote_total_new"])
+    return {
+        "quotes": len(report),
+        "quotes_changed": int(changed.sum()),
+        "total_old": float(report["quote_total_old"].sum()),
+        "total_new": float(report["quote_total_new"].sum()),
+        "total_delta": float(report["quote_total_delta"].sum()),
+        "quotes_with_unmatched_lines_new": int((report["unmatched_lines_new"] > 0).sum()),
+    }
+
+
+# ----------------------------------------
+# Report Output
+# ----------------------------------------
+def write_report(path, diffs, report=None):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        summary = pd.DataFrame([
+            dict({"Sheet": name}, **stats) for name, (_, stats) in sorted(diffs.items())
+        ])
+        summary.to_excel(writer, sheet_name="Summary", index=False)
+        for name, (diff, _) in sorted(diffs.items()):
+            if diff is not None and not diff.empty:
+                # Excel limits sheet names to 31 characters
+                diff.to_excel(writer, sheet_name=f"Diff {name}"[:31], index=False)
+        if report is not None:
+            report.to_excel(writer, sheet_name="Repricing", index=False)
+
+
+def print_summary(diffs, repricing=None):
+    print(f"{'Sheet':<28}{'added':>8}{'removed':>9}{'changed':>9}")
+    for name, (_, stats) in sorted(diffs.items()):
+        if "sheet" in stats:
+            print(f"{name:<28}  sheet {stats['sheet']}")
+        else:
+            print(f"{name:<28}{stats['added']:>8}{stats['removed']:>9}{stats['changed']:>9}")
+    if repricing is not None:
+        print()
+        print(f"Quotes repriced: {repricing['quotes']} | changed: {repricing['quotes_changed']} "
+              f"| with unmatched lines (new): {repricing['quotes_with_unmatched_lines_new']}")
+        print(f"Total old: ${repricing['total_old']:,.2f} | new: ${repricing['total_new']:,.2f} "
+              f"| delta: ${repricing['total_delta']:,.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two catalog versions and report the repricing impact")
+    parser.add_argument("--old-ariento", required=True, help="Old Ariento Pricing workbook path or URL")
+    parser.add_argument("--new-ariento", default=ARIENTO_PRICING_PATH, help="New Ariento Pricing workbook path or URL")
+    parser.add_argument("--old-service", default=SERVICE_CATALOGUE_PATH, help="Old Service Catalogue workbook path or URL")
+    parser.add_argument("--new-service", default=SERVICE_CATALOGUE_PATH, help="New Service Catalogue workbook path or URL")
+    parser.add_argument("--quotes", help="Saved quote specs (JSON list or JSON lines) to reprice")
+    parser.add_argument("--out", help="Write the diff and repricing report to this .xlsx file")
+    args = parser.parse_args()
+
+    try:
+        old_version = load_version(args.old_ariento, args.old_service)
+        new_version = load_version(args.new_ariento, args.new_service)
+    except CatalogError as e:
+        raise SystemExit(str(e))
+    diffs = diff_catalogs(old_version, new_version)
+
+    report = repricing = None
+    if args.quotes:
+        if not os.path.exists(args.quotes):
+            raise SystemExit(f"Quote file not found: {args.quotes}")
+        report = reprice_quotes(load_quote_specs(args.quotes), old_version[0], new_version[0])
+        repricing = summarize_repricing(report)
+
+    print_summary(diffs, repricing)
+    if args.out:
+        write_report(args.out, diffs, report)
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
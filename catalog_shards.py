@@ -0,0 +1,284 @@
+import os
+import pickle
+import hashlib
+import logging
+import shutil
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from catalog import (
+    ARIENTO_PRICING_URL, SERVICE_CATALOGUE_URL, CATALOG_CACHE_DIR, CATALOG_SCHEMA, REPORT_COLUMNS, CatalogError,
+    build_table, cached_table, catalog_sheets, read_cached, write_cached,
+)
+from pricing import get_default_segment, index_seats, index_m365, m365_price_table
+from tiers import compile_tiers
+
+# ----------------------------------------
+# Catalog Shards
+# A quote only reads the license_types rows of its plan and the M365 rows of
+# its plan's segment (see get_default_segment). Those two tables are split
+# into one shard per Plan and one per Segment, plus an "any segment" shard
+# (key None) for plans without a segment, holding the first row of every
+# Term/Billing/SkuTitle. Shards are written to the catalog cache when their
+# sheet changes and read on first use into one process-wide LRU bounded by
+# size, so memory follows the plans and segments being quoted rather than
+# the whole catalog. The other tables are small and stay loaded.
+#   shards = load_catalog_shards(ARIENTO_PRICING_URL, SERVICE_CATALOGUE_URL)
+#   price_quote(spec, shards.price_index())
+# ----------------------------------------
+SHARDED_TABLES = {"license_types": "Plan", "m365": "Segment"}
+SHARD_CACHE_BYTES = 64 * 2**20
+
+logger = logging.getLogger("catalog")
+
+
+class ShardCache:
+    # Thread-safe LRU of loaded shards shared by every session in the process,
+    # bounded by the shards' pickled size
+    def __init__(self, max_bytes=SHARD_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, load):
+        # load() returns (shard, size in bytes); it runs outside the lock
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        shard, size = load()
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = (shard, size)
+                self.bytes += size
+                # The newest shard always stays, even if it alone is over the limit
+                while self.bytes > self.max_bytes and len(self._entries) > 1:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.bytes -= evicted
+                    self.evictions += 1
+            return self._entries[key][0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "shards": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            }
+
+
+SHARD_CACHE = ShardCache()
+
+
+# ----------------------------------------
+# Building Shards
+# ----------------------------------------
+def split_table(table, df):
+    # {shard key: shard} where a shard is its rows plus their price index entries
+    column = SHARDED_TABLES[table]
+    parts = {key: rows for key, rows in df.groupby(column, sort=False)}
+    if table == "license_types":
+        return {key: dict(index_seats(rows), rows=rows) for key, rows in parts.items()}
+    shards = {key: dict(index_m365(rows), rows=rows) for key, rows in parts.items()}
+    any_rows = df.drop_duplicates(["Term Commit", "Billing Cycle", "SkuTitle"])
+    shards[None] = dict(index_m365(any_rows, any_segment=True), rows=any_rows)
+    return shards
+
+
+def _write_shards(shard_dir, shards, report):
+    # Shards first, the manifest last: a directory with a manifest is complete
+    manifest = {"shards": {}, "report": report}
+    for i, (key, shard) in enumerate(shards.items()):
+        path = os.path.join(shard_dir, f"shard{i}.pkl")
+        write_cached(shard_dir, f"shard{i}", path, shard)
+        manifest["shards"][key] = path
+    write_cached(shard_dir, "manifest", os.path.join(shard_dir, "manifest.pkl"), manifest)
+    parent, name = os.path.split(shard_dir)
+    table = name.rsplit("-", 1)[0]
+    for old in os.listdir(parent):
+        if old.startswith(f"{table}-") and old != name and os.path.isdir(os.path.join(parent, old)):
+            shutil.rmtree(os.path.join(parent, old), ignore_errors=True)
+    return manifest
+
+
+def sharded_table(cache_dir, table, sheet, fingerprint, read, force=False):
+    # The manifest of a sharded table; the table itself is only built (and
+    # held in memory) when its sheet changed or force is set
+    shard_dir = os.path.join(cache_dir, "shards", f"{table}-{fingerprint[:32]}")
+    manifest = None if force else read_cached(os.path.join(shard_dir, "manifest.pkl"))
+    if manifest is not None:
+        logger.info("Catalog %s: sheet %r unchanged, reused %d cached shards", table, sheet, len(manifest["shards"]))
+        return manifest
+    df, report = build_table(table, read(sheet))
+    manifest = _write_shards(shard_dir, split_table(table, df), report)
+    logger.info("Catalog %s: sheet %r changed, split into %d shards", table, sheet, len(manifest["shards"]))
+    return manifest
+
+
+# ----------------------------------------
+# Lazy Catalog
+# ----------------------------------------
+def _empty_shard(table):
+    rows = pd.DataFrame(columns=CATALOG_SCHEMA[table]["required"])
+    return dict(index_seats(rows) if table == "license_types" else index_m365(rows), rows=rows)
+
+
+_EMPTY_SHARDS = {table: _empty_shard(table) for table in SHARDED_TABLES}
+
+
+def _read_shard(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return pickle.loads(data), len(data)
+
+
+def _concat(frames, empty):
+    return pd.concat(frames, ignore_index=True) if frames else empty
+
+
+class _ShardedLookup:
+    # Read-only mapping over one price index entry (e.g. "seats") whose keys
+    # are spread over shards by their first field (plan or segment)
+    def __init__(self, catalog, table, name):
+        self._catalog = catalog
+        self._table = table
+        self._name = name
+
+    def _part(self, key):
+        shard_key = key[0] if isinstance(key, tuple) else key
+        return self._catalog.shard(self._table, shard_key)[self._name]
+
+    def get(self, key, default=None):
+        return self._part(key).get(key, default)
+
+    def __getitem__(self, key):
+        return self._part(key)[key]
+
+    def __contains__(self, key):
+        return key in self._part(key)
+
+
+class CatalogShards:
+    def __init__(self, tables, reports, manifests, rebuild, cache=SHARD_CACHE, version=None):
+        # tables: the unsharded catalog tables; manifests: per sharded table,
+        # its shard files and quarantine report; version: a digest of every
+        # sheet the catalog was built from (see catalog_version)
+        self.tables = tables
+        self.version = version
+        self._manifests = manifests
+        self._rebuild = rebuild
+        self._cache = cache
+        self._index = None
+        reports = dict(reports, **{table: manifest["report"] for table, manifest in manifests.items()})
+        self.validation_report = pd.concat(
+            [reports[table] for table in CATALOG_SCHEMA], ignore_index=True
+        ).reindex(columns=REPORT_COLUMNS)
+
+    def _load(self, table, key):
+        try:
+            return _read_shard(self._manifests[table]["shards"][key])
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # The cache was cleared under us: split the sheet again
+            self._manifests[table] = self._rebuild(table)
+            return _read_shard(self._manifests[table]["shards"][key])
+
+    def shard(self, table, key):
+        manifest = self._manifests[table]
+        if key not in manifest["shards"]:
+            return _EMPTY_SHARDS[table]
+        return self._cache.get((table, manifest["shards"][key]), lambda: self._load(table, key))
+
+    def license_types(self, plan):
+        return self.shard("license_types", plan)["rows"]
+
+    def m365(self, segment):
+        # segment None: the first row of every Term/Billing/SkuTitle across segments
+        return self.shard("m365", segment)["rows"]
+
+    def price_index(self):
+        # Drop-in for build_price_index(catalog): seat and M365 lookups load
+        # their plan's or segment's shard on first use
+        if self._index is None:
+            index = {
+                "seats": _ShardedLookup(self, "license_types", "seats"),
+                "seat_options": _ShardedLookup(self, "license_types", "seat_options"),
+                "m365": _ShardedLookup(self, "m365", "m365"),
+                "m365_options": _ShardedLookup(self, "m365", "m365_options"),
+            }
+            meraki = self.tables["cisco_meraki"]
+            resale = self.tables["resale_sheet"]
+            index["meraki"] = {
+                desc: {"Price": price, "SKU": str(sku)}
+                for desc, sku, price in meraki[["Description", "SKU", "Price"]].itertuples(index=False)
+            }
+            index["resale"] = {
+                (vendor, item): price for vendor, item, price in resale[["Vendor", "Item", "Price"]].itertuples(index=False)
+            }
+            index["seat_tiers"] = compile_tiers(self.tables["seat_tiers"])
+            self._index = index
+        return self._index
+
+    def price_tables(self, plans):
+        # Drop-in for build_price_tables(catalog), limited to the shards the
+        # given plans need (None for Resale)
+        plans = list(dict.fromkeys(plans))
+        segments = list(dict.fromkeys(get_default_segment(plan) if plan else None for plan in plans))
+        license_types = _concat(
+            [self.license_types(plan) for plan in plans if plan], _EMPTY_SHARDS["license_types"]["rows"]
+        )
+        m365 = [m365_price_table(self.m365(segment)) for segment in segments if segment]
+        if None in segments:
+            m365.append(m365_price_table(self.m365(None), any_segment=True))
+        return {
+            "seats": license_types[["Plan", "Seat Type", "Price"]],
+            "m365": _concat(m365, m365_price_table(_EMPTY_SHARDS["m365"]["rows"])),
+            "meraki": self.tables["cisco_meraki"][["Description", "Price"]],
+            "resale": self.tables["resale_sheet"][["Vendor", "Item", "Price"]],
+            "seat_tiers": self.price_index()["seat_tiers"],
+        }
+
+    def cache_stats(self):
+        return self._cache.stats()
+
+
+def catalog_version(fingerprints):
+    # One digest for a catalog from its tables' sheet fingerprints; it
+    # changes whenever any sheet's cells do
+    digest = hashlib.sha256()
+    for table, fingerprint in sorted(fingerprints.items()):
+        digest.update(f"{table}={fingerprint}\n".encode())
+    return digest.hexdigest()[:32]
+
+
+def load_catalog_shards(ariento_source=ARIENTO_PRICING_URL, service_source=SERVICE_CATALOGUE_URL,
+                        cache_dir=CATALOG_CACHE_DIR, cache=SHARD_CACHE):
+    tables, reports, manifests, sources, fingerprints = {}, {}, {}, {}, {}
+    for table, sheet, fingerprint, read in catalog_sheets(ariento_source, service_source):
+        fingerprints[table] = fingerprint or ""
+        if table in SHARDED_TABLES:
+            if sheet is None:
+                raise CatalogError(f"Missing sheet for the {table} table")
+            sources[table] = (sheet, fingerprint, read)
+            manifests[table] = sharded_table(cache_dir, table, sheet, fingerprint, read)
+        elif sheet is None:
+            tables[table], reports[table] = build_table(table, None)
+        else:
+            tables[table], reports[table] = cached_table(cache_dir, table, sheet, fingerprint, read)
+
+    def rebuild(table):
+        return sharded_table(cache_dir, table, *sources[table], force=True)
+
+    return CatalogShards(tables, reports, manifests, rebuild, cache, catalog_version(fingerprints))
@@ -0,0 +1,146 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from catalog import REPO_DIR
+
+# ----------------------------------------
+# Currencies
+# Catalog prices are USD. A quote in another currency has every amount
+# multiplied by that currency's rate from a local FX file and rounded to the
+# currency's own decimals; the formatting helpers below put the currency's
+# symbol on the result.
+# fx_rates.csv has one row per currency and rate date:
+#   Date,Currency,Rate        (Rate: units of the currency per 1 USD)
+#   2026-10-15,CAD,1.3791
+# A quote uses the latest rate on or before its rate date. The file is read
+# once per version of it (size and mtime) and each date's rates are looked
+# up once, so converting a quote costs one dict lookup and a numpy multiply.
+#   rate, rate_date = FX_RATES.rate("CAD")
+#   convert_amounts(np.array([1234.5, 99.99]), "CAD", rate)
+# ----------------------------------------
+BASE_CURRENCY = "USD"
+CURRENCIES = {
+    "USD": {"symbol": "$", "decimals": 2},
+    "CAD": {"symbol": "CA$", "decimals": 2},
+    "GBP": {"symbol": "£", "decimals": 2},
+    "EUR": {"symbol": "€", "decimals": 2},
+}
+FX_RATES_PATH = os.path.join(REPO_DIR, "fx_rates.csv")
+FX_COLUMNS = ["Date", "Currency", "Rate"]
+
+
+def currency_info(currency):
+    try:
+        return CURRENCIES[currency]
+    except KeyError:
+        raise ValueError(f"Currency must be one of: {', '.join(CURRENCIES)}")
+
+
+def convert_amounts(amounts, currency, rate):
+    # USD amounts (any array-like) in `currency`, rounded to its decimals in one step
+    return np.round(np.asarray(amounts, dtype=float) * rate, currency_info(currency)["decimals"])
+
+
+def format_money(value, currency=BASE_CURRENCY, grouping=False):
+    # "$1234.50", or "$1,234.50" with grouping; the currency's decimals
+    info = currency_info(currency)
+    if grouping:
+        return f"{info['symbol']}{value:,.{info['decimals']}f}"
+    return f"{info['symbol']}{value:.{info['decimals']}f}"
+
+
+def money_number_format(currency=BASE_CURRENCY):
+    # Excel number format for amounts in `currency`
+    info = currency_info(currency)
+    decimals = "." + "0" * info["decimals"] if info["decimals"] else ""
+    return f'"{info["symbol"]}"#,##0{decimals}'
+
+
+# ----------------------------------------
+# FX Rates
+# ----------------------------------------
+def load_fx_rates(path=FX_RATES_PATH):
+    # The FX table sorted by date; ValueError for a missing or malformed file
+    try:
+        rates = pd.read_csv(path, comment="#", skipinitialspace=True)
+    except (OSError, pd.errors.ParserError) as e:
+        raise ValueError(f"Could not read FX rates from {path}: {e}")
+    missing = [col for col in FX_COLUMNS if col not in rates.columns]
+    if missing:
+        raise ValueError(f"FX rates file {path} is missing columns: {', '.join(missing)}")
+    rates = rates[FX_COLUMNS].dropna()
+    rates["Date"] = pd.to_datetime(rates["Date"], errors="coerce").dt.date
+    rates["Rate"] = pd.to_numeric(rates["Rate"], errors="coerce")
+    bad = rates["Date"].isna() | ~(rates["Rate"] > 0) | ~rates["Currency"].isin(list(CURRENCIES))
+    if bad.any():
+        raise ValueError(f"FX rates file {path} has {int(bad.sum())} rows without a valid date, currency or positive rate")
+    return rates.sort_values(["Date", "Currency"], kind="stable").reset_index(drop=True)
+
+
+class FxRates:
+    # Rates from one FX file shared by every session in the process; the file
+    # is read again when it changes
+    def __init__(self, path=FX_RATES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._table = None
+        self._latest = None
+        self._by_date = {}
+
+    def _current(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            raise ValueError(f"Could not read FX rates from {self.path}: {e}")
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if version == self._version:
+                return self._table, self._latest, self._by_date
+        table = load_fx_rates(self.path)
+        latest = table["Date"].iloc[-1] if len(table) else None
+        with self._lock:
+            self._version, self._table, self._latest, self._by_date = version, table, latest, {}
+            return self._table, self._latest, self._by_date
+
+    def dates(self, currency):
+        # The rate dates the file has for `currency`, oldest first
+        table, _, _ = self._current()
+        return list(table.loc[table["Currency"] == currency, "Date"])
+
+    def rates(self, rate_date=None):
+        # {currency: (rate, the date it is from)} for the latest rates on or
+        # before rate_date (a date or "YYYY-MM-DD"; default the latest in the file)
+        table, latest, by_date = self._current()
+        if isinstance(rate_date, str):
+            try:
+                rate_date = date.fromisoformat(rate_date)
+            except ValueError:
+                raise ValueError(f"Rate date must be YYYY-MM-DD, got {rate_date!r}")
+        key = rate_date or latest
+        rates = by_date.get(key)
+        if rates is None:
+            latest = table[table["Date"] <= key].drop_duplicates("Currency", keep="last") if key else table.iloc[:0]
+            rates = {currency: (rate, date) for date, currency, rate in latest.itertuples(index=False)}
+            with self._lock:
+                by_date[key] = rates
+        return rates
+
+    def rate(self, currency, rate_date=None):
+        # (rate, rate date) for one currency; ValueError if the file has no
+        # rate for it on or before rate_date. USD never reads the file.
+        currency_info(currency)
+        if currency == BASE_CURRENCY:
+            return 1.0, None
+        rates = self.rates(rate_date)
+        if currency not in rates:
+            when = f" on or before {rate_date}" if rate_date else ""
+            raise ValueError(f"No {currency} rate in {os.path.basename(self.path)}{when}")
+        return rates[currency]
+
+
+FX_RATES = FxRates()
@@ -0,0 +1,194 @@
+import io
+import csv
+import json
+import argparse
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from catalog import ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, LOGO_PATH, CatalogError, load_catalog, load_logo
+from audit_log import AUDIT_LOG
+from catalog_diff import load_quote_specs
+from currency import BASE_CURRENCY, CURRENCIES, FX_RATES, currency_info, money_number_format
+from pricing import SUMMARY_COLUMNS, QUOTE_TOTAL_KEYS, QUOTE_MONEY_KEYS, build_price_index, convert_quote, trace_quote
+from quote_pdf import PDF_PROFILES, generate_bundle_pdf
+
+# ----------------------------------------
+# Quote Exports
+# Writes priced quotes (see pricing.price_quote) as CSV, JSON or XLSX with
+# numeric cells, straight from their line items. `quotes` is an iterable of
+# (name, price_quote result); every writer consumes it one quote at a time
+# into a binary file object, so a large batch is never held in memory as a
+# formatted table. XLSX uses openpyxl's write-only mode. Amounts are in the
+# currency each quote's totals name (see pricing.convert_quote; USD when they
+# name none), rounded to its decimals, and every row records that currency.
+#   export_quotes([("Acme", result)], "xlsx", out)
+#   python exports.py --quotes saved_quotes.jsonl --format xlsx --out quotes.xlsx
+#   python exports.py --quotes saved_quotes.jsonl --format csv --currency GBP --out quotes.csv
+# --format pdf writes every quote into one bundle PDF (see quote_pdf.py).
+# The command line records every quote it exports in the audit log (see
+# audit_log.py); export_quotes itself does not.
+# ----------------------------------------
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXPORT_COLUMNS = ["Quote"] + SUMMARY_COLUMNS + ["Currency"]
+TOTAL_COLUMNS = ["Quote", "business_model", "ariento_plan"] + QUOTE_TOTAL_KEYS + ["currency", "fx_rate", "fx_rate_date"]
+MONEY_COLUMNS = {"Price Per Unit", "Total Cost"}
+MONEY_TOTALS = set(QUOTE_MONEY_KEYS)
+XLSX_WIDTHS = {"A": 24, "B": 16, "C": 60, "D": 10, "E": 16, "F": 16, "G": 10}
+
+
+def _value(value, decimals=None):
+    # NumPy scalars to plain Python; money (with its currency's decimals) is
+    # exported rounded as shown
+    if isinstance(value, np.generic):
+        value = value.item()
+    if decimals is not None and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), decimals)
+    return value
+
+
+def line_rows(name, line_items, currency=BASE_CURRENCY):
+    decimals = currency_info(currency)["decimals"]
+    for line in line_items:
+        yield [name] + [_value(line[col], decimals if col in MONEY_COLUMNS else None) for col in SUMMARY_COLUMNS] + [currency]
+
+
+def total_row(name, totals):
+    currency = totals.get("currency", BASE_CURRENCY)
+    decimals = currency_info(currency)["decimals"]
+    row = [name] + [_value(totals.get(col), decimals if col in MONEY_TOTALS else None) for col in TOTAL_COLUMNS[1:]]
+    row[TOTAL_COLUMNS.index("currency")] = currency
+    return row
+
+
+def quote_currency(result):
+    return result["totals"].get("currency", BASE_CURRENCY)
+
+
+def write_csv(quotes, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_COLUMNS)
+    for name, result in quotes:
+        writer.writerows(line_rows(name, result["line_items"], quote_currency(result)))
+    text.flush()
+    text.detach()
+
+
+def write_json(quotes, out):
+    # {"quotes": [{"name", "totals", "line_items"}, ...]}, one quote per line
+    out.write(b'{"quotes": [')
+    for i, (name, result) in enumerate(quotes):
+        quote = {
+            "name": name,
+            "totals": dict(zip(TOTAL_COLUMNS[1:], total_row(name, result["totals"])[1:])),
+            "line_items": [
+                dict(zip(EXPORT_COLUMNS[1:], row[1:])) for row in line_rows(name, result["line_items"], quote_currency(result))
+            ],
+        }
+        out.write((",\n" if i else "\n").encode() + json.dumps(quote).encode("utf-8"))
+    out.write(b"\n]}\n")
+
+
+def _header(sheet, columns):
+    cells = [WriteOnlyCell(sheet, col) for col in columns]
+    for cell in cells:
+        cell.font = Font(bold=True)
+    return cells
+
+
+def _cells(sheet, columns, row, money, currency=BASE_CURRENCY):
+    number_format = money_number_format(currency)
+    cells = []
+    for col, value in zip(columns, row):
+        cell = WriteOnlyCell(sheet, value)
+        if col in money and isinstance(value, float):
+            cell.number_format = number_format
+        cells.append(cell)
+    return cells
+
+
+def write_xlsx(quotes, out):
+    book = Workbook(write_only=True)
+    lines = book.create_sheet("Line Items")
+    totals = book.create_sheet("Totals")
+    for col, width in XLSX_WIDTHS.items():
+        lines.column_dimensions[col].width = width
+    lines.freeze_panes = totals.freeze_panes = "A2"
+    lines.append(_header(lines, EXPORT_COLUMNS))
+    totals.append(_header(totals, TOTAL_COLUMNS))
+    for name, result in quotes:
+        currency = quote_currency(result)
+        for row in line_rows(name, result["line_items"], currency):
+            lines.append(_cells(lines, EXPORT_COLUMNS, row, MONEY_COLUMNS, currency))
+        totals.append(_cells(totals, TOTAL_COLUMNS, total_row(name, result["totals"]), MONEY_TOTALS, currency))
+    book.save(out)
+
+
+WRITERS = {"csv": write_csv, "json": write_json, "xlsx": write_xlsx}
+
+
+def export_quotes(quotes, fmt, out):
+    if fmt not in WRITERS:
+        raise ValueError(f"Export format must be one of: {', '.join(WRITERS)}")
+    WRITERS[fmt](quotes, out)
+
+
+def export_bytes(quotes, fmt):
+    out = io.BytesIO()
+    export_quotes(quotes, fmt, out)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Price saved quote specs and export them as CSV, JSON or XLSX")
+    parser.add_argument("--quotes", required=True, help="Saved quote specs (JSON list or JSON lines)")
+    parser.add_argument("--format", choices=list(WRITERS) + ["pdf"], default="xlsx")
+    parser.add_argument("--out", required=True, help="Output file")
+    parser.add_argument("--ariento", default=ARIENTO_PRICING_PATH, help="Ariento Pricing workbook path or URL")
+    parser.add_argument("--service-catalogue", default=SERVICE_CATALOGUE_PATH, help="Service Catalogue workbook path or URL")
+    parser.add_argument("--company", default="Company_Name", help="Company name for the bundle PDF")
+    parser.add_argument("--logo", default=LOGO_PATH, help="Logo image path or URL for the bundle PDF")
+    parser.add_argument("--no-grand-total", action="store_true", help="Leave the grand-total page out of the bundle PDF")
+    parser.add_argument("--pdf-profile", choices=PDF_PROFILES, default="standard", help="Output profile for the bundle PDF")
+    parser.add_argument("--currency", choices=list(CURRENCIES), default=BASE_CURRENCY, help="Currency to quote in")
+    parser.add_argument("--rate-date", help="FX rate date (YYYY-MM-DD; default the latest in fx_rates.csv)")
+    args = parser.parse_args()
+
+    try:
+        index = build_price_index(load_catalog(args.ariento, args.service_catalogue))
+        rate, rate_date = FX_RATES.rate(args.currency, args.rate_date)
+    except (CatalogError, ValueError) as e:
+        raise SystemExit(str(e))
+    specs = load_quote_specs(args.quotes)
+    audit_context = {"ariento": args.ariento, "service_catalogue": args.service_catalogue, "source": args.quotes}
+
+    def priced():
+        # Each quote is priced (and converted) as the writer reaches it
+        for i, spec in enumerate(specs):
+            name = spec.get("name") or spec.get("company_name") or f"quote_{i}"
+            result, pricing = trace_quote(spec, index)
+            result = convert_quote(result, args.currency, rate, rate_date)
+            AUDIT_LOG.record(args.format, name, spec, result, pricing, **audit_context)
+            yield name, result
+
+    quotes = priced()
+    with open(args.out, "wb") as out:
+        if args.format == "pdf":
+            generate_bundle_pdf(
+                quotes, args.company, load_logo(args.logo), grand_total=not args.no_grand_total, out=out,
+                profile=args.pdf_profile,
+            )
+        else:
+            export_quotes(quotes, args.format, out)
+    print(f"Exported {len(specs)} quotes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
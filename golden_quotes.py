@@ -0,0 +1,287 @@
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import itertools
+import platform
+
+import numpy as np
+
+from catalog import REPO_DIR, ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, CatalogError, load_catalog
+from pricing import (
+    PLAN_OPTIONS, BILLING_CYCLES, M365_TERMS, ONBOARDING_TYPES, DISCOUNT_OPTIONS, DISCOUNT_SCOPES, BATCH_TOTAL_COLUMNS,
+    build_price_index, build_price_tables, format_summary, get_default_segment, price_quotes_batch, trace_quote,
+)
+
+# ----------------------------------------
+# Golden Quote Corpus
+# A generated set of quote specs covering every business model and plan,
+# Ariento billing, M365 term/billing, onboarding type, discount option and
+# scope, priced once and frozen with their totals, numeric line items,
+# formatted summary rows and warnings. Replaying the corpus prices every spec
+# again, one at a time (trace_quote + format_summary, the calls the app,
+# service and exports price with) and as one batch (price_quotes_batch), and
+# fails on any difference from the frozen values or on a throughput drop.
+# The frozen corpus was checked against the original app (quote_tool.py at
+# the baseline commit 8b416fa): each spec was entered into that script's
+# widgets and its summary table and cost totals (Ariento, Microsoft with its
+# label, service, onboarding, discount) compared with these. All 3,840
+# agreed. That form cannot enter a 0 quantity, a seat type twice or an item
+# outside the catalog, so those lines were left out of the comparison; what
+# the corpus freezes for them is today's behavior only.
+#   python golden_quotes.py --freeze     # after an intended pricing change
+#   python golden_quotes.py              # replay; exit status 1 on a failure
+# Throughput baselines are stored with the corpus and are only meaningful on
+# the machine that froze it; elsewhere pass --baseline-quote-qps and
+# --baseline-batch-qps, or --max-slowdown 1 to check the numbers alone.
+# ----------------------------------------
+GOLDEN_PATH = os.path.join(REPO_DIR, "golden", "quotes.jsonl.gz")
+GOLDEN_VERSION = 1
+# Quantities straddle small and large counts; 0 lines are skipped by pricing
+SEAT_QUANTITIES = [0, 1, 2, 5, 9, 10, 11, 24, 25, 49, 50, 99, 100, 101, 250, 500, 1000]
+# Batch totals that price_quote also reports
+BATCH_CHECK_COLUMNS = [col for col in BATCH_TOTAL_COLUMNS if col != "unmatched_lines"]
+# Differences printed before the rest are only counted
+MAX_REPORTED = 20
+
+
+# ----------------------------------------
+# Corpus
+# ----------------------------------------
+def _lines(rnd, options, count, max_qty):
+    picked = rnd.sample(options, min(len(options), count))
+    return [(item, rnd.choice([0, 1, rnd.randint(1, max_qty)])) for item in picked]
+
+
+def generate_specs(index, per_combination=2, seed=0):
+    # Every choice combination `per_combination` times, each with its own
+    # random lines; some lines are duplicated, zero or not in the catalog so
+    # those paths are frozen too
+    rnd = random.Random(seed)
+    plans = [(model, plan) for model, options in PLAN_OPTIONS.items() for plan in options]
+    meraki = list(index["meraki"])
+    resale = list(index["resale"])
+    specs = []
+    combinations = itertools.product(
+        plans, BILLING_CYCLES, M365_TERMS, M365_TERMS, ONBOARDING_TYPES, DISCOUNT_OPTIONS, DISCOUNT_SCOPES,
+    )
+    for (model, plan), billing, term, m365_billing, onboarding, discount, scope in combinations:
+        segment = get_default_segment(plan) if plan else None
+        titles = index["m365_options"].get((segment, term, m365_billing), [])
+        seats = index["seat_options"].get(plan, [])
+        for _ in range(per_combination):
+            seat_lines = [(seat, rnd.choice(SEAT_QUANTITIES)) for seat in rnd.sample(seats, min(len(seats), rnd.randint(0, 4)))]
+            if seat_lines and rnd.random() < 0.1:
+                seat_lines.append((seat_lines[0][0], rnd.randint(1, 50)))
+            m365_lines = _lines(rnd, titles, rnd.randint(0, 6), 300)
+            if rnd.random() < 0.05:
+                m365_lines.append(("Not A Catalog SKU", 1))
+            meraki_lines = _lines(rnd, meraki, rnd.randint(0, 3), 20)
+            resale_lines = _lines(rnd, resale, rnd.randint(0, 4) if model == "Resale" else rnd.randint(0, 1), 100)
+            specs.append({
+                "name": f"golden_{len(specs)}",
+                "business_model": model,
+                "plan": plan,
+                "ariento_billing": billing,
+                "seats": [{"seat_type": seat, "quantity": qty} for seat, qty in seat_lines],
+                "m365_term": term,
+                "m365_billing": m365_billing,
+                "m365": [{"sku_title": title, "quantity": qty} for title, qty in m365_lines],
+                "meraki": [{"description": desc, "quantity": qty} for desc, qty in meraki_lines],
+                "resale": [{"vendor": vendor, "item": item, "quantity": qty} for (vendor, item), qty in resale_lines],
+                "onboarding_type": onboarding,
+                "onboarding_price": rnd.choice([0.0, 1500.0, 2999.99, float(rnd.randint(1, 20000))]),
+                "discount_option": discount,
+                "discount_percentage": rnd.choice([0.0, 10.0, 12.5, 33.33, 100.0, float(rnd.randint(1, 99))]),
+                "discount_scope": scope,
+            })
+    return specs
+
+
+def _plain(value):
+    # NumPy scalars to plain Python, so frozen and replayed values compare alike
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def golden_result(spec, index):
+    result, _ = trace_quote(spec, index)
+    return {
+        "totals": {key: _plain(value) for key, value in result["totals"].items()},
+        "line_items": [{key: _plain(value) for key, value in line.items()} for line in result["line_items"]],
+        "summary": format_summary(result["line_items"]).values.tolist(),
+        "warnings": result["warnings"],
+    }
+
+
+# ----------------------------------------
+# Golden File
+# One JSON object per line, gzipped: a header with the corpus settings and
+# throughput baselines, then {"spec", "totals", "line_items", "summary",
+# "warnings"} per quote
+# ----------------------------------------
+def write_golden(path, header, specs, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # mtime 0 keeps the file byte-identical when nothing changed
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write((json.dumps(header) + "\n").encode("utf-8"))
+        for spec, result in zip(specs, results):
+            f.write((json.dumps(dict({"spec": spec}, **result)) + "\n").encode("utf-8"))
+
+
+def read_golden(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        records = [json.loads(line) for line in f if line.strip()]
+    if header.get("version") != GOLDEN_VERSION:
+        raise ValueError(f"{path} is golden corpus version {header.get('version')}, expected {GOLDEN_VERSION}")
+    return header, records
+
+
+# ----------------------------------------
+# Replay
+# ----------------------------------------
+def _timed_best(fn, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def _differences(path, expected, actual):
+    # [(path, expected, actual)] for every leaf that differs; numbers must
+    # match exactly (0 and 0.0 are equal, True and 1 are not)
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in sorted(set(expected) | set(actual)):
+            diffs += _differences(f"{path}.{key}", expected.get(key), actual.get(key))
+        return diffs
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [(f"{path} length", len(expected), len(actual))]
+        diffs = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            diffs += _differences(f"{path}[{i}]", e, a)
+        return diffs
+    if expected != actual or isinstance(expected, bool) != isinstance(actual, bool):
+        return [(path, expected, actual)]
+    return []
+
+
+def replay(records, index, tables, repeats=3):
+    # ([(quote name, path, expected, actual)], quote seconds, batch seconds)
+    specs = [record["spec"] for record in records]
+    results, quote_seconds = _timed_best(lambda: [golden_result(spec, index) for spec in specs], repeats)
+    batch, batch_seconds = _timed_best(lambda: price_quotes_batch(specs, tables), repeats)
+
+    diffs = []
+    for spec, record, result in zip(specs, records, results):
+        expected = {key: record[key] for key in ("totals", "line_items", "summary", "warnings")}
+        diffs += [(spec["name"], *diff) for diff in _differences("", expected, result)]
+    for spec, record, row in zip(specs, records, batch[BATCH_CHECK_COLUMNS].itertuples(index=False)):
+        for col, value in zip(BATCH_CHECK_COLUMNS, row):
+            if value != record["totals"][col]:
+                diffs.append((spec["name"], f"batch.{col}", record["totals"][col], _plain(value)))
+    return diffs, quote_seconds, batch_seconds
+
+
+def _throughput_check(name, qps, baseline, max_slowdown):
+    # A message when qps is more than max_slowdown below baseline, else None
+    floor = baseline * (1.0 - max_slowdown)
+    status = "ok" if qps >= floor else "SLOW"
+    print(f"{name:<8}{qps:>12,.0f}{baseline:>14,.0f}{100.0 * (qps / baseline - 1.0):>+9.1f}%  {status}")
+    if qps < floor:
+        return f"{name} throughput {qps:,.0f} quotes/s is below {floor:,.0f} ({100 * max_slowdown:.0f}% under {baseline:,.0f})"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the golden quote corpus, or freeze a new one")
+    parser.add_argument("--freeze", action="store_true", help="Generate and price the corpus and write it as the new golden file")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden corpus file")
+    parser.add_argument("--per-combination", type=int, default=2, help="Specs per choice combination when freezing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the corpus; the fastest counts")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="Allowed throughput drop, as a fraction of the baseline")
+    parser.add_argument("--baseline-quote-qps", type=float, help="One-at-a-time baseline instead of the stored one")
+    parser.add_argument("--baseline-batch-qps", type=float, help="Batch baseline instead of the stored one")
+    parser.add_argument("--ariento", default=ARIENTO_PRICING_PATH, help="Ariento Pricing workbook path or URL")
+    parser.add_argument("--service-catalogue", default=SERVICE_CATALOGUE_PATH, help="Service Catalogue workbook path or URL")
+    args = parser.parse_args()
+
+    try:
+        catalog = load_catalog(args.ariento, args.service_catalogue)
+    except CatalogError as e:
+        raise SystemExit(str(e))
+    index = build_price_index(catalog)
+    tables = build_price_tables(catalog)
+
+    if args.freeze:
+        specs = generate_specs(index, args.per_combination, args.seed)
+        records = [{"spec": spec} for spec in specs]
+        results = [golden_result(spec, index) for spec in specs]
+        # The freeze's own replay sets the baselines and checks the batch path agrees
+        records = [dict(record, **result) for record, result in zip(records, results)]
+        diffs, quote_seconds, batch_seconds = replay(records, index, tables, args.repeats)
+        if diffs:
+            for name, path, expected, actual in diffs[:MAX_REPORTED]:
+                print(f"{name}{path}: price_quote {expected!r}, batch {actual!r}")
+            raise SystemExit(f"Not frozen: batch pricing disagrees with price_quote on {len(diffs)} values")
+        header = {
+            "version": GOLDEN_VERSION,
+            "quotes": len(specs),
+            "per_combination": args.per_combination,
+            "seed": args.seed,
+            "ariento": os.path.basename(args.ariento),
+            "service_catalogue": os.path.basename(args.service_catalogue),
+            "quote_qps": len(specs) / quote_seconds,
+            "batch_qps": len(specs) / batch_seconds,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        }
+        write_golden(args.golden, header, specs, results)
+        print(f"Froze {len(specs)} quotes to {args.golden}: {header['quote_qps']:,.0f} quotes/s one at a time, "
+              f"{header['batch_qps']:,.0f} quotes/s batched")
+        return
+
+    try:
+        header, records = read_golden(args.golden)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    diffs, quote_seconds, batch_seconds = replay(records, index, tables, args.repeats)
+    print(f"Replayed {len(records)} golden quotes from {args.golden}")
+    failures = []
+    if diffs:
+        for name, path, expected, actual in diffs[:MAX_REPORTED]:
+            print(f"  {name}{path}: expected {expected!r}, got {actual!r}")
+        if len(diffs) > MAX_REPORTED:
+            print(f"  ... and {len(diffs) - MAX_REPORTED} more")
+        quotes = len({name for name, *_ in diffs})
+        failures.append(f"{len(diffs)} values differ across {quotes} quotes")
+    else:
+        print("Every total, line item, summary row and warning matches")
+
+    print(f"{'path':<8}{'quotes/s':>12}{'baseline':>14}{'change':>10}")
+    for name, seconds, baseline in (
+        ("quote", quote_seconds, args.baseline_quote_qps or header["quote_qps"]),
+        ("batch", batch_seconds, args.baseline_batch_qps or header["batch_qps"]),
+    ):
+        failure = _throughput_check(name, len(records) / seconds, baseline, args.max_slowdown)
+        if failure:
+            failures.append(failure)
+
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print("PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os
+import time
+import random
+import argparse
+import multiprocessing
+
+import numpy as np
+
+# The app reads the repo's local workbooks and logo instead of fetching them
+os.environ["QUOTE_TOOL_OFFLINE"] = "1"
+
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+
+from catalog import REPO_DIR, ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, load_catalog
+from pricing import PLAN_OPTIONS, build_price_index, get_default_segment
+import pdf_queue
+
+# ----------------------------------------
+# Load test for quote_tool.py
+# Drives scripted sessions through the Streamlit app headlessly with AppTest.
+# AppTest holds one global runtime per process, so concurrent sessions each
+# run in their own forked process (with a one-worker PDF queue) and compete
+# for the machine's CPUs. A Streamlit server runs its sessions as threads
+# of one process, sharing one interpreter lock, so the 1-session rate is the
+# ceiling of a single server process. A session:
+#   setup     loads the app, enters a company and picks a business model/plan
+#   line      adds seat, M365, Meraki and (for Resale) resale lines, picking
+#             each item and then its quantity (two reruns per line)
+#   discount  applies a percentage discount to the full quote
+#   export    reruns (as the page's poll would) until the PDF is rendered;
+#             the CSV/Excel/JSON files are only built on click, which
+#             AppTest cannot do
+# The session counts in --sessions run one after another. Each count reports
+# rerun latency percentiles per step, reruns per second and the resident
+# memory a session adds, and the summary names the count where throughput
+# peaks and where p95 latency passes --slo-ms.
+#   python loadtest_app.py --sessions 1,4,8,16 --lines 50
+# ----------------------------------------
+APP_PATH = os.path.join(REPO_DIR, "quote_tool.py")
+STEPS = ["setup", "line", "discount", "export"]
+# Reruns while waiting for a PDF before the session is counted as failed
+MAX_EXPORT_POLLS = 600
+PDF_POLL_SECONDS = 0.05
+
+# AppTest compiles the script afresh on every run, where a server compiles it
+# once for all its sessions. Share one compiled script, so reruns are timed
+# as on a server
+_SHARED_SCRIPTS = ScriptCache()
+_get_bytecode = ScriptCache.get_bytecode
+ScriptCache.get_bytecode = lambda self, script_path: _get_bytecode(_SHARED_SCRIPTS, script_path)
+
+
+def rss_bytes():
+    # Current resident set size (Linux), 0 where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+# ----------------------------------------
+# Session Scripts
+# A script is a list of (step, widget kind, widget key, value) actions, each
+# followed by one rerun. Items are drawn from the catalog so every selection
+# is one the app offers.
+# ----------------------------------------
+def _line_actions(item_key, qty_key, items, rnd, max_qty):
+    actions = []
+    for i, item in enumerate(items):
+        actions.append(("line", "selectbox", f"{item_key}_{i}", item))
+        actions.append(("line", "number_input", f"{qty_key}_{i}", rnd.randint(1, max_qty)))
+    return actions
+
+
+def build_script(index, lines, rnd):
+    business_model = rnd.choice(list(PLAN_OPTIONS))
+    plan = rnd.choice(PLAN_OPTIONS[business_model])
+    actions = [
+        ("setup", "text_input", "company_name", f"Load Test {rnd.randint(1, 9999)}"),
+        ("setup", "radio", "business_model", business_model),
+    ]
+    if business_model == "Enclave One":
+        actions.append(("setup", "selectbox", "enclave_option", plan))
+    elif business_model == "Custom Enclave":
+        segment = "GCC-H" if "GCC-High" in plan else "GCC" if "(GCC)" in plan else "Commercial"
+        actions.append(("setup", "selectbox", "custom_segment", segment))
+        actions.append(("setup", "selectbox", f"custom_option_{segment}", plan))
+
+    remaining = lines
+    if business_model == "Resale":
+        resale = rnd.sample(list(index["resale"]), min(len(index["resale"]), remaining // 3))
+        for i, (vendor, item) in enumerate(resale):
+            actions.append(("line", "selectbox", f"resale_vendor_{i}", vendor))
+            actions.append(("line", "selectbox", f"resale_item_{i}", item))
+            actions.append(("line", "number_input", f"resale_qty_{i}", rnd.randint(1, 50)))
+        remaining -= len(resale)
+    else:
+        seats = index["seat_options"].get(plan, [])
+        seats = rnd.sample(seats, min(len(seats), 3, remaining))
+        actions += _line_actions("seat_type", "seat_qty", seats, rnd, 200)
+        remaining -= len(seats)
+
+    segment = get_default_segment(plan) if plan else None
+    titles = index["m365_options"].get((segment, "Annual", "Annual"), [])
+    m365 = rnd.sample(titles, min(len(titles), (remaining * 3) // 5))
+    actions += _line_actions("m365_sku", "m365_qty", m365, rnd, 200)
+    remaining -= len(m365)
+    meraki = rnd.sample(list(index["meraki"]), min(len(index["meraki"]), remaining))
+    actions += _line_actions("meraki_desc", "meraki_qty", meraki, rnd, 10)
+
+    actions.append(("discount", "selectbox", "discount_option", "Percentage Discount"))
+    actions.append(("discount", "number_input", "discount_percentage", float(rnd.randint(5, 25))))
+    return actions
+
+
+# ----------------------------------------
+# Running Sessions
+# ----------------------------------------
+def _timed_run(at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def _pdf_ready(at):
+    return any(button.proto.label == "Download Summary as PDF" for button in at.get("download_button"))
+
+
+def _export(at, timeout, timings):
+    for _ in range(MAX_EXPORT_POLLS):
+        timings.append(("export", _timed_run(at, timeout)))
+        if _pdf_ready(at):
+            return
+        time.sleep(PDF_POLL_SECONDS)
+    raise RuntimeError("PDF was not rendered")
+
+
+def run_session(script, timeout):
+    # (the live AppTest, [(step, seconds)] per rerun)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings = [("setup", _timed_run(at, timeout))]
+    for step, kind, key, value in script:
+        getattr(at, kind)(key=key).set_value(value)
+        timings.append((step, _timed_run(at, timeout)))
+    _export(at, timeout, timings)
+    return at, timings
+
+
+def _session_process(script, timeout, results):
+    # One session in a forked process; puts ([(step, seconds)], bytes of
+    # resident memory added while its AppTest is alive, error or None)
+    pdf_queue.RENDER_QUEUE = pdf_queue.PdfRenderQueue(workers=1)
+    rss_before = rss_bytes()
+    try:
+        at, timings = run_session(script, timeout)
+        error = None
+    except Exception as e:
+        timings, error = [], str(e)
+    rss_added = rss_bytes() - rss_before
+    pdf_queue.RENDER_QUEUE.shutdown()
+    results.put((timings, rss_added, error))
+
+
+def run_level(scripts, timeout):
+    # All sessions at once, one process each. Processes are forked and given
+    # their target directly: AppTest swaps out __main__, so a Pool could not
+    # pickle a function from this script
+    context = multiprocessing.get_context("fork")
+    queue = context.SimpleQueue()
+    start = time.perf_counter()
+    processes = [context.Process(target=_session_process, args=(script, timeout, queue)) for script in scripts]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    timings = [t for session_timings, _, _ in results for t in session_timings]
+    rss_per_session = float(np.mean([rss for _, rss, _ in results]))
+    errors = [error for _, _, error in results if error]
+    return timings, elapsed, rss_per_session, errors
+
+
+# ----------------------------------------
+# Report
+# ----------------------------------------
+def _ms(values, pct):
+    return float(np.percentile(np.asarray(values) * 1000.0, pct)) if values else 0.0
+
+
+def print_level(sessions, timings, elapsed, rss_per_session, errors):
+    reruns = len(timings)
+    print(f"Sessions: {sessions} | Duration: {elapsed:.1f}s | Reruns: {reruns} | Throughput: {reruns / elapsed:.1f} reruns/s "
+          f"| Memory: {rss_per_session / 2**20:.1f} MB per session | Failed sessions: {len(errors)}")
+    print(f"{'step':<10}{'reruns':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step in STEPS + ["all"]:
+        values = [t for s, t in timings if step in (s, "all")]
+        if values:
+            print(f"{step:<10}{len(values):>8}{_ms(values, 50):>10.1f}{_ms(values, 95):>10.1f}"
+                  f"{_ms(values, 99):>10.1f}{max(values) * 1000:>10.1f}")
+    for message in sorted(set(errors)):
+        print(f"  error: {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit quote tool with headless sessions")
+    parser.add_argument("--sessions", default="1,2,4,8", help="Comma-separated concurrent session counts to run in turn")
+    parser.add_argument("--lines", type=int, default=20, help="Line items per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds one rerun may take")
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p95 rerun latency considered acceptable")
+    args = parser.parse_args()
+
+    index = build_price_index(load_catalog(ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH))
+    rnd = random.Random(args.seed)
+    # One warm-up session fills the catalog cache and compiles the script
+    # before the sessions are forked
+    run_session(build_script(index, 2, rnd), args.timeout)
+    pdf_queue.RENDER_QUEUE.shutdown()
+    print(f"CPUs: {os.cpu_count()} | Lines per session: {args.lines}")
+    print()
+
+    summary = []
+    for sessions in [int(n) for n in args.sessions.split(",")]:
+        scripts = [build_script(index, args.lines, rnd) for _ in range(sessions)]
+        timings, elapsed, rss_per_session, errors = run_level(scripts, args.timeout)
+        print_level(sessions, timings, elapsed, rss_per_session, errors)
+        print()
+        summary.append((sessions, len(timings) / elapsed, _ms([t for _, t in timings], 95)))
+
+    print(f"{'sessions':<10}{'reruns/s':>10}{'p95 ms':>10}")
+    for sessions, throughput, p95 in summary:
+        print(f"{sessions:<10}{throughput:>10.1f}{p95:>10.1f}")
+    peak = max(summary, key=lambda row: row[1])
+    print(f"Throughput peaks at {peak[1]:.1f} reruns/s with {peak[0]} sessions")
+    over = [row for row in summary if row[2] > args.slo_ms]
+    if over:
+        print(f"p95 rerun latency first exceeds {args.slo_ms:.0f} ms at {over[0][0]} sessions")
+    else:
+        print(f"p95 rerun latency stays under {args.slo_ms:.0f} ms at every session count")
+
+
+if __name__ == "__main__":
+    main()
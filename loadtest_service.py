@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import aiohttp
+
+# ----------------------------------------
+# Load test for quote_service.py
+# Runs a fixed number of concurrent clients against a running service for a
+# set duration, mixing pricing, PDF and catalog requests, then prints a
+# throughput / latency report per endpoint.
+#   python quote_service.py &
+#   python loadtest_service.py --concurrency 32 --duration 20
+# ----------------------------------------
+DEFAULT_MIX = {"quote": 0.7, "catalog": 0.2, "pdf": 0.1}
+
+
+async def build_specs(session, base_url, count, seed):
+    # Build realistic quote specs from the service's own catalog listing
+    rnd = random.Random(seed)
+    plans = {
+        "Enclave One": ["Enclave One (GCC)", "Enclave One (GCC-H)"],
+        "MSSP": ["MSSP"],
+    }
+    async with session.get(f"{base_url}/catalog", params={"kind": "meraki", "limit": 1000}) as resp:
+        meraki = [e["description"] for e in (await resp.json())["results"]]
+    specs = []
+    for _ in range(count):
+        business_model = rnd.choice(list(plans))
+        plan = rnd.choice(plans[business_model])
+        async with session.get(f"{base_url}/catalog", params={"kind": "seats", "plan": plan, "limit": 100}) as resp:
+            seats = [e["seat_type"] for e in (await resp.json())["results"]]
+        async with session.get(f"{base_url}/catalog", params={"kind": "m365", "plan": plan, "limit": 5000}) as resp:
+            m365 = [e for e in (await resp.json())["results"] if e["term"] == "Annual" and e["billing"] == "Annual"]
+        specs.append({
+            "company_name": "Load Test Co",
+            "business_model": business_model,
+            "plan": plan,
+            "ariento_billing": rnd.choice(["Monthly", "Annual"]),
+            "seats": [{"seat_type": s, "quantity": rnd.randint(1, 50)} for s in rnd.sample(seats, min(3, len(seats)))],
+            "m365_term": "Annual",
+            "m365_billing": "Annual",
+            "m365": [{"sku_title": e["sku_title"], "quantity": rnd.randint(1, 50)} for e in rnd.sample(m365, min(5, len(m365)))],
+            "meraki": [{"description": d, "quantity": rnd.randint(1, 4)} for d in rnd.sample(meraki, min(3, len(meraki)))],
+            "onboarding_type": "One Time Onboarding Payment",
+            "discount_option": rnd.choice(["No Discount", "10% Discount"]),
+        })
+    return specs
+
+
+async def client(session, base_url, specs, mix, deadline, latencies, errors, rnd):
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    while time.perf_counter() < deadline:
+        kind = rnd.choices(kinds, weights)[0]
+        start = time.perf_counter()
+        try:
+            if kind == "quote":
+                resp = await session.post(f"{base_url}/quote", json=rnd.choice(specs))
+            elif kind == "pdf":
+                resp = await session.post(f"{base_url}/quote/pdf", json=rnd.choice(specs))
+            else:
+                resp = await session.get(f"{base_url}/catalog", params={"kind": "m365", "q": rnd.choice(["e3", "e5", "teams", "defender"])})
+            await resp.read()
+            if resp.status != 200:
+                errors[kind] = errors.get(kind, 0) + 1
+                continue
+        except aiohttp.ClientError:
+            errors[kind] = errors.get(kind, 0) + 1
+            continue
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def print_report(latencies, errors, elapsed, concurrency):
+    total = sum(len(v) for v in latencies.values())
+    print(f"Concurrency: {concurrency} | Duration: {elapsed:.1f}s | Requests: {total} | Throughput: {total / elapsed:.1f} req/s")
+    print(f"{'endpoint':<10}{'count':>8}{'req/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for kind in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(kind, []))
+        mean = statistics.mean(values) if values else 0.0
+        print(
+            f"{kind:<10}{len(values):>8}{len(values) / elapsed:>10.1f}{mean * 1000:>10.1f}"
+            f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+            f"{percentile(values, 99) * 1000:>10.1f}{(values[-1] if values else 0) * 1000:>10.1f}{errors.get(kind, 0):>8}"
+        )
+
+
+async def run(args):
+    base_url = args.url.rstrip("/")
+    mix = {"quote": args.quote_weight, "catalog": args.catalog_weight, "pdf": args.pdf_weight}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        specs = await build_specs(session, base_url, args.specs, args.seed)
+        latencies, errors = {}, {}
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            client(session, base_url, specs, mix, deadline, latencies, errors, random.Random(args.seed + i))
+            for i in range(args.concurrency)
+        ))
+        print_report(latencies, errors, time.perf_counter() - start, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the quote-pricing service")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--specs", type=int, default=20, help="Distinct quote specs to cycle through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quote-weight", type=float, default=DEFAULT_MIX["quote"])
+    parser.add_argument("--catalog-weight", type=float, default=DEFAULT_MIX["catalog"])
+    parser.add_argument("--pdf-weight", type=float, default=DEFAULT_MIX["pdf"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import pickle
+import hashlib
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import date
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from quote_pdf import generate_pdf, generate_scenario_pdf
+
+# ----------------------------------------
+# Background PDF Rendering
+# The Streamlit app submits PDF exports to one process-wide render queue
+# instead of building them on the script thread. A job is keyed on a hash of
+# its inputs and the render date, so reruns and identical quotes share one
+# render. The PDF is stamped with the time it was rendered, so a finished PDF
+# is only kept for PDF_RESULT_SECONDS; after that the same request renders
+# it again. A failed render is reported for PDF_RETRY_SECONDS and then
+# forgotten, so a later request tries it again. Admission control caps the
+# jobs waiting or rendering at once: a submit beyond the cap is turned away
+# and the caller shows a "rendering..." status and retries on its next poll
+# instead of blocking.
+#   state, pdf_bytes = RENDER_QUEUE.request("quote", summary_df, company_name, totals, logo_bytes)
+# Concurrency and the cap come from QUOTE_PDF_WORKERS / QUOTE_PDF_QUEUE_LIMIT.
+# ----------------------------------------
+PDF_WORKERS = int(os.environ.get("QUOTE_PDF_WORKERS", 2))
+PDF_QUEUE_LIMIT = int(os.environ.get("QUOTE_PDF_QUEUE_LIMIT", 16))
+# Finished PDFs kept for the sessions polling for them, and for how long
+PDF_KEEP_RESULTS = 64
+PDF_RESULT_SECONDS = 600
+# How long a failed render is reported before the same job can be retried
+PDF_RETRY_SECONDS = 10
+# Recent jobs the wait and render time percentiles are taken over
+METRIC_WINDOW = 500
+RENDERERS = {"quote": generate_pdf, "scenarios": generate_scenario_pdf}
+
+logger = logging.getLogger("pdf_queue")
+
+
+def _render(kind, args):
+    # Runs in a worker process; wall-clock stamps are comparable across processes
+    started = time.time()
+    pdf = RENDERERS[kind](*args)
+    return pdf, started, time.time()
+
+
+@contextmanager
+def _worker_main():
+    # A spawned worker first imports the parent's __main__, which under
+    # Streamlit is the app script: every worker would run the whole app (and
+    # fail starting its own pool while it bootstraps). Workers are started
+    # with this module standing in as __main__ instead; it has no side effects.
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        yield
+    finally:
+        # Leave alone a __main__ another session's script run has installed since
+        if sys.modules["__main__"] is sys.modules[__name__]:
+            sys.modules["__main__"] = main
+
+
+def job_key(kind, args):
+    # The PDF shows the date it was rendered, so the key includes it
+    job = (kind, args, date.today().isoformat())
+    return hashlib.sha256(pickle.dumps(job, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None}
+    p50, p95 = np.percentile(np.asarray(values) * 1000.0, [50, 95])
+    return {"p50": round(float(p50), 1), "p95": round(float(p95), 1)}
+
+
+class PdfRenderQueue:
+    def __init__(self, workers=PDF_WORKERS, max_pending=PDF_QUEUE_LIMIT, keep_results=PDF_KEEP_RESULTS,
+                 result_seconds=PDF_RESULT_SECONDS, retry_seconds=PDF_RETRY_SECONDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep_results = keep_results
+        self.result_seconds = result_seconds
+        self.retry_seconds = retry_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        # key: (state, pdf bytes or error message, time.monotonic() it finished)
+        self._results = OrderedDict()
+        self._waits = deque(maxlen=METRIC_WINDOW)
+        self._renders = deque(maxlen=METRIC_WINDOW)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _pool(self):
+        # Started on first use. Workers are spawned, never forked: the
+        # Streamlit server (like the audit log writer) runs threads whose held
+        # locks a forked child would inherit. They start as jobs are submitted,
+        # always inside _worker_main.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def submit(self, kind, *args):
+        # The job key, or None when the queue is full
+        return self._submit(job_key(kind, args), kind, args)
+
+    def _submit(self, key, kind, args):
+        with self._lock:
+            if key in self._pending or self._result(key) is not None:
+                return key
+            if len(self._pending) >= self.max_pending:
+                self.rejected += 1
+                return None
+            submitted = time.time()
+            with _worker_main():
+                try:
+                    future = self._pool().submit(_render, kind, args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for memory): start a fresh pool
+                    logger.warning("PDF worker pool broke, restarting it")
+                    self._executor = None
+                    future = self._pool().submit(_render, kind, args)
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._finish(key, submitted, f))
+        return key
+
+    def _finish(self, key, submitted, future):
+        try:
+            pdf, started, finished = future.result()
+            result = ("done", pdf, time.monotonic())
+        except Exception as e:
+            logger.exception("PDF render failed")
+            result = ("failed", str(e), time.monotonic())
+            started = finished = None
+        with self._lock:
+            self._pending.pop(key, None)
+            self._results[key] = result
+            while len(self._results) > self.keep_results:
+                self._results.popitem(last=False)
+            if started is None:
+                self.failed += 1
+            else:
+                self.completed += 1
+                self._waits.append(max(started - submitted, 0.0))
+                self._renders.append(finished - started)
+
+    def _result(self, key):
+        # The kept result for key, dropping it once it is too old (the lock is held)
+        result = self._results.get(key)
+        if result is None:
+            return None
+        state, value, finished = result
+        if time.monotonic() - finished > (self.retry_seconds if state == "failed" else self.result_seconds):
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return state, value
+
+    def status(self, key):
+        # ("done", pdf bytes), ("failed", message), ("rendering", None) or
+        # (None, None) for a key the queue does not know (or no longer keeps)
+        with self._lock:
+            result = self._result(key)
+            if result is not None:
+                return result
+            if key in self._pending:
+                return "rendering", None
+        return None, None
+
+    def request(self, kind, *args):
+        # Submit-or-poll in one call: ("done", pdf bytes), ("failed", message),
+        # ("rendering", None), or ("busy", None) when the queue is full
+        key = job_key(kind, args)
+        state, value = self.status(key)
+        if state is not None:
+            return state, value
+        if self._submit(key, kind, args) is None:
+            return "busy", None
+        return self.status(key)
+
+    def metrics(self):
+        with self._lock:
+            running = sum(1 for future in self._pending.values() if future.running())
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": len(self._pending) - running,
+                "rendering": running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_ms": _percentiles(list(self._waits)),
+                "render_ms": _percentiles(list(self._renders)),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+RENDER_QUEUE = PdfRenderQueue()
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import hashlib
+import pickle
+import argparse
+import logging
+import threading
+from collections import OrderedDict
+
+from catalog import REPO_DIR, CATALOG_CACHE_DIR, CatalogError
+from catalog_shards import SHARD_CACHE, load_catalog_shards
+
+# ----------------------------------------
+# Price Books
+# A price book is a named pair of workbook sources (Ariento Pricing and
+# Service Catalogue), e.g. one per partner channel, listed in
+# price_books.json (or the file QUOTE_PRICE_BOOKS names); the first book is
+# the default. Sources are URLs or paths relative to the repository.
+# Compiled catalogs (catalog_shards.CatalogShards with their price index
+# built) are kept in one process-wide LRU bounded by their in-memory size, so
+# every session quoting from a book shares one parse. A cached book is checked
+# against its workbooks again once it is PRICE_BOOK_TTL_SECONDS old, on a
+# background thread: sessions keep getting the cached book until the check
+# finishes, and it is kept as it is if no sheet changed or the check fails.
+# Plan and segment shards stay in catalog_shards.SHARD_CACHE, which every
+# book shares.
+# Each book has its own directory under the catalog cache (book_cache_dir),
+# since loading a catalog prunes the cached tables and shards of any other
+# version of its sheets in the directory it uses.
+#   books = load_price_books()
+#   shards = PRICE_BOOK_CACHE.get(books["Ariento"])
+#   python price_books.py --load
+# ----------------------------------------
+PRICE_BOOKS_PATH = os.environ.get("QUOTE_PRICE_BOOKS") or os.path.join(REPO_DIR, "price_books.json")
+PRICE_BOOK_CACHE_BYTES = 256 * 2**20
+PRICE_BOOK_TTL_SECONDS = 300
+# Price index entries held by the book itself (the rest are shard lookups)
+BOOK_INDEX_KEYS = ["meraki", "resale", "seat_tiers"]
+
+logger = logging.getLogger("catalog")
+
+
+def _source(source):
+    if source.startswith("http://") or source.startswith("https://") or os.path.isabs(source):
+        return source
+    return os.path.join(REPO_DIR, source)
+
+
+def book_cache_dir(book, cache_dir=CATALOG_CACHE_DIR):
+    # The book's own catalog cache directory, keyed on its name and sources
+    digest = hashlib.sha256(f"{book['name']}\n{book['ariento']}\n{book['service_catalogue']}".encode())
+    return os.path.join(cache_dir, "books", digest.hexdigest()[:16])
+
+
+def load_price_books(path=PRICE_BOOKS_PATH):
+    # {name: book} in file order, the default first; ValueError for a malformed file
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read price books from {path}: {e}")
+    books = {}
+    for book in data.get("price_books", []):
+        name = book.get("name")
+        if not name or not book.get("ariento") or not book.get("service_catalogue"):
+            raise ValueError("Every price book needs a name, an ariento source and a service_catalogue source")
+        if name in books:
+            raise ValueError(f"Price book {name!r} is defined twice")
+        books[name] = {
+            "name": name,
+            "description": book.get("description", ""),
+            "ariento": _source(book["ariento"]),
+            "service_catalogue": _source(book["service_catalogue"]),
+        }
+    if not books:
+        raise ValueError(f"{path} lists no price books")
+    return books
+
+
+def catalog_bytes(shards):
+    # In-memory size of a compiled catalog: its loaded tables and report plus
+    # the price index entries it holds (shards are counted by SHARD_CACHE)
+    size = sum(int(df.memory_usage(deep=True).sum()) for df in shards.tables.values())
+    size += int(shards.validation_report.memory_usage(deep=True).sum())
+    index = shards.price_index()
+    return size + len(pickle.dumps({key: index[key] for key in BOOK_INDEX_KEYS}, pickle.HIGHEST_PROTOCOL))
+
+
+class PriceBookCache:
+    # Thread-safe LRU of compiled price books shared by every session in the
+    # process, bounded by catalog_bytes. A missing book is loaded by one
+    # session at a time; the others wait for it rather than parse it too. A
+    # book past its TTL is served as it is while one background refresh runs.
+    def __init__(self, max_bytes=PRICE_BOOK_CACHE_BYTES, ttl=PRICE_BOOK_TTL_SECONDS, cache_dir=CATALOG_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        # key: lock held while the book is loaded or refreshed; dropped when done
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def _cached(self, key, book):
+        # The cached shards for key, starting a refresh if they are past the
+        # TTL and none is running (the lock is held)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if time.monotonic() - entry["checked"] >= self.ttl and key not in self._loading:
+            key_lock = self._loading[key] = threading.Lock()
+            threading.Thread(
+                target=self._refresh, args=(key, book, entry, key_lock), name="price-book-refresh", daemon=True,
+            ).start()
+        return entry["shards"]
+
+    def _done(self, key, key_lock):
+        with self._lock:
+            if self._loading.get(key) is key_lock:
+                del self._loading[key]
+
+    def get(self, book):
+        # CatalogShards for a price book; CatalogError if its workbooks cannot be loaded
+        key = (book["name"], book["ariento"], book["service_catalogue"])
+        with self._lock:
+            shards = self._cached(key, book)
+            if shards is not None:
+                return shards
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                shards = self._cached(key, book)
+                if shards is not None:
+                    return shards
+            try:
+                return self._load(key, book, None)
+            finally:
+                self._done(key, key_lock)
+
+    def _refresh(self, key, book, cached, key_lock):
+        with key_lock:
+            try:
+                self._load(key, book, cached)
+            except Exception as e:
+                # Keep serving the cached book; check again after another TTL
+                logger.warning("Price book %r: could not check its workbooks, keeping the cached book: %s", book["name"], e)
+                with self._lock:
+                    cached["checked"] = time.monotonic()
+            finally:
+                self._done(key, key_lock)
+
+    def _load(self, key, book, cached):
+        # Loads the book (cached: the entry being refreshed, or None) and stores it
+        start = time.perf_counter()
+        shards = load_catalog_shards(
+            book["ariento"], book["service_catalogue"], cache_dir=book_cache_dir(book, self.cache_dir),
+        )
+        unchanged = cached is not None and cached["shards"].version == shards.version
+        if unchanged:
+            # No sheet changed: keep the compiled book (and its built index)
+            shards, size = cached["shards"], cached["bytes"]
+        else:
+            size = catalog_bytes(shards)
+            logger.info("Price book %r: compiled in %.1f ms (%d bytes)", book["name"],
+                        1000 * (time.perf_counter() - start), size)
+        with self._lock:
+            if unchanged:
+                self.refreshes += 1
+            else:
+                self.misses += 1
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old["bytes"]
+            self._entries[key] = {"shards": shards, "bytes": size, "checked": time.monotonic()}
+            self.bytes += size
+            # The newest book always stays, even if it alone is over the limit
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted["bytes"]
+                self.evictions += 1
+        return shards
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "books": [key[0] for key in self._entries], "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "refreshes": self.refreshes, "evictions": self.evictions,
+            }
+
+
+PRICE_BOOK_CACHE = PriceBookCache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the price books and time loading them through the shared cache")
+    parser.add_argument("--books", default=PRICE_BOOKS_PATH, help="Price books file")
+    parser.add_argument("--load", action="store_true", help="Load every price book twice (cold, then cached)")
+    parser.add_argument("--max-bytes", type=int, default=PRICE_BOOK_CACHE_BYTES, help="Cache size limit for --load")
+    args = parser.parse_args()
+
+    try:
+        books = load_price_books(args.books)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"{'price book':<28}{'ariento':<40}service catalogue")
+    for name, book in books.items():
+        print(f"{name:<28}{os.path.basename(book['ariento']):<40}{os.path.basename(book['service_catalogue'])}")
+    if not args.load:
+        return
+
+    cache = PriceBookCache(max_bytes=args.max_bytes)
+    print()
+    print(f"{'price book':<28}{'version':<18}{'MB':>8}{'cold ms':>10}{'cached us':>11}")
+    for name, book in books.items():
+        try:
+            start = time.perf_counter()
+            shards = cache.get(book)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            cache.get(book)
+            cached = time.perf_counter() - start
+        except CatalogError as e:
+            print(f"{name:<28}{e}")
+            continue
+        print(f"{name:<28}{shards.version[:16]:<18}{catalog_bytes(shards) / 2**20:>8.2f}"
+              f"{cold * 1000:>10.1f}{cached * 1e6:>11.1f}")
+    print()
+    print(f"Price books: {cache.stats()}")
+    print(f"Shards: {SHARD_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()
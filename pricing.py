@@ -0,0 +1,559 @@
+import numpy as np
+import pandas as pd
+
+from currency import BASE_CURRENCY, convert_amounts, currency_info, format_money
+from pricing_rules import RULES
+from tiers import compile_tiers, seat_cost, seat_costs
+
+# ----------------------------------------
+# Quote Options (mirrors the choices offered in quote_tool.py)
+# ----------------------------------------
+BUSINESS_MODELS = ["Enclave One", "Custom Enclave", "MSSP", "Resale"]
+PLAN_OPTIONS = {
+    "Enclave One": ["Enclave One (GCC)", "Enclave One (GCC-H)"],
+    "Custom Enclave": [
+        "Professional Plan (Commercial)", "Enterprise Plan (Commercial)",
+        "Turnkey CMMC Level 2 Plan (GCC)", "Turnkey CMMC Level 3 Plan (GCC)",
+        "Turnkey CMMC Level 2 Plan (GCC-High)", "Turnkey CMMC Level 3 Plan (GCC-High)",
+    ],
+    "MSSP": ["MSSP"],
+    "Resale": [None],
+}
+BILLING_CYCLES = ["Monthly", "Annual"]
+M365_TERMS = ["Annual", "Monthly"]
+ONBOARDING_TYPES = ["One Time Onboarding Payment", "Other", "None"]
+DISCOUNT_OPTIONS = ["No Discount", "30 Days Free", "10% Discount", "Percentage Discount"]
+DISCOUNT_SCOPES = ["Ariento Licenses Only", "Ariento Licenses + Onboarding"]
+# The options each choice field of a quote spec takes
+SPEC_CHOICES = {
+    "business_model": BUSINESS_MODELS,
+    "ariento_billing": BILLING_CYCLES,
+    "m365_term": M365_TERMS,
+    "m365_billing": M365_TERMS,
+    "onboarding_type": ONBOARDING_TYPES,
+    "discount_option": DISCOUNT_OPTIONS,
+    "discount_scope": DISCOUNT_SCOPES,
+}
+SUMMARY_COLUMNS = ["Category", "Item", "Quantity", "Price Per Unit", "Total Cost"]
+
+
+def is_gcc_high(plan):
+    return plan is not None and ("GCC-H" in plan or "GCCH" in plan)
+
+
+def get_default_segment(plan):
+    if "GCC-H" in plan or "GCCH" in plan:
+        return "GCC-High NON GOV"
+    elif "GCC" in plan:
+        return "GCC"
+    elif "Commercial" in plan:
+        return "Commercial"
+    else:
+        return None
+
+
+# ----------------------------------------
+# Price Index
+# Built once per validated catalog (see catalog.validate_catalog): keys are
+# unique, prices are floats and M365 term/billing values are normalized.
+# Seat volume tiers, if any, are compiled here too (see tiers.py).
+# ----------------------------------------
+def index_seats(license_types):
+    seats = {}
+    seat_options = {}
+    for plan, seat, price in license_types[["Plan", "Seat Type", "Price"]].itertuples(index=False):
+        seats[(plan, seat)] = price
+        seat_options.setdefault(plan, []).append(seat)
+    return {"seats": seats, "seat_options": seat_options}
+
+
+def index_m365(m365_df, any_segment=False):
+    # any_segment keys every row under segment None, which stands for "no
+    # default segment" (Resale) and keeps the first row found in any segment
+    m365 = {}
+    m365_options = {}
+    rows = m365_df[["Segment", "Term Commit", "Billing Cycle", "SkuTitle", "Price", "ProductId", "SkuId"]].itertuples(index=False)
+    for segment, term, billing, title, price, product_id, sku_id in rows:
+        key = (None if any_segment else segment, term, billing, title)
+        if key not in m365:
+            m365[key] = {"Price": price, "ProductID": str(product_id), "SkuId": str(sku_id)}
+            m365_options.setdefault(key[:3], []).append(title)
+    return {"m365": m365, "m365_options": m365_options}
+
+
+def build_price_index(catalog):
+    index = index_seats(catalog["license_types"])
+    index.update(index_m365(catalog["m365"]))
+    any_segment = index_m365(catalog["m365"], any_segment=True)
+    index["m365"].update(any_segment["m365"])
+    index["m365_options"].update(any_segment["m365_options"])
+
+    meraki = {}
+    for desc, sku, price in catalog["cisco_meraki"][["Description", "SKU", "Price"]].itertuples(index=False):
+        meraki[desc] = {"Price": price, "SKU": str(sku)}
+
+    resale = {}
+    for vendor, item, price in catalog["resale_sheet"][["Vendor", "Item", "Price"]].itertuples(index=False):
+        resale[(vendor, item)] = price
+
+    index.update({
+        "meraki": meraki,
+        "resale": resale,
+        "seat_tiers": compile_tiers(catalog.get("seat_tiers")),
+    })
+    return index
+
+
+# ----------------------------------------
+# Quote Pricing
+# A quote spec is a plain dict holding the same choices as the Streamlit
+# form, e.g.
+#   {"business_model": "Enclave One", "plan": "Enclave One (GCC)",
+#    "ariento_billing": "Monthly", "seats": [{"seat_type": "Standard", "quantity": 5}],
+#    "m365_term": "Annual", "m365_billing": "Annual",
+#    "m365": [{"sku_title": "...", "quantity": 5}],
+#    "meraki": [{"description": "...", "quantity": 1}],
+#    "resale": [{"vendor": "...", "item": "...", "quantity": 1}],
+#    "onboarding_type": "One Time Onboarding Payment",
+#    "discount_option": "Percentage Discount", "discount_percentage": 15.0,
+#    "discount_scope": "Ariento Licenses + Onboarding"}
+# price_quote is resolve_quote (the catalog lookups) then price_resolved
+# (line arithmetic and the rules), so a resolved spec can be priced again at
+# other quantities without looking anything up. trace_quote also returns what
+# the quote was priced from, for the audit log.
+# ----------------------------------------
+QUOTE_TOTAL_KEYS = [
+    "ariento_billing", "m365_term", "m365_billing", "ariento_base_cost", "raw_ariento_cost", "new_ariento_cost",
+    "microsoft_cost", "microsoft_label", "raw_meraki_cost", "raw_resale_cost", "service_cost",
+    "show_onboarding", "onboarding_type", "onboarding_price", "discount_option", "discount_percentage",
+    "discount_scope", "total_discount", "discounted_onboarding_price", "quote_total",
+]
+
+
+def resolve_plan(spec):
+    business_model = spec.get("business_model", "Enclave One")
+    if business_model not in BUSINESS_MODELS:
+        raise ValueError(f"Unknown business model: {business_model}")
+    if business_model == "Resale":
+        return business_model, None
+    if business_model == "MSSP":
+        return business_model, "MSSP"
+    plan = spec.get("plan") or PLAN_OPTIONS[business_model][0]
+    if plan not in PLAN_OPTIONS[business_model]:
+        raise ValueError(f"Plan {plan!r} is not available for {business_model}")
+    return business_model, plan
+
+
+def terms_inputs(spec, business_model, plan):
+    # Inputs for the "terms" rules stage (see pricing_rules.RULE_INPUTS)
+    return {
+        "business_model": business_model,
+        "gcc_high": is_gcc_high(plan),
+        "selected_ariento_billing": spec.get("ariento_billing", "Monthly"),
+        "selected_m365_term": spec.get("m365_term", "Annual"),
+        "selected_m365_billing": spec.get("m365_billing", "Annual"),
+    }
+
+
+def choice_inputs(spec):
+    # Onboarding and discount choices for the "totals" rules stage
+    return {
+        "onboarding_type": spec.get("onboarding_type", ONBOARDING_TYPES[0]),
+        "other_onboarding_price": float(spec.get("onboarding_price", 3000.0)),
+        "discount_option": spec.get("discount_option", "No Discount"),
+        "requested_discount_percentage": float(spec.get("discount_percentage", 10.0)),
+        "selected_discount_scope": spec.get("discount_scope", DISCOUNT_SCOPES[0]),
+    }
+
+
+def resolve_quote(spec, index):
+    # The spec's plan, "terms" rule values and choices, and every line to
+    # price with its unit price, in line item order. Each line keeps the
+    # position of the selection it came from in spec[kind] as "source", and
+    # M365 and Meraki lines their catalog row as "row".
+    # Lines without a catalog match become warnings and quantities of 0 or
+    # less are dropped; a seat type selected twice keeps its first place and
+    # its last quantity.
+    business_model, ariento_plan = resolve_plan(spec)
+    warnings = []
+    lines = []
+
+    values = terms_inputs(spec, business_model, ariento_plan)
+    values.update(RULES.evaluate("terms", values))
+
+    # Ariento licenses
+    seat_types = {}
+    if business_model != "Resale":
+        for i, sel in enumerate(spec.get("seats", [])):
+            quantity = int(sel.get("quantity", 1))
+            if quantity > 0:
+                seat_types[sel["seat_type"]] = (i, quantity)
+    for seat, (i, qty) in seat_types.items():
+        lines.append({
+            "kind": "seats", "source": i, "category": "Ariento License", "item": seat, "quantity": qty,
+            "price": index["seats"].get((ariento_plan, seat), 0.0),
+            "tiered": (ariento_plan, seat) in index["seat_tiers"]["by_key"],
+        })
+
+    # M365 licenses
+    segment = get_default_segment(ariento_plan) if ariento_plan else None
+    for i, sel in enumerate(spec.get("m365", [])):
+        quantity = int(sel.get("quantity", 1))
+        if quantity <= 0:
+            continue
+        row = index["m365"].get((segment, values["m365_term"], values["m365_billing"], sel["sku_title"]))
+        if row is None:
+            warnings.append(f"No matching row found for {sel['sku_title']} with the selected Term/Billing combination.")
+            continue
+        item = f"{sel['sku_title']} (ProductId: {row['ProductID']}, SkuId: {row['SkuId']})"
+        lines.append({"kind": "m365", "source": i, "category": "M365", "item": item, "quantity": quantity, "price": row["Price"], "row": row})
+
+    # Cisco Meraki
+    for i, sel in enumerate(spec.get("meraki", [])):
+        quantity = int(sel.get("quantity", 1))
+        if quantity <= 0:
+            continue
+        row = index["meraki"].get(sel["description"])
+        if row is None:
+            warnings.append(f"No matching row found for {sel['description']}.")
+            continue
+        item = f"{sel['description']} (SKU: {row['SKU']})"
+        lines.append({"kind": "meraki", "source": i, "category": "Cisco Meraki", "item": item, "quantity": quantity, "price": row["Price"], "row": row})
+
+    # Resale
+    if business_model == "Resale":
+        for i, sel in enumerate(spec.get("resale", [])):
+            quantity = int(sel.get("quantity", 1))
+            if quantity <= 0:
+                continue
+            price = index["resale"].get((sel["vendor"], sel["item"]))
+            if price is None:
+                warnings.append(f"No matching row found for {sel['vendor']} - {sel['item']}.")
+                continue
+            item = f"{sel['vendor']} - {sel['item']}"
+            lines.append({"kind": "resale", "source": i, "category": "Resale License", "item": item, "quantity": quantity, "price": price})
+
+    return {
+        "business_model": business_model, "ariento_plan": ariento_plan, "values": values,
+        "choices": choice_inputs(spec), "lines": lines, "warnings": warnings, "seat_tiers": index["seat_tiers"],
+    }
+
+
+def price_resolved(resolved, quantities=None):
+    # A resolve_quote result priced as price_quote would, at its own
+    # quantities or at `quantities` (one per resolved line; lines at 0 are left out)
+    return _price_resolved(resolved, quantities)[0]
+
+
+def _price_resolved(resolved, quantities):
+    # (price_resolved's result, every rule value it was priced with)
+    business_model, ariento_plan = resolved["business_model"], resolved["ariento_plan"]
+    values = dict(resolved["values"])
+    if quantities is None:
+        quantities = [line["quantity"] for line in resolved["lines"]]
+    line_items = []
+    costs = {"seats": 0, "m365": 0, "meraki": 0, "resale": 0}
+    multiplier = values["seat_price_multiplier"]
+    for line, qty in zip(resolved["lines"], quantities):
+        if qty <= 0:
+            continue
+        price = line["price"]
+        if line["kind"] != "seats":
+            costs[line["kind"]] += price * qty
+            line_items.append(line_item(line["category"], line["item"], qty, price))
+            continue
+        cost = seat_cost(resolved["seat_tiers"], ariento_plan, line["item"], qty, price)
+        costs["seats"] += cost
+        if line["tiered"]:
+            # Tiered seats show their average unit price
+            line_items.append(line_item("Ariento License", line["item"], qty, cost / qty * multiplier, cost * multiplier))
+        else:
+            line_items.append(line_item("Ariento License", line["item"], qty, price * multiplier))
+
+    # Onboarding, discount and totals (see pricing_rules.PRICING_RULES)
+    values.update({
+        "ariento_base_cost": costs["seats"],
+        "microsoft_cost": costs["m365"],
+        "raw_meraki_cost": costs["meraki"],
+        "raw_resale_cost": costs["resale"],
+    })
+    values.update(resolved["choices"])
+    values.update(RULES.evaluate("totals", values))
+    if values["show_onboarding"]:
+        line_items.append(line_item("Onboarding", business_model, 1, values["onboarding_price"]))
+    if values["total_discount"] > 0:
+        line_items.append(discount_line(values["discount_option"], values["total_discount"]))
+
+    totals = {"business_model": business_model, "ariento_plan": ariento_plan}
+    totals.update({key: values[key] for key in QUOTE_TOTAL_KEYS})
+    return {"line_items": line_items, "totals": totals, "warnings": list(resolved["warnings"])}, values
+
+
+def price_quote(spec, index):
+    return price_resolved(resolve_quote(spec, index))
+
+
+def trace_quote(spec, index):
+    # (price_quote's result, what it was priced from): the resolve_quote
+    # result and the rule values, inputs and targets, in USD
+    resolved = resolve_quote(spec, index)
+    result, values = _price_resolved(resolved, None)
+    return result, {"resolved": resolved, "values": values}
+
+
+def line_item(category, item, quantity, price, total=None):
+    total = price * quantity if total is None else total
+    return {"Category": category, "Item": item, "Quantity": quantity, "Price Per Unit": price, "Total Cost": total}
+
+
+def discount_line(discount_option, total_discount):
+    return {
+        "Category": "Discount", "Item": discount_option, "Quantity": None,
+        "Price Per Unit": -total_discount, "Total Cost": -total_discount,
+    }
+
+
+# ----------------------------------------
+# Summary Table (string formatted, as shown in the app and CSV)
+# ----------------------------------------
+def format_summary(line_items, currency=BASE_CURRENCY):
+    data = []
+    for line in line_items:
+        if line["Category"] == "Discount":
+            discount = "-" + format_money(-line["Total Cost"], currency)
+            data.append(["Discount", line["Item"], "-", discount, discount])
+        else:
+            data.append([line["Category"], line["Item"], line["Quantity"],
+                         format_money(line["Price Per Unit"], currency), format_money(line["Total Cost"], currency)])
+    return pd.DataFrame(data, columns=SUMMARY_COLUMNS).astype(str)
+
+
+# ----------------------------------------
+# Currency Conversion
+# A priced quote is converted after pricing, so the rules always run in USD
+# (the catalog's currency). Unit prices are converted and rounded to the
+# currency's decimals first, and each line total is its rounded unit price
+# times its quantity, so every line reads as quantity x price. The discount
+# is the quote's discount_percentage of the converted lines it applies to,
+# and the subtotals and quote_total are summed from the converted lines, so
+# they add up exactly as printed. The converted totals record the currency,
+# rate and rate date.
+#   rate, rate_date = FX_RATES.rate("GBP")
+#   result = convert_quote(price_quote(spec, index), "GBP", rate, rate_date)
+# ----------------------------------------
+QUOTE_MONEY_KEYS = [
+    "ariento_base_cost", "raw_ariento_cost", "new_ariento_cost", "microsoft_cost", "raw_meraki_cost",
+    "raw_resale_cost", "service_cost", "onboarding_price", "total_discount", "discounted_onboarding_price",
+    "quote_total",
+]
+LINE_MONEY_KEYS = ["Price Per Unit", "Total Cost"]
+# The quote total each line category sums into
+CATEGORY_TOTALS = {
+    "Ariento License": "raw_ariento_cost",
+    "M365": "microsoft_cost",
+    "Cisco Meraki": "raw_meraki_cost",
+    "Resale License": "raw_resale_cost",
+    "Onboarding": "onboarding_price",
+}
+
+
+def convert_quote(result, currency, rate, rate_date=None):
+    # A price_quote result in `currency`; USD results are returned as they are
+    if currency == BASE_CURRENCY:
+        return result
+    decimals = currency_info(currency)["decimals"]
+    line_items, totals = result["line_items"], result["totals"]
+    priced = [line for line in line_items if line["Category"] != "Discount"]
+    prices = convert_amounts([line["Price Per Unit"] for line in priced], currency, rate)
+    line_totals = np.round(prices * np.array([line["Quantity"] for line in priced], dtype=float), decimals)
+    line_items = [
+        dict(line, **{"Price Per Unit": price, "Total Cost": total})
+        for line, price, total in zip(priced, prices.tolist(), line_totals.tolist())
+    ]
+
+    converted = dict.fromkeys(CATEGORY_TOTALS.values(), 0.0)
+    for line in line_items:
+        converted[CATEGORY_TOTALS[line["Category"]]] += line["Total Cost"]
+    converted = {key: round(value, decimals) for key, value in converted.items()}
+    percentage = totals["discount_percentage"]
+    discount_base = converted["raw_ariento_cost"]
+    if totals["discount_scope"] == "Ariento Licenses + Onboarding":
+        discount_base += converted["onboarding_price"]
+    total_discount = round(percentage * discount_base, decimals) if totals["total_discount"] > 0 else 0.0
+    if total_discount > 0:
+        line_items.append(discount_line(totals["discount_option"], total_discount))
+    license_discount = 0.0
+    if totals["discount_option"] != "No Discount":
+        license_discount = round(percentage * converted["raw_ariento_cost"], decimals)
+    # Amounts no line shows are converted on their own
+    base_cost, onboarding_reduction = convert_amounts(
+        [totals["ariento_base_cost"], totals["onboarding_price"] - totals["discounted_onboarding_price"]], currency, rate,
+    ).tolist()
+    converted.update({
+        "ariento_base_cost": base_cost,
+        "new_ariento_cost": round(converted["raw_ariento_cost"] - license_discount, decimals),
+        "service_cost": round(converted["raw_meraki_cost"] + converted["raw_resale_cost"], decimals),
+        "total_discount": total_discount,
+        "discounted_onboarding_price": round(converted["onboarding_price"] - onboarding_reduction, decimals),
+        "quote_total": round(sum(line["Total Cost"] for line in line_items), decimals),
+    })
+    totals = dict(totals, **converted)
+    totals.update({"currency": currency, "fx_rate": rate, "fx_rate_date": str(rate_date) if rate_date else None})
+    return dict(result, line_items=line_items, totals=totals)
+
+
+# ----------------------------------------
+# Batch Pricing
+# Prices many quote specs at once: every line of every spec goes into one
+# frame, is joined against flat price tables, and the per-quote rules run as
+# column arithmetic. Totals match price_quote for the same spec.
+# ----------------------------------------
+BATCH_TOTAL_COLUMNS = [
+    "raw_ariento_cost", "new_ariento_cost", "microsoft_cost", "raw_meraki_cost", "raw_resale_cost",
+    "service_cost", "onboarding_price", "total_discount", "quote_total", "unmatched_lines",
+]
+
+
+def m365_price_table(m365_df, any_segment=False):
+    m365 = m365_df[["Segment", "Term Commit", "Billing Cycle", "SkuTitle", "Price"]].rename(
+        columns={"Term Commit": "Term", "Billing Cycle": "Billing"}
+    )
+    if any_segment:
+        # Resale quotes have no default segment, so they match the first row of any segment
+        m365 = m365.drop_duplicates(["Term", "Billing", "SkuTitle"]).assign(Segment="")
+    return m365
+
+
+def build_price_tables(catalog):
+    return {
+        "seats": catalog["license_types"][["Plan", "Seat Type", "Price"]],
+        "m365": pd.concat(
+            [m365_price_table(catalog["m365"]), m365_price_table(catalog["m365"], any_segment=True)], ignore_index=True
+        ),
+        "meraki": catalog["cisco_meraki"][["Description", "Price"]],
+        "resale": catalog["resale_sheet"][["Vendor", "Item", "Price"]],
+        "seat_tiers": compile_tiers(catalog.get("seat_tiers")),
+    }
+
+
+def flatten_quotes(specs):
+    rows = []
+    seat_lines, m365_lines, meraki_lines, resale_lines = [], [], [], []
+    for quote_id, spec in enumerate(specs):
+        business_model, plan = resolve_plan(spec)
+        rows.append((
+            business_model, plan or "", spec.get("ariento_billing", "Monthly"),
+            spec.get("m365_term", "Annual"), spec.get("m365_billing", "Annual"),
+            spec.get("onboarding_type", ONBOARDING_TYPES[0]), float(spec.get("onboarding_price", 3000.0)),
+            spec.get("discount_option", "No Discount"), float(spec.get("discount_percentage", 10.0)),
+            spec.get("discount_scope", DISCOUNT_SCOPES[0]),
+        ))
+        for sel in spec.get("seats", []):
+            seat_lines.append((quote_id, sel["seat_type"], int(sel.get("quantity", 1))))
+        for sel in spec.get("m365", []):
+            m365_lines.append((quote_id, sel["sku_title"], int(sel.get("quantity", 1))))
+        for sel in spec.get("meraki", []):
+            meraki_lines.append((quote_id, sel["description"], int(sel.get("quantity", 1))))
+        for sel in spec.get("resale", []):
+            resale_lines.append((quote_id, sel["vendor"], sel["item"], int(sel.get("quantity", 1))))
+    quotes = pd.DataFrame(rows, columns=[
+        "business_model", "plan", "ariento_billing", "m365_term", "m365_billing",
+        "onboarding_type", "other_onboarding_price", "discount_option", "discount_percentage", "discount_scope",
+    ])
+    lines = {
+        "seats": pd.DataFrame(seat_lines, columns=["quote_id", "Seat Type", "Quantity"]),
+        "m365": pd.DataFrame(m365_lines, columns=["quote_id", "SkuTitle", "Quantity"]),
+        "meraki": pd.DataFrame(meraki_lines, columns=["quote_id", "Description", "Quantity"]),
+        "resale": pd.DataFrame(resale_lines, columns=["quote_id", "Vendor", "Item", "Quantity"]),
+    }
+    # Keep integer columns typed even when a category has no lines at all
+    lines = {kind: df.astype({"quote_id": "int64", "Quantity": "int64"}) for kind, df in lines.items()}
+    return quotes, lines
+
+
+def _sum_lines(lines, n):
+    # Per-quote sum of Quantity * Price plus a count of lines with no price
+    cost = np.bincount(lines["quote_id"], weights=(lines["Quantity"] * lines["Price"].fillna(0)).to_numpy(), minlength=n)
+    unmatched = np.bincount(lines["quote_id"], weights=lines["Price"].isna().to_numpy(), minlength=n)
+    return cost, unmatched
+
+
+def price_quotes_batch(specs, tables):
+    quotes, lines = flatten_quotes(specs)
+    return price_flattened(quotes, lines, tables)
+
+
+# Specs flattened once can be priced against several catalogs
+def price_flattened(quotes, lines, tables):
+    n = len(quotes)
+    bm = quotes["business_model"].to_numpy()
+    plan = quotes["plan"]
+    resale_model = bm == "Resale"
+    values = {
+        "business_model": bm,
+        "gcc_high": (plan.str.contains("GCC-H", regex=False) | plan.str.contains("GCCH", regex=False)).to_numpy(),
+        "selected_ariento_billing": quotes["ariento_billing"].to_numpy(),
+        "selected_m365_term": quotes["m365_term"].to_numpy(),
+        "selected_m365_billing": quotes["m365_billing"].to_numpy(),
+    }
+    values.update(RULES.evaluate_columns("terms", values, n))
+
+    # Ariento seats: last quantity per seat type wins, zero quantities are skipped
+    seats = lines["seats"][lines["seats"]["Quantity"] > 0]
+    seats = seats[~resale_model[seats["quote_id"].to_numpy()]].drop_duplicates(["quote_id", "Seat Type"], keep="last")
+    seats = seats.assign(Plan=plan.to_numpy()[seats["quote_id"].to_numpy()])
+    seats = seats.merge(tables["seats"], on=["Plan", "Seat Type"], how="left")
+    # A seat type missing from the plan prices at zero, as in the app
+    line_costs = seat_costs(
+        tables["seat_tiers"], seats["Plan"], seats["Seat Type"], seats["Quantity"],
+        seats["Quantity"] * seats["Price"].fillna(0.0),
+    )
+    ariento_base_cost = np.bincount(seats["quote_id"], weights=line_costs, minlength=n)
+
+    # M365: term/billing come from the rules, segment from the plan
+    segment = np.array([get_default_segment(p) or "" if p else "" for p in plan])
+    m365 = lines["m365"][lines["m365"]["Quantity"] > 0]
+    qid = m365["quote_id"].to_numpy()
+    m365 = m365.assign(Segment=segment[qid], Term=values["m365_term"][qid], Billing=values["m365_billing"][qid])
+    m365 = m365.merge(tables["m365"], on=["Segment", "Term", "Billing", "SkuTitle"], how="left")
+    microsoft_cost, m365_unmatched = _sum_lines(m365, n)
+
+    meraki = lines["meraki"][lines["meraki"]["Quantity"] > 0].merge(tables["meraki"], on="Description", how="left")
+    raw_meraki_cost, meraki_unmatched = _sum_lines(meraki, n)
+
+    resale = lines["resale"][lines["resale"]["Quantity"] > 0]
+    resale = resale[resale_model[resale["quote_id"].to_numpy()]]
+    resale = resale.merge(tables["resale"], on=["Vendor", "Item"], how="left")
+    raw_resale_cost, resale_unmatched = _sum_lines(resale, n)
+
+    # Onboarding, discount and totals run as column rules
+    values.update({
+        "ariento_base_cost": ariento_base_cost,
+        "microsoft_cost": microsoft_cost,
+        "raw_meraki_cost": raw_meraki_cost,
+        "raw_resale_cost": raw_resale_cost,
+        "onboarding_type": quotes["onboarding_type"].to_numpy(),
+        "other_onboarding_price": quotes["other_onboarding_price"].to_numpy(),
+        "discount_option": quotes["discount_option"].to_numpy(),
+        "requested_discount_percentage": quotes["discount_percentage"].to_numpy(),
+        "selected_discount_scope": quotes["discount_scope"].to_numpy(),
+    })
+    values.update(RULES.evaluate_columns("totals", values, n))
+
+    return pd.DataFrame({
+        "business_model": bm,
+        "ariento_plan": plan.where(plan != "", None).to_numpy(),
+        "ariento_billing": np.where(resale_model, None, values["ariento_billing"]),
+        "m365_term": values["m365_term"],
+        "m365_billing": values["m365_billing"],
+        "raw_ariento_cost": values["raw_ariento_cost"],
+        "new_ariento_cost": values["new_ariento_cost"],
+        "microsoft_cost": microsoft_cost,
+        "raw_meraki_cost": raw_meraki_cost,
+        "raw_resale_cost": raw_resale_cost,
+        "service_cost": values["service_cost"],
+        "onboarding_price": values["onboarding_price"],
+        "total_discount": values["total_discount"],
+        "quote_total": values["quote_total"],
+        "unmatched_lines": (m365_unmatched + meraki_unmatched + resale_unmatched).astype(int),
+    })
@@ -0,0 +1,235 @@
+import ast
+import hashlib
+
+import numpy as np
+
+# ----------------------------------------
+# Pricing Rules
+# Every quote-level business rule lives in this table. Rows for the same
+# target form a decision table: the first row whose `when` matches sets the
+# value, and a row with `when=None` is the default. `when` is a dict of
+# field == value tests that must all hold; the value is a Python expression
+# over inputs and earlier targets.
+#
+# Rules run in two stages around the catalog lookups:
+#   terms   - needs only the form selections; decides billing, terms and the
+#             seat price multiplier used for the lookups and line items
+#   totals  - needs the looked-up line sums; decides onboarding, discount and
+#             the totals
+# The table is compiled once into a plain Python function per stage (for a
+# single quote) and a NumPy function per stage (for whole columns of quotes).
+# ----------------------------------------
+ONBOARDING_MINIMUM = 3000
+ANNUAL_LABEL = "Microsoft Licenses Costs (Annual Recurring)"
+MONTHLY_LABEL = "Microsoft Licenses Costs (Monthly Recurring)"
+
+RULE_INPUTS = {
+    "terms": [
+        "business_model", "gcc_high",
+        "selected_ariento_billing", "selected_m365_term", "selected_m365_billing",
+    ],
+    "totals": [
+        "ariento_base_cost", "microsoft_cost", "raw_meraki_cost", "raw_resale_cost",
+        "onboarding_type", "other_onboarding_price",
+        "discount_option", "requested_discount_percentage", "selected_discount_scope",
+    ],
+}
+RULE_CONSTANTS = {
+    "ONBOARDING_MINIMUM": ONBOARDING_MINIMUM,
+    "ANNUAL_LABEL": ANNUAL_LABEL,
+    "MONTHLY_LABEL": MONTHLY_LABEL,
+}
+
+PRICING_RULES = [
+    # stage     target                        when                                                          value
+    ("terms",  "ariento_billing",             {"business_model": "Enclave One", "gcc_high": True},         "'Annual'"),
+    ("terms",  "ariento_billing",             None,                                                         "selected_ariento_billing"),
+    # Annual billing is quoted as 12 months, except GCC-High prices which are already annual
+    ("terms",  "seat_price_multiplier",       {"ariento_billing": "Annual", "gcc_high": False},            "12"),
+    ("terms",  "seat_price_multiplier",       None,                                                         "1"),
+    ("terms",  "m365_term",                   {"gcc_high": True},                                          "'Annual'"),
+    ("terms",  "m365_term",                   None,                                                         "selected_m365_term"),
+    ("terms",  "m365_billing",                {"gcc_high": True},                                          "'Annual'"),
+    ("terms",  "m365_billing",                None,                                                         "selected_m365_billing"),
+    ("terms",  "microsoft_label",             {"business_model": "Resale"},                                "MONTHLY_LABEL"),
+    ("terms",  "microsoft_label",             {"gcc_high": True},                                          "ANNUAL_LABEL"),
+    ("terms",  "microsoft_label",             {"m365_billing": "Annual"},                                  "ANNUAL_LABEL"),
+    ("terms",  "microsoft_label",             None,                                                         "MONTHLY_LABEL"),
+
+    ("totals", "raw_ariento_cost",            None,                                                         "seat_price_multiplier * ariento_base_cost"),
+    ("totals", "service_cost",                None,                                                         "raw_meraki_cost + raw_resale_cost"),
+    ("totals", "show_onboarding",             {"business_model": "Resale"},                                "False"),
+    ("totals", "show_onboarding",             {"onboarding_type": "None"},                                 "False"),
+    ("totals", "show_onboarding",             None,                                                         "True"),
+    # One-time onboarding: one month (annual billing) or two months of seats, $3,000 minimum
+    ("totals", "onboarding_price",            {"show_onboarding": False},                                  "0.0"),
+    ("totals", "onboarding_price",            {"onboarding_type": "Other"},                                "other_onboarding_price"),
+    ("totals", "onboarding_price",            {"ariento_billing": "Annual"},                               "max_(ariento_base_cost, ONBOARDING_MINIMUM)"),
+    ("totals", "onboarding_price",            None,                                                         "max_(2 * ariento_base_cost, ONBOARDING_MINIMUM)"),
+    ("totals", "discount_percentage",         {"discount_option": "10% Discount"},                         "0.10"),
+    ("totals", "discount_percentage",         {"discount_option": "Percentage Discount"},                  "requested_discount_percentage / 100.0"),
+    ("totals", "discount_percentage",         None,                                                         "0.0"),
+    ("totals", "discount_scope",              {"discount_option": "No Discount"},                          "'Ariento Licenses Only'"),
+    ("totals", "discount_scope",              {"show_onboarding": False},                                  "'Ariento Licenses Only'"),
+    ("totals", "discount_scope",              None,                                                         "selected_discount_scope"),
+    ("totals", "discount_base",               {"discount_scope": "Ariento Licenses + Onboarding"},         "raw_ariento_cost + onboarding_price"),
+    ("totals", "discount_base",               None,                                                         "raw_ariento_cost"),
+    ("totals", "total_discount",              {"discount_option": "No Discount"},                          "0.0"),
+    ("totals", "total_discount",              None,                                                         "discount_percentage * discount_base"),
+    ("totals", "new_ariento_cost",            {"discount_option": "No Discount"},                          "raw_ariento_cost"),
+    ("totals", "new_ariento_cost",            None,                                                         "raw_ariento_cost - discount_percentage * raw_ariento_cost"),
+    # A discounted one-time onboarding payment never drops below the minimum
+    ("totals", "discounted_onboarding_price", {"discount_scope": "Ariento Licenses Only"},                 "onboarding_price"),
+    ("totals", "discounted_onboarding_price", {"onboarding_type": "One Time Onboarding Payment"},          "max_(onboarding_price - discount_percentage * onboarding_price, ONBOARDING_MINIMUM)"),
+    ("totals", "discounted_onboarding_price", None,                                                         "onboarding_price - discount_percentage * onboarding_price"),
+    # The discount line is only shown (and subtracted) when it is positive
+    ("totals", "quote_total",                 None,                                                         "raw_ariento_cost + microsoft_cost + service_cost + onboarding_price - max_(total_discount, 0.0)"),
+]
+
+
+# ----------------------------------------
+# Rule Compiler
+# ----------------------------------------
+def _group_rules(rules, stage):
+    targets = {}
+    for rule_stage, target, when, value in rules:
+        if rule_stage == stage:
+            targets.setdefault(target, []).append((when, value))
+    for target, cases in targets.items():
+        if cases[-1][0] is not None:
+            raise ValueError(f"Rule target {target!r} has no default row")
+        if any(when is None for when, _ in cases[:-1]):
+            raise ValueError(f"Rule target {target!r} has a default row before its last row")
+    return targets
+
+
+def _names(expression):
+    return {node.id for node in ast.walk(ast.parse(expression, mode="eval")) if isinstance(node, ast.Name)}
+
+
+def _scalar_test(field, expected):
+    # Plain truth tests for flags are much cheaper than comparing to True/False
+    if expected is True:
+        return field
+    if expected is False:
+        return f"not {field}"
+    return f"{field} == {expected!r}"
+
+
+def _scalar_source(name, targets, inputs):
+    lines = [f"def evaluate_{name}(values):"]
+    lines += [f"    {name} = values[{name!r}]" for name in inputs]
+    for target, cases in targets.items():
+        keyword = "if"
+        for when, value in cases:
+            if when is None:
+                if keyword == "if":
+                    lines.append(f"    {target} = {value}")
+                else:
+                    lines.append("    else:")
+                    lines.append(f"        {target} = {value}")
+            else:
+                test = " and ".join(_scalar_test(field, expected) for field, expected in when.items())
+                lines.append(f"    {keyword} {test}:")
+                lines.append(f"        {target} = {value}")
+                keyword = "elif"
+    lines.append("    return {" + ", ".join(f"{t!r}: {t}" for t in targets) + "}")
+    return "\n".join(lines)
+
+
+def _vector_source(stage, targets, inputs):
+    lines = [f"def evaluate_{stage}_columns(values):"]
+    lines += [f"    {name} = values[{name!r}]" for name in inputs]
+    for target, cases in targets.items():
+        conditions = []
+        choices = []
+        for when, value in cases[:-1]:
+            conditions.append(" & ".join(f"({field} == {expected!r})" for field, expected in when.items()))
+            choices.append(value)
+        default = cases[-1][1]
+        if conditions:
+            lines.append(
+                f"    {target} = select_([{', '.join(conditions)}], [{', '.join(choices)}], {default}, n_)"
+            )
+        else:
+            lines.append(f"    {target} = full_({default}, n_)")
+    lines.append("    return {" + ", ".join(f"{t!r}: {t}" for t in targets) + "}")
+    return "\n".join(["def _outer(n_):"] + ["    " + line for line in lines] + [f"    return evaluate_{stage}_columns"])
+
+
+def _select(conditions, choices, default, n):
+    conditions = [np.broadcast_to(c, n) for c in conditions]
+    choices = [np.broadcast_to(c, n) for c in choices]
+    return np.select(conditions, choices, np.broadcast_to(default, n))
+
+
+def _full(value, n):
+    return np.broadcast_to(value, n).copy()
+
+
+class CompiledRules:
+    def __init__(self, rules=PRICING_RULES):
+        self.rules = rules
+        # Changes whenever a rule row or constant does (see pricing audit traces)
+        self.version = hashlib.sha256(repr((rules, sorted(RULE_CONSTANTS.items()))).encode()).hexdigest()[:16]
+        self._scalar = {}
+        self._vector_builders = {}
+        known = set()
+        quote_targets = {}
+        quote_inputs = set()
+        for stage in RULE_INPUTS:
+            targets = _group_rules(rules, stage)
+            known |= set(RULE_INPUTS[stage])
+            used = set()
+            for target, cases in targets.items():
+                for when, value in cases:
+                    names = set(when or {}) | (_names(value) - set(RULE_CONSTANTS) - {"max_"})
+                    unknown = names - known
+                    if unknown:
+                        raise ValueError(f"Rule for {target!r} refers to unknown name(s): {', '.join(sorted(unknown))}")
+                    used |= names
+                known.add(target)
+            # Only the names this stage reads are unpacked; later stages may
+            # read anything an earlier stage produced
+            inputs = sorted(used - set(targets))
+            quote_inputs |= set(inputs) - set(quote_targets)
+            quote_targets.update(targets)
+
+            namespace = dict(RULE_CONSTANTS, max_=max)
+            exec(_scalar_source(stage, targets, inputs), namespace)
+            self._scalar[stage] = namespace[f"evaluate_{stage}"]
+
+            namespace = dict(RULE_CONSTANTS, max_=np.maximum, select_=_select, full_=_full)
+            exec(_vector_source(stage, targets, inputs), namespace)
+            self._vector_builders[stage] = namespace["_outer"]
+
+        # Every stage in one function, for quotes whose line sums are known up front
+        namespace = dict(RULE_CONSTANTS, max_=max)
+        exec(_scalar_source("quote", quote_targets, sorted(quote_inputs)), namespace)
+        self._quote = namespace["evaluate_quote"]
+
+    def evaluate(self, stage, values):
+        # One quote: values maps field name -> scalar
+        return self._scalar[stage](values)
+
+    def evaluate_columns(self, stage, values, n):
+        # Many quotes: values maps field name -> array of length n
+        return self._vector_builders[stage](n)(values)
+
+    def evaluate_quote(self, values):
+        # All stages for one quote whose line sums are already known; returns
+        # the inputs together with every rule target
+        return dict(values, **self._quote(values))
+
+    def explain(self, values):
+        # The row that decided each target for one quote's evaluated values
+        # (inputs and targets, as from evaluate_quote), in table order:
+        # [(row number in self.rules, stage, target, when, value)]
+        decided = {}
+        for row, (stage, target, when, value) in enumerate(self.rules):
+            if target not in decided and all(values.get(field) == expected for field, expected in (when or {}).items()):
+                decided[target] = (row, stage, target, when, value)
+        return list(decided.values())
+
+
+RULES = CompiledRules()
@@ -0,0 +1,273 @@
+import os
+import re
+import uuid
+import argparse
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from catalog import REPO_DIR, ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, CatalogError, load_catalog
+from catalog_diff import load_quote_specs
+from pricing import build_price_index, get_default_segment, price_quote
+
+# ----------------------------------------
+# Quote Archive
+# Priced line items appended to a Parquet dataset partitioned by quote month
+# (month=YYYY-MM/*.parquet), one row per line item with the quote's plan,
+# business model and time, so questions across many quotes are answered by
+# reading a few columns of the months asked about rather than re-parsing
+# exports. M365 and Meraki items are stored as their catalog name with the
+# ProductId/SkuId or SKU split out of the summary text.
+#   archive = QuoteArchive()
+#   archive.append([("Acme", price_quote(spec, index))])
+#   archive.top_m365_skus(segment="GCC-High NON GOV", start="2026-07-01", end="2026-10-01")
+#   archive.pipeline_by_month("Cisco Meraki")
+#   python quote_archive.py --append saved_quotes.jsonl
+#   python quote_archive.py --report top-m365 --segment "GCC-High NON GOV" --start 2026-07-01
+# Every append writes new files, so compact() a month once it has many small
+# ones; reads are also fine without it.
+# ----------------------------------------
+ARCHIVE_DIR = os.environ.get("QUOTE_ARCHIVE_DIR", os.path.join(REPO_DIR, ".quote_archive"))
+ARCHIVE_SCHEMA = pa.schema([
+    ("quote_id", pa.string()),
+    ("quote_name", pa.string()),
+    ("quoted_at", pa.timestamp("us", tz="UTC")),
+    ("business_model", pa.string()),
+    ("plan", pa.string()),
+    ("segment", pa.string()),
+    ("ariento_billing", pa.string()),
+    ("category", pa.string()),
+    ("item", pa.string()),
+    ("product_id", pa.string()),
+    ("sku_id", pa.string()),
+    ("sku", pa.string()),
+    ("quantity", pa.int64()),
+    ("unit_price", pa.float64()),
+    ("total_cost", pa.float64()),
+    ("quote_total", pa.float64()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+REPORTS = ["top-m365", "pipeline", "categories"]
+# Summary text of M365 and Meraki lines (see pricing.price_quote)
+_M365_ITEM = re.compile(r"^(.*) \(ProductId: (.*), SkuId: (.*)\)$")
+_MERAKI_ITEM = re.compile(r"^(.*) \(SKU: (.*)\)$")
+
+
+def _item_ids(category, item):
+    # (catalog name, product_id, sku_id, sku)
+    if category == "M365":
+        match = _M365_ITEM.match(item)
+        if match:
+            return match.group(1), match.group(2), match.group(3), None
+    elif category == "Cisco Meraki":
+        match = _MERAKI_ITEM.match(item)
+        if match:
+            return match.group(1), None, None, match.group(2)
+    return item, None, None, None
+
+
+def _timestamp(value):
+    # A UTC pandas Timestamp from a datetime or date string (naive means UTC)
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def archive_rows(name, result, quoted_at, quote_id=None):
+    totals = result["totals"]
+    plan = totals.get("ariento_plan")
+    quote_id = quote_id or uuid.uuid4().hex
+    rows = []
+    for line in result["line_items"]:
+        item, product_id, sku_id, sku = _item_ids(line["Category"], line["Item"])
+        quantity = line["Quantity"]
+        rows.append((
+            quote_id, name, quoted_at, totals["business_model"], plan, get_default_segment(plan) if plan else None,
+            totals.get("ariento_billing"), line["Category"], item, product_id, sku_id, sku,
+            None if quantity is None else int(quantity), float(line["Price Per Unit"]), float(line["Total Cost"]),
+            float(totals["quote_total"]),
+        ))
+    return rows
+
+
+def _write_file(table, directory, name):
+    # Written under a dot name, which readers skip, then renamed into place
+    pq.write_table(table, os.path.join(directory, "." + name))
+    os.replace(os.path.join(directory, "." + name), os.path.join(directory, name))
+
+
+def _month_files(directory):
+    return [f for f in os.listdir(directory) if f.endswith(".parquet") and not f.startswith((".", "_"))]
+
+
+class QuoteArchive:
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+
+    # ----------------------------------------
+    # Writing
+    # ----------------------------------------
+    def append(self, quotes, quoted_at=None):
+        # quotes is an iterable of (name, price_quote result) or
+        # (name, result, quoted_at); the number of line items written
+        default_time = _timestamp(quoted_at if quoted_at is not None else datetime.now(timezone.utc))
+        rows = []
+        for quote in quotes:
+            name, result = quote[0], quote[1]
+            when = _timestamp(quote[2]) if len(quote) > 2 and quote[2] is not None else default_time
+            rows += archive_rows(name, result, when)
+        if not rows:
+            return 0
+        df = pd.DataFrame(rows, columns=ARCHIVE_SCHEMA.names)
+        # One new uniquely named file per month, beside the existing ones
+        name = f"part-{uuid.uuid4().hex}.parquet"
+        for month, month_rows in df.groupby(df["quoted_at"].dt.strftime("%Y-%m"), sort=False):
+            directory = os.path.join(self.path, f"month={month}")
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(month_rows, schema=ARCHIVE_SCHEMA, preserve_index=False)
+            _write_file(table, directory, name)
+        return len(rows)
+
+    def compact(self, month=None):
+        # Rewrites each month's files (or one month's) as a single file; the
+        # number of months rewritten
+        rewritten = 0
+        for month_dir in sorted(os.listdir(self.path)) if os.path.isdir(self.path) else []:
+            if not month_dir.startswith("month=") or (month and month_dir != f"month={month}"):
+                continue
+            directory = os.path.join(self.path, month_dir)
+            files = _month_files(directory)
+            if len(files) < 2:
+                continue
+            table = pq.read_table([os.path.join(directory, f) for f in files], schema=ARCHIVE_SCHEMA)
+            _write_file(table.sort_by("quoted_at"), directory, f"compact-{uuid.uuid4().hex}.parquet")
+            for f in files:
+                os.remove(os.path.join(directory, f))
+            rewritten += 1
+        return rewritten
+
+    # ----------------------------------------
+    # Query API
+    # ----------------------------------------
+    def query(self, columns=None, start=None, end=None, **equals):
+        # Line items quoted in [start, end) as a DataFrame, optionally only
+        # some columns and rows where column == value (a list matches any of
+        # its values). Months outside the range are not read.
+        if not os.path.isdir(self.path):
+            return pd.DataFrame(columns=columns or ARCHIVE_SCHEMA.names)
+        dataset = ds.dataset(self.path, schema=ARCHIVE_SCHEMA.append(pa.field("month", pa.string())), format="parquet", partitioning=PARTITIONING)
+        condition = None
+        clauses = []
+        if start is not None:
+            start = _timestamp(start)
+            clauses += [ds.field("month") >= start.strftime("%Y-%m"), ds.field("quoted_at") >= start.to_pydatetime()]
+        if end is not None:
+            end = _timestamp(end)
+            clauses += [ds.field("month") <= end.strftime("%Y-%m"), ds.field("quoted_at") < end.to_pydatetime()]
+        for column, value in equals.items():
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(ds.field(column).isin(list(value)))
+            else:
+                clauses.append(ds.field(column) == value)
+        for clause in clauses:
+            condition = clause if condition is None else condition & clause
+        # Quantities stay integers next to the discount lines' nulls
+        return dataset.to_table(columns=columns, filter=condition).to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+    # ----------------------------------------
+    # Canned Reports
+    # ----------------------------------------
+    def top_m365_skus(self, segment=None, start=None, end=None, limit=10):
+        # M365 SKUs by seats quoted: quantity, cost and the number of quotes
+        filters = {"category": "M365"}
+        if segment is not None:
+            filters["segment"] = segment
+        lines = self.query(["quote_id", "item", "sku_id", "quantity", "total_cost"], start, end, **filters)
+        report = lines.groupby(["item", "sku_id"], sort=False).agg(
+            quantity=("quantity", "sum"), total_cost=("total_cost", "sum"), quotes=("quote_id", "nunique"),
+        )
+        return report.sort_values(["quantity", "total_cost"], ascending=False).head(limit).reset_index()
+
+    def pipeline_by_month(self, category=None, start=None, end=None):
+        # Quoted cost per month (of one category, or of every line), with the
+        # number of quotes and line items
+        filters = {"category": category} if category else {}
+        lines = self.query(["month", "quote_id", "total_cost"], start, end, **filters)
+        report = lines.groupby("month").agg(
+            total_cost=("total_cost", "sum"), quotes=("quote_id", "nunique"), line_items=("total_cost", "size"),
+        )
+        return report.reset_index()
+
+    def category_totals(self, start=None, end=None, **filters):
+        # Quoted cost and quantity per business model and line category
+        lines = self.query(["business_model", "category", "quantity", "total_cost"], start, end, **filters)
+        report = lines.groupby(["business_model", "category"]).agg(
+            quantity=("quantity", "sum"), total_cost=("total_cost", "sum"), line_items=("total_cost", "size"),
+        )
+        return report.reset_index()
+
+    def stats(self):
+        files = rows = 0
+        months = []
+        for month_dir in sorted(os.listdir(self.path)) if os.path.isdir(self.path) else []:
+            if not month_dir.startswith("month="):
+                continue
+            months.append(month_dir[len("month="):])
+            for f in _month_files(os.path.join(self.path, month_dir)):
+                files += 1
+                rows += pq.ParquetFile(os.path.join(self.path, month_dir, f)).metadata.num_rows
+        return {"months": months, "files": files, "line_items": rows}
+
+
+def run_report(archive, report, segment=None, category=None, start=None, end=None, limit=10):
+    if report == "top-m365":
+        return archive.top_m365_skus(segment, start, end, limit)
+    if report == "pipeline":
+        return archive.pipeline_by_month(category, start, end)
+    if report == "categories":
+        return archive.category_totals(start, end, **({"segment": segment} if segment else {}))
+    raise ValueError(f"Report must be one of: {', '.join(REPORTS)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive priced quotes as Parquet and report across them")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="Archive directory")
+    parser.add_argument("--append", help="Price these saved quote specs (JSON list or JSON lines) and archive them")
+    parser.add_argument("--quoted-at", help="Quote time for appended specs without a quoted_at (default now, UTC)")
+    parser.add_argument("--compact", action="store_true", help="Rewrite each month as one file")
+    parser.add_argument("--report", choices=REPORTS)
+    parser.add_argument("--segment", help="M365 segment to report on, e.g. \"GCC-High NON GOV\"")
+    parser.add_argument("--category", help="Line category for the pipeline report, e.g. \"Cisco Meraki\"")
+    parser.add_argument("--start", help="First quote date to report on (inclusive)")
+    parser.add_argument("--end", help="Last quote date to report on (exclusive)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--ariento", default=ARIENTO_PRICING_PATH, help="Ariento Pricing workbook path or URL")
+    parser.add_argument("--service-catalogue", default=SERVICE_CATALOGUE_PATH, help="Service Catalogue workbook path or URL")
+    args = parser.parse_args()
+
+    archive = QuoteArchive(args.archive)
+    if args.append:
+        try:
+            index = build_price_index(load_catalog(args.ariento, args.service_catalogue))
+        except CatalogError as e:
+            raise SystemExit(str(e))
+        specs = load_quote_specs(args.append)
+        written = archive.append(
+            ((spec.get("name") or spec.get("company_name") or f"quote_{i}", price_quote(spec, index), spec.get("quoted_at"))
+             for i, spec in enumerate(specs)),
+            quoted_at=args.quoted_at,
+        )
+        print(f"Archived {written} line items from {len(specs)} quotes to {args.archive}")
+    if args.compact:
+        print(f"Compacted {archive.compact()} months")
+    if args.report:
+        with pd.option_context("display.width", 200, "display.max_columns", None, "display.max_colwidth", 60):
+            print(run_report(archive, args.report, args.segment, args.category, args.start, args.end, args.limit))
+    if not (args.append or args.compact or args.report):
+        print(archive.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import datetime
+import functools
+from io import BytesIO
+from PIL import Image as PILImage
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image as ReportLabImage
+from reportlab.platypus.tableofcontents import TableOfContents
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import simpleSplit
+from reportlab.lib import colors
+
+from catalog import LOGO_URL, load_logo
+from currency import BASE_CURRENCY, format_money
+from pricing import format_summary
+
+LEGAL_NOTICE = (
+    "Legal Notice: This quote is valid for 30 days from the date of issuance. Prices are subject to change after this period "
+    "and are contingent upon availability and market conditions at the time of order placement. This quote does not constitute "
+    "a binding agreement and is provided for informational purposes only. Terms and conditions may apply. Please contact us with "
+    "any questions or for further clarification."
+)
+
+
+# ----------------------------------------
+# Output Profiles
+# "standard" renders the PDF as it always has. "compact" is for quotes sent
+# by email in volume:
+#   - the logo is downsampled to twice its display size, flattened onto
+#     white and JPEG-encoded once per logo; ReportLab embeds JPEG data as-is,
+#     where the full-size PNG is decoded and deflated on every render
+#   - page content streams are always compressed
+#   - line-item descriptions are pre-wrapped plain strings, so a cell needs
+#     no nested Paragraph with its own graphics state, font and layout pass
+# bench_pdf_profiles.py reports the size and render time of each profile.
+# ----------------------------------------
+PDF_PROFILES = ["standard", "compact"]
+COMPACT_LOGO_SCALE = 2
+COMPACT_LOGO_QUALITY = 85
+# Table's default cell padding, left plus right
+CELL_PADDING = 12
+
+
+def doc_options(profile):
+    # Keyword arguments for the document template
+    if profile not in PDF_PROFILES:
+        raise ValueError(f"PDF profile must be one of: {', '.join(PDF_PROFILES)}")
+    return {"pageCompression": 1} if profile == "compact" else {}
+
+
+@functools.lru_cache(maxsize=8)
+def compact_logo(logo_bytes):
+    image = PILImage.open(BytesIO(logo_bytes))
+    width, height = logo_size(*image.size)
+    image.thumbnail((round(width * COMPACT_LOGO_SCALE), round(height * COMPACT_LOGO_SCALE)), PILImage.LANCZOS)
+    if image.mode != "RGB":
+        image = image.convert("RGBA")
+        flat = PILImage.new("RGB", image.size, "white")
+        flat.paste(image, mask=image.getchannel("A"))
+        image = flat
+    out = BytesIO()
+    image.save(out, "JPEG", quality=COMPACT_LOGO_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+# ----------------------------------------
+# Shared Building Blocks
+# ----------------------------------------
+SUMMARY_COL_WIDTHS = [100, 150, 50, 100, 100]
+
+
+def logo_size(original_width, original_height, max_width=150, max_height=75):
+    aspect_ratio = original_width / original_height
+    if original_width > max_width:
+        resized_width = max_width
+        resized_height = max_width / aspect_ratio
+    else:
+        resized_width = original_width
+        resized_height = original_height
+    if resized_height > max_height:
+        resized_height = max_height
+        resized_width = max_height * aspect_ratio
+    return resized_width, resized_height
+
+
+def logo_flowables(logo_bytes, styles, profile="standard"):
+    elements = []
+    try:
+        if logo_bytes is None:
+            logo_bytes = load_logo(LOGO_URL)
+        if logo_bytes is not None:
+            pil_image = PILImage.open(BytesIO(logo_bytes))
+            resized_width, resized_height = logo_size(*pil_image.size)
+            if profile == "compact":
+                logo_bytes = compact_logo(logo_bytes)
+            elements.append(ReportLabImage(BytesIO(logo_bytes), width=resized_width, height=resized_height))
+            elements.append(Spacer(1, 12))
+        else:
+            elements.append(Paragraph("Logo not found.", styles['Normal']))
+    except Exception as e:
+        elements.append(Paragraph(f"Error loading logo: {str(e)}", styles['Normal']))
+    return elements
+
+
+def summary_table(df, col_widths=SUMMARY_COL_WIDTHS, wrap_columns=(1,), profile="standard"):
+    wrap_style = ParagraphStyle(name="WrappedText", fontName="Helvetica", fontSize=10, leading=12, wordWrap="LTR")
+    table_data = [list(df.columns)]
+    for row in df.values.tolist():
+        for col in wrap_columns:
+            if profile == "compact":
+                # Same font, size and leading as the Paragraph, as plain text lines
+                row[col] = "\n".join(simpleSplit(str(row[col]), "Helvetica", 10, col_widths[col] - CELL_PADDING))
+            else:
+                row[col] = Paragraph(str(row[col]), wrap_style)
+        table_data.append(row)
+    table = Table(table_data, colWidths=col_widths)
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8A33D")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#F5F5F5")),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    if profile == "compact":
+        # Paragraphs are left aligned; keep the wrapped text where it was
+        for col in wrap_columns:
+            table_style.add('ALIGN', (col, 1), (col, -1), 'LEFT')
+    table.setStyle(table_style)
+    return table
+
+
+def cost_flowables(totals, styles):
+    currency = totals.get("currency", BASE_CURRENCY)
+    elements = []
+    if currency != BASE_CURRENCY:
+        elements.append(Paragraph(
+            f"Prices in {currency} at {totals['fx_rate']} {currency} per {BASE_CURRENCY}"
+            + (f" ({totals['fx_rate_date']} rate)" if totals.get("fx_rate_date") else ""), styles['Normal']))
+    if totals["raw_ariento_cost"] > 0:
+        elements.append(Paragraph(f"Ariento Licenses Cost ({totals['ariento_billing']} Recurring): {format_money(totals['new_ariento_cost'], currency)}", styles['Heading2']))
+    if totals["microsoft_cost"] > 0:
+        elements.append(Paragraph(f"{totals['microsoft_label']}: {format_money(totals['microsoft_cost'], currency)}", styles['Heading2']))
+    if totals["raw_meraki_cost"] > 0:
+        elements.append(Paragraph(f"Cisco Meraki Costs: {format_money(totals['raw_meraki_cost'], currency)}", styles['Normal']))
+    if totals["raw_resale_cost"] > 0:
+        elements.append(Paragraph(f"Resale License Costs: {format_money(totals['raw_resale_cost'], currency)}", styles['Normal']))
+    if totals["service_cost"] > 0:
+        elements.append(Paragraph(f"Other Resale Licenses Costs: {format_money(totals['service_cost'], currency)}", styles['Heading2']))
+    if totals["business_model"] != "Resale" and totals["show_onboarding"]:
+        elements.append(Paragraph(f"{totals['business_model']} Onboarding (One-Time): {format_money(totals['onboarding_price'], currency)}", styles['Heading2']))
+    return elements
+
+
+# ----------------------------------------
+# PDF Generation
+# `totals` is the totals dict produced by pricing.price_quote (or built the
+# same way by quote_tool.py), in the currency it names (pricing.convert_quote;
+# USD when it names none). When no logo bytes are passed the logo is
+# fetched from the repository, as the app has always done. `profile` is one
+# of PDF_PROFILES.
+# ----------------------------------------
+def generate_pdf(df, company_name, totals, logo_bytes=None, profile="standard"):
+    buffer = BytesIO()
+    pdf_doc = SimpleDocTemplate(buffer, pagesize=letter, **doc_options(profile))
+    elements = []
+    styles = getSampleStyleSheet()
+    elements.extend(logo_flowables(logo_bytes, styles, profile))
+    elements.append(Paragraph(f"Company: {company_name}", styles['Normal']))
+    current_datetime = datetime.datetime.now().strftime('%B %d, %Y %H:%M:%S')
+    elements.append(Paragraph(f"Date and Time: {current_datetime}", styles['Normal']))
+    elements.append(Spacer(1, 12))
+    elements.extend(cost_flowables(totals, styles))
+    elements.append(Spacer(1, 12))
+    elements.append(summary_table(df, profile=profile))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(LEGAL_NOTICE, styles['Normal']))
+    pdf_doc.build(elements)
+    pdf_data = buffer.getvalue()
+    buffer.close()
+    return pdf_data
+
+
+# ----------------------------------------
+# Scenario Comparison PDF
+# `comparison_df` is the formatted side-by-side table (metric rows, one
+# column per scenario); `scenarios` is a list of (name, price_quote result).
+# ----------------------------------------
+def generate_scenario_pdf(comparison_df, scenarios, company_name, logo_bytes=None, profile="standard"):
+    buffer = BytesIO()
+    pdf_doc = SimpleDocTemplate(buffer, pagesize=letter, **doc_options(profile))
+    styles = getSampleStyleSheet()
+    elements = logo_flowables(logo_bytes, styles, profile)
+    elements.append(Paragraph(f"Company: {company_name}", styles['Normal']))
+    current_datetime = datetime.datetime.now().strftime('%B %d, %Y %H:%M:%S')
+    elements.append(Paragraph(f"Date and Time: {current_datetime}", styles['Normal']))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph("Scenario Comparison", styles['Heading2']))
+    comparison = comparison_df.reset_index()
+    scenario_width = 400 / max(len(comparison.columns) - 1, 1)
+    elements.append(summary_table(
+        comparison, col_widths=[100] + [scenario_width] * (len(comparison.columns) - 1),
+        wrap_columns=range(len(comparison.columns)), profile=profile,
+    ))
+    for name, result in scenarios:
+        elements.append(PageBreak())
+        totals = result["totals"]
+        elements.append(Paragraph(name, styles['Heading2']))
+        if totals["ariento_plan"]:
+            elements.append(Paragraph(f"Plan: {totals['ariento_plan']} ({totals['ariento_billing']} billing)", styles['Normal']))
+        currency = totals.get("currency", BASE_CURRENCY)
+        elements.append(Paragraph(f"Quote Total: {format_money(totals['quote_total'], currency, grouping=True)}", styles['Normal']))
+        elements.append(Spacer(1, 12))
+        elements.append(summary_table(format_summary(result["line_items"], currency), profile=profile))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(LEGAL_NOTICE, styles['Normal']))
+    pdf_doc.build(elements)
+    pdf_data = buffer.getvalue()
+    buffer.close()
+    return pdf_data
+
+
+# ----------------------------------------
+# Quote Bundle PDF
+# Many priced quotes (an iterable of (name, price_quote result), e.g. one per
+# customer location) in one document: a cover page with a table of contents,
+# one section per quote and an optional grand-total page. The logo is drawn
+# on the cover and every section by one shared flowable: it is decoded once
+# and ReportLab embeds it once per document. The standard fonts are never
+# embedded.
+# ----------------------------------------
+BUNDLE_TOTAL_COLUMNS = ["Quote", "Plan", "Recurring", "Onboarding", "Discount", "Quote Total"]
+BUNDLE_COL_WIDTHS = [130, 130, 70, 70, 60, 70]
+
+
+class BundleDocTemplate(SimpleDocTemplate):
+    # Sends every quote heading to the table of contents and the PDF outline
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, Paragraph) and flowable.style.name == "BundleQuote":
+            text = flowable.getPlainText()
+            # Every quote starts on its own page
+            key = f"quote-page-{self.page}"
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(text, key, level=0)
+            self.notify("TOCEntry", (0, text, self.page, key))
+
+
+def bundle_totals_table(rows):
+    # rows: (name, totals) per quote, all in one currency; the last row is the grand total
+    currencies = {totals.get("currency", BASE_CURRENCY) for _, totals in rows}
+    if len(currencies) > 1:
+        raise ValueError(f"A bundle's grand total needs every quote in one currency, got {', '.join(sorted(currencies))}")
+    currency = currencies.pop() if currencies else BASE_CURRENCY
+    table_data = [BUNDLE_TOTAL_COLUMNS]
+    sums = [0.0, 0.0, 0.0, 0.0]
+    for name, totals in rows:
+        # Before the discount, which has its own column: Recurring + Onboarding - Discount = Quote Total
+        recurring = totals["raw_ariento_cost"] + totals["microsoft_cost"] + totals["service_cost"]
+        values = [recurring, totals["onboarding_price"], totals["total_discount"], totals["quote_total"]]
+        sums = [a + b for a, b in zip(sums, values)]
+        table_data.append([name, totals["ariento_plan"] or totals["business_model"]] + [format_money(v, currency, grouping=True) for v in values])
+    table_data.append(["Grand Total", f"{len(rows)} quotes"] + [format_money(v, currency, grouping=True) for v in sums])
+    wrap_style = ParagraphStyle(name="BundleWrap", fontName="Helvetica", fontSize=9, leading=11)
+    for row in table_data[1:]:
+        row[0] = Paragraph(str(row[0]), wrap_style)
+        row[1] = Paragraph(str(row[1]), wrap_style)
+    table = Table(table_data, colWidths=BUNDLE_COL_WIDTHS, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8A33D")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#F5F5F5")),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    return table
+
+
+def generate_bundle_pdf(quotes, company_name, logo_bytes=None, grand_total=True, out=None, profile="standard"):
+    # Writes to `out` (a binary file object) when given, else returns the bytes
+    buffer = out if out is not None else BytesIO()
+    pdf_doc = BundleDocTemplate(buffer, pagesize=letter, title=f"{company_name} Quotes", **doc_options(profile))
+    styles = getSampleStyleSheet()
+    quote_style = ParagraphStyle(name="BundleQuote", parent=styles['Heading1'])
+    # One logo flowable reused by every section, so the image is decoded once
+    logo = logo_flowables(logo_bytes, styles, profile)
+
+    elements = list(logo)
+    elements.append(Paragraph(f"Company: {company_name}", styles['Normal']))
+    current_datetime = datetime.datetime.now().strftime('%B %d, %Y %H:%M:%S')
+    elements.append(Paragraph(f"Date and Time: {current_datetime}", styles['Normal']))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph("Contents", styles['Heading2']))
+    toc = TableOfContents()
+    toc.levelStyles = [ParagraphStyle(name="BundleTOC", parent=styles['Normal'], leftIndent=10, firstLineIndent=-10)]
+    elements.append(toc)
+
+    total_rows = []
+    for name, result in quotes:
+        totals = result["totals"]
+        elements.append(PageBreak())
+        elements.extend(logo)
+        elements.append(Paragraph(name, quote_style))
+        if totals["ariento_plan"]:
+            elements.append(Paragraph(f"Plan: {totals['ariento_plan']}", styles['Normal']))
+        elements.append(Spacer(1, 12))
+        elements.extend(cost_flowables(totals, styles))
+        currency = totals.get("currency", BASE_CURRENCY)
+        elements.append(Paragraph(f"Quote Total: {format_money(totals['quote_total'], currency, grouping=True)}", styles['Heading2']))
+        elements.append(Spacer(1, 12))
+        elements.append(summary_table(format_summary(result["line_items"], currency), profile=profile))
+        total_rows.append((name, totals))
+
+    if grand_total:
+        elements.append(PageBreak())
+        elements.append(Paragraph("Grand Total", quote_style))
+        elements.append(Spacer(1, 12))
+        elements.append(bundle_totals_table(total_rows))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(LEGAL_NOTICE, styles['Normal']))
+    # Two passes: the first collects the page numbers for the table of contents
+    pdf_doc.multiBuild(elements)
+    if out is None:
+        return buffer.getvalue()
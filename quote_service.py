@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from aiohttp import web
+
+from catalog import ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, LOGO_PATH, CatalogError, load_catalog, load_logo
+from audit_log import AUDIT_LOG
+from currency import BASE_CURRENCY, FX_RATES
+from price_books import PRICE_BOOKS_PATH, PRICE_BOOK_CACHE, load_price_books
+from pricing import SPEC_CHOICES, build_price_index, convert_quote, format_summary, trace_quote, get_default_segment
+from quote_pdf import PDF_PROFILES, generate_pdf
+
+# ----------------------------------------
+# Async HTTP quote-pricing service
+#   POST /quote        price a quote spec, returns line items and totals as JSON
+#   POST /quote/pdf    price a quote spec, returns the quote PDF
+#                      (?profile=compact for the smaller email profile)
+#   Both quote endpoints take ?currency=GBP (and &rate_date=YYYY-MM-DD) to
+#   quote in another currency at the rates in fx_rates.csv, and ?book=NAME
+#   to price from another price book (see price_books.py).
+# Every quote and PDF served is recorded in the pricing audit log (see
+# audit_log.py).
+#   GET  /catalog      list catalog entries (?kind=seats|m365|meraki|resale&q=...&plan=...)
+# The catalog is loaded once at startup; other price books are loaded on
+# first use through the shared price-book cache, off the event loop. PDF
+# rendering runs in a process pool so the event loop keeps serving pricing
+# and catalog requests.
+# ----------------------------------------
+logger = logging.getLogger("quote_service")
+
+CATALOG_KINDS = ["seats", "m365", "meraki", "resale"]
+# The fields every selection in a quote spec's lists needs
+SELECTION_FIELDS = {
+    "seats": ["seat_type"],
+    "m365": ["sku_title"],
+    "meraki": ["description"],
+    "resale": ["vendor", "item"],
+}
+
+# Per-process logo bytes for the PDF workers, set once by the pool initializer
+_worker_logo = None
+
+
+def _init_pdf_worker(logo_bytes):
+    global _worker_logo
+    _worker_logo = logo_bytes
+
+
+def _render_pdf(line_items, totals, company_name, profile):
+    currency = totals.get("currency", BASE_CURRENCY)
+    return generate_pdf(format_summary(line_items, currency), company_name, totals, _worker_logo, profile)
+
+
+# ----------------------------------------
+# Catalog Listing
+# ----------------------------------------
+def build_catalog_listing(index):
+    listing = {kind: [] for kind in CATALOG_KINDS}
+    for (plan, seat), price in index["seats"].items():
+        listing["seats"].append({"plan": plan, "seat_type": seat, "price": price})
+    for (segment, term, billing, title), row in index["m365"].items():
+        if segment is not None:
+            listing["m365"].append({
+                "segment": segment, "term": term, "billing": billing, "sku_title": title,
+                "product_id": row["ProductID"], "sku_id": row["SkuId"], "price": row["Price"],
+            })
+    for desc, row in index["meraki"].items():
+        listing["meraki"].append({"description": desc, "sku": row["SKU"], "price": row["Price"]})
+    for (vendor, item), price in index["resale"].items():
+        try:
+            price = float(price)
+        except (ValueError, TypeError):
+            price = str(price)
+        listing["resale"].append({"vendor": vendor, "item": item, "price": price})
+    # Lower-cased search text per entry, built once so searches are a substring scan
+    search = {
+        kind: [" ".join(str(v) for v in entry.values()).lower() for entry in entries]
+        for kind, entries in listing.items()
+    }
+    return listing, search
+
+
+def search_catalog(listing, search, kind, query="", plan=None, limit=50):
+    query = query.lower()
+    segment = get_default_segment(plan) if plan else None
+    results = []
+    for entry, text in zip(listing[kind], search[kind]):
+        if query and query not in text:
+            continue
+        if plan and kind == "seats" and entry["plan"] != plan:
+            continue
+        if segment and kind == "m365" and entry["segment"] != segment:
+            continue
+        results.append(entry)
+        if len(results) >= limit:
+            break
+    return results
+
+
+# ----------------------------------------
+# Handlers
+# ----------------------------------------
+async def _read_spec(request):
+    try:
+        spec = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be a JSON quote spec.")
+    if not isinstance(spec, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON quote spec.")
+    error = spec_error(spec)
+    if error:
+        raise web.HTTPBadRequest(text=f"Invalid quote spec: {error}")
+    return spec
+
+
+def spec_error(spec):
+    # What is wrong with the spec's choice fields or selection lists, or None
+    for field, options in SPEC_CHOICES.items():
+        if field in spec and spec[field] not in options:
+            return f"{field} must be one of: {', '.join(options)}."
+    for kind, fields in SELECTION_FIELDS.items():
+        selections = spec.get(kind, [])
+        if not isinstance(selections, list):
+            return f"{kind} must be a list of objects."
+        for i, sel in enumerate(selections):
+            if not isinstance(sel, dict):
+                return f"{kind}[{i}] must be an object."
+            missing = [field for field in fields if not isinstance(sel.get(field), str)]
+            if missing:
+                return f"{kind}[{i}] needs {', '.join(missing)} (a string)."
+            quantity = sel.get("quantity", 1)
+            if not isinstance(quantity, int) or isinstance(quantity, bool):
+                return f"{kind}[{i}].quantity must be an integer."
+    return None
+
+
+async def _price_index(request):
+    # (index, audit context) for the startup catalog or the ?book= price book
+    name = request.query.get("book")
+    if name is None:
+        return request.app["index"], {"price_book": None}
+    if name not in request.app["price_books"]:
+        raise web.HTTPBadRequest(text=f"book must be one of: {', '.join(request.app['price_books'])}")
+    loop = asyncio.get_running_loop()
+    try:
+        shards = await loop.run_in_executor(None, PRICE_BOOK_CACHE.get, request.app["price_books"][name])
+    except CatalogError as e:
+        raise web.HTTPServiceUnavailable(text=f"Price book {name!r} is unavailable: {e}")
+    return shards.price_index(), {"price_book": name, "catalog_version": shards.version}
+
+
+def _price(request, spec, event, index, context):
+    currency = request.query.get("currency", BASE_CURRENCY)
+    try:
+        rate, rate_date = FX_RATES.rate(currency, request.query.get("rate_date"))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    try:
+        result, pricing = trace_quote(spec, index)
+    except (ValueError, KeyError, TypeError) as e:
+        raise web.HTTPBadRequest(text=f"Invalid quote spec: {e}")
+    result = convert_quote(result, currency, rate, rate_date)
+    AUDIT_LOG.record(event, spec.get("company_name") or "Company_Name", spec, result, pricing, **context)
+    return result
+
+
+async def handle_quote(request):
+    spec = await _read_spec(request)
+    index, context = await _price_index(request)
+    return web.json_response(_price(request, spec, "service", index, context))
+
+
+async def handle_quote_pdf(request):
+    profile = request.query.get("profile", "standard")
+    if profile not in PDF_PROFILES:
+        raise web.HTTPBadRequest(text=f"profile must be one of: {', '.join(PDF_PROFILES)}")
+    spec = await _read_spec(request)
+    index, context = await _price_index(request)
+    result = _price(request, spec, "service_pdf", index, context)
+    company_name = spec.get("company_name") or "Company_Name"
+    loop = asyncio.get_running_loop()
+    pdf_bytes = await loop.run_in_executor(
+        request.app["pdf_pool"], _render_pdf, result["line_items"], result["totals"], company_name, profile
+    )
+    return web.Response(body=pdf_bytes, content_type="application/pdf")
+
+
+async def handle_catalog(request):
+    kind = request.query.get("kind", "m365")
+    if kind not in CATALOG_KINDS:
+        raise web.HTTPBadRequest(text=f"kind must be one of: {', '.join(CATALOG_KINDS)}")
+    try:
+        limit = int(request.query.get("limit", 50))
+    except ValueError:
+        raise web.HTTPBadRequest(text="limit must be an integer.")
+    results = search_catalog(
+        request.app["listing"], request.app["search"], kind,
+        query=request.query.get("q", ""), plan=request.query.get("plan"), limit=limit,
+    )
+    return web.json_response({"kind": kind, "count": len(results), "results": results})
+
+
+# ----------------------------------------
+# Application
+# ----------------------------------------
+async def _close_pdf_pool(app):
+    app["pdf_pool"].shutdown(wait=True)
+
+
+def create_app(ariento_source=ARIENTO_PRICING_PATH, service_source=SERVICE_CATALOGUE_PATH,
+               logo_source=LOGO_PATH, pdf_workers=2, catalog_cache=None, price_books=None):
+    catalog = load_catalog(ariento_source, service_source, catalog_cache)
+    index = build_price_index(catalog)
+    logo_bytes = load_logo(logo_source)
+    app = web.Application()
+    app["index"] = index
+    app["price_books"] = price_books or {}
+    app["listing"], app["search"] = build_catalog_listing(index)
+    logger.info("Catalog loaded: %s", ", ".join(f"{len(v)} {k}" for k, v in app["listing"].items()))
+    app["pdf_pool"] = ProcessPoolExecutor(
+        max_workers=pdf_workers, initializer=_init_pdf_worker, initargs=(logo_bytes,)
+    )
+    app.on_cleanup.append(_close_pdf_pool)
+    app.router.add_post("/quote", handle_quote)
+    app.router.add_post("/quote/pdf", handle_quote_pdf)
+    app.router.add_get("/catalog", handle_catalog)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ariento quote-pricing HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pdf-workers", type=int, default=2)
+    parser.add_argument("--ariento", default=ARIENTO_PRICING_PATH, help="Ariento Pricing workbook path or URL")
+    parser.add_argument("--service-catalogue", default=SERVICE_CATALOGUE_PATH, help="Service Catalogue workbook path or URL")
+    parser.add_argument("--logo", default=LOGO_PATH, help="Logo image path or URL")
+    parser.add_argument("--catalog-cache", help="Rebuild only changed catalog sheets, caching tables in this directory")
+    parser.add_argument("--price-books", default=PRICE_BOOKS_PATH, help="Price books file for ?book= (see price_books.py)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        price_books = load_price_books(args.price_books)
+        app = create_app(args.ariento, args.service_catalogue, args.logo, args.pdf_workers, args.catalog_cache, price_books)
+    except (CatalogError, ValueError) as e:
+        raise SystemExit(str(e))
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
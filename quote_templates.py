@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+
+from catalog import REPO_DIR, ARIENTO_PRICING_PATH, SERVICE_CATALOGUE_PATH, CATALOG_CACHE_DIR, CatalogError
+from catalog_shards import load_catalog_shards
+from pricing import (
+    ONBOARDING_TYPES, DISCOUNT_SCOPES, format_summary, price_quote, price_resolved, resolve_plan, resolve_quote,
+)
+
+# ----------------------------------------
+# Quote Templates
+# Named standard bundles kept as quote specs in quote_templates.json, e.g.
+# "Enclave One (GCC-H) + N users of O365 G3 + an MX appliance". A line with
+# "per_unit": true is multiplied by the number of units (users) the template
+# is applied for; other lines keep their quantity. Templates are resolved
+# against the price index once per catalog version (see resolve_quote) and
+# kept with their one-unit pricing, so applying one at any size only runs
+# the line arithmetic and rules (price_resolved). The cache is keyed on the
+# catalog version and the templates file, so a changed workbook or template
+# is resolved again on its next use.
+#   entry = TEMPLATE_CACHE.get(shards.version, shards.price_index())["Enclave One (GCC-H) Standard"]
+#   spec, result = apply_template(entry, units=25, company_name="Acme")
+#   python quote_templates.py --apply "Enclave One (GCC-H) Standard" --units 25
+# ----------------------------------------
+TEMPLATES_PATH = os.path.join(REPO_DIR, "quote_templates.json")
+LINE_KINDS = ["seats", "m365", "meraki", "resale"]
+# Catalog versions (or template file versions) whose resolved templates are kept
+TEMPLATE_CACHE_VERSIONS = 4
+
+
+def load_templates(path=TEMPLATES_PATH):
+    # {name: template} in file order; ValueError for a malformed file
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read quote templates from {path}: {e}")
+    templates = {}
+    for template in data.get("templates", []):
+        name = template.get("name")
+        spec = template.get("spec")
+        if not name or not isinstance(spec, dict):
+            raise ValueError("Every quote template needs a name and a spec")
+        if name in templates:
+            raise ValueError(f"Quote template {name!r} is defined twice")
+        resolve_plan(spec)
+        templates[name] = dict(template, unit=template.get("unit", "unit"), description=template.get("description", ""))
+    return templates
+
+
+def resolve_template(template, index):
+    resolved = resolve_quote(template["spec"], index)
+    per_unit = [bool(template["spec"][line["kind"]][line["source"]].get("per_unit")) for line in resolved["lines"]]
+    entry = {"template": template, "resolved": resolved, "per_unit": per_unit}
+    entry["unit_result"] = price_resolved(resolved, template_quantities(entry, 1))
+    return entry
+
+
+def template_quantities(entry, units):
+    # One quantity per resolved line for `units` units
+    return [
+        line["quantity"] * units if per_unit else line["quantity"]
+        for line, per_unit in zip(entry["resolved"]["lines"], entry["per_unit"])
+    ]
+
+
+def scaled_spec(template, units, company_name=None):
+    # The template as a complete quote spec for `units` units, with the
+    # choices it leaves out set to their defaults (as in pricing.price_quote)
+    spec = template["spec"]
+    business_model, plan = resolve_plan(spec)
+    scaled = {
+        "company_name": company_name or "",
+        "business_model": business_model,
+        "plan": plan,
+        "ariento_billing": spec.get("ariento_billing", "Monthly"),
+        "m365_term": spec.get("m365_term", "Annual"),
+        "m365_billing": spec.get("m365_billing", "Annual"),
+        "onboarding_type": spec.get("onboarding_type", ONBOARDING_TYPES[0]),
+        "onboarding_price": float(spec.get("onboarding_price", 3000.0)),
+        "discount_option": spec.get("discount_option", "No Discount"),
+        "discount_percentage": float(spec.get("discount_percentage", 10.0)),
+        "discount_scope": spec.get("discount_scope", DISCOUNT_SCOPES[0]),
+    }
+    for kind in LINE_KINDS:
+        scaled[kind] = [
+            dict({k: v for k, v in sel.items() if k != "per_unit"},
+                 quantity=int(sel.get("quantity", 1)) * (units if sel.get("per_unit") else 1))
+            for sel in spec.get(kind, [])
+        ]
+    return scaled
+
+
+def apply_template(entry, units, company_name=None):
+    # (quote spec, price_quote result) for the template at `units` units
+    result = price_resolved(entry["resolved"], template_quantities(entry, units))
+    return scaled_spec(entry["template"], units, company_name), result
+
+
+class TemplateCache:
+    # Resolved templates per (catalog version, templates file), shared by
+    # every session in the process; the oldest versions are dropped first
+    def __init__(self, path=TEMPLATES_PATH, max_versions=TEMPLATE_CACHE_VERSIONS):
+        self.path = path
+        self.max_versions = max_versions
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, catalog_version, index):
+        # {name: resolved template}; ValueError for a malformed templates file
+        stat = os.stat(self.path)
+        key = (catalog_version, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        entries = {name: resolve_template(template, index) for name, template in load_templates(self.path).items()}
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entries
+            while len(self._entries) > self.max_versions:
+                self._entries.popitem(last=False)
+        return entries
+
+    def stats(self):
+        with self._lock:
+            return {"versions": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+TEMPLATE_CACHE = TemplateCache()
+
+
+def _timed_best(fn, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List, apply and time the quote templates")
+    parser.add_argument("--apply", help="Template to price")
+    parser.add_argument("--units", type=int, default=1, help="Units (e.g. users) to apply the template for")
+    parser.add_argument("--bench", action="store_true", help="Time applying every template against pricing its spec")
+    parser.add_argument("--ariento", default=ARIENTO_PRICING_PATH, help="Ariento Pricing workbook path or URL")
+    parser.add_argument("--service-catalogue", default=SERVICE_CATALOGUE_PATH, help="Service Catalogue workbook path or URL")
+    args = parser.parse_args()
+
+    try:
+        shards = load_catalog_shards(args.ariento, args.service_catalogue, cache_dir=CATALOG_CACHE_DIR)
+        entries = TEMPLATE_CACHE.get(shards.version, shards.price_index())
+    except (CatalogError, ValueError) as e:
+        raise SystemExit(str(e))
+
+    if args.apply:
+        if args.apply not in entries:
+            raise SystemExit(f"No quote template named {args.apply!r}; templates: {', '.join(entries)}")
+        spec, result = apply_template(entries[args.apply], args.units)
+        print(format_summary(result["line_items"]).to_string(index=False))
+        print(f"Quote total: ${result['totals']['quote_total']:,.2f}")
+        for warning in result["warnings"]:
+            print(f"Warning: {warning}")
+        return
+
+    print(f"Catalog version {shards.version}")
+    print(f"{'template':<32}{'lines':>6}{'per unit':>10}{'1-unit total':>16}")
+    for name, entry in entries.items():
+        print(f"{name:<32}{len(entry['resolved']['lines']):>6}{sum(entry['per_unit']):>10}"
+              f"{entry['unit_result']['totals']['quote_total']:>16,.2f}")
+        for warning in entry["resolved"]["warnings"]:
+            print(f"  warning: {warning}")
+
+    if args.bench:
+        runs = 200
+        index = shards.price_index()
+        print()
+        print(f"{'template':<32}{'resolve us':>12}{'apply us':>10}{'price_quote us':>16}")
+        for name, entry in entries.items():
+            spec = scaled_spec(entry["template"], args.units)
+            resolve = _timed_best(lambda: resolve_template(entry["template"], index), runs)
+            apply = _timed_best(lambda: apply_template(entry, args.units), runs)
+            full = _timed_best(lambda: price_quote(spec, index), runs)
+            assert apply_template(entry, args.units)[1] == price_quote(spec, index), name
+            print(f"{name:<32}{resolve * 1e6:>12.1f}{apply * 1e6:>10.1f}{full * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
 import streamlit as st
-import pandas as pd
 import datetime
-import requests
 from io import BytesIO
 from PIL import Image
-from PIL import Image as PILImage
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as ReportLabImage
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
 import re
+from urllib.parse import quote_plus
+
+from catalog import LOGO_URL, CatalogError, load_logo
+from price_books import PRICE_BOOK_CACHE, load_price_books
+from currency import BASE_CURRENCY, CURRENCIES, FX_RATES, format_money
+from pricing import PLAN_OPTIONS, DISCOUNT_OPTIONS, DISCOUNT_SCOPES, get_default_segment, format_summary, convert_quote, trace_quote
+from tiers import seat_cost
+from pdf_queue import RENDER_QUEUE
+from exports import EXPORT_FORMATS, export_bytes
+from scenarios import compare_scenarios, format_comparison, price_scenarios
+from sweeps import SWEEP_COLUMNS, axis_label, parse_quantities, sweep_quote, curve_chart_data
+from share_links import LINK_PARAM, encode_quote, decode_quote
+from quote_templates import TEMPLATE_CACHE, apply_template
+from audit_log import AUDIT_LOG
 
 # Custom CSS to widen select boxes
 st.markdown("""
@@ -22,104 +29,117 @@ st.markdown("""
 
 # ----------------------------------------
 # Data Loading Functions
+# The session's price book (see price_books.py) comes from the sidebar or a
+# ?book= link. Compiled catalogs are shared by every session through
+# PRICE_BOOK_CACHE, so a rerun only parses a workbook that changed; plan and
+# segment rows are loaded on first use (see catalog_shards.py).
 # ----------------------------------------
+PRICE_BOOK_PARAM = "book"
+LINE_WIDGET_PREFIXES = (
+    "seat_type_", "seat_qty_", "resale_vendor_", "resale_item_", "resale_qty_",
+    "m365_sku_", "m365_qty_", "meraki_desc_", "meraki_qty_",
+)
+
+def clear_line_state():
+    # Line selections belong to the previous price book's catalog
+    for key in [key for key in st.session_state if key.startswith(LINE_WIDGET_PREFIXES)]:
+        del st.session_state[key]
+
 def load_data():
-    # Load Ariento Pricing data
-    ariento_url = "https://raw.githubusercontent.com/Robi-Show/Quote-Tool/main/Ariento%20Pricing%202025.xlsx"
-    response = requests.get(ariento_url)
-    if response.status_code != 200:
-        st.error("Failed to fetch the Ariento Pricing Excel file. Please check the file URL.")
-        st.stop()
-    ariento_file = BytesIO(response.content)
     try:
-        ariento_plans = pd.read_excel(ariento_file, sheet_name="Ariento Plans")
-        license_types = pd.read_excel(ariento_file, sheet_name="Ariento License Type")
-    except KeyError as e:
-        st.error(f"Missing sheet or column in Ariento Pricing file: {e}")
+        price_books = load_price_books()
+    except ValueError as e:
+        st.error(str(e))
         st.stop()
-
-    # Load Service Catalogue data
-    service_catalog_url = "https://raw.githubusercontent.com/Robi-Show/Quote-Tool/main/Service+Catalogue.xlsx"
-    response_service = requests.get(service_catalog_url)
-    if response_service.status_code != 200:
-        st.error("Failed to fetch the Service Catalogue Excel file. Please check the file URL.")
-        st.stop()
-    service_file = BytesIO(response_service.content)
-
+    if PRICE_BOOK_PARAM in st.query_params and not st.session_state.get("book_restored"):
+        # Once per session, like a ?q= link
+        st.session_state["book_restored"] = True
+        if st.query_params[PRICE_BOOK_PARAM] in price_books:
+            st.session_state["price_book"] = st.query_params[PRICE_BOOK_PARAM]
+        else:
+            st.warning(f"No price book named {st.query_params[PRICE_BOOK_PARAM]!r}; using {next(iter(price_books))}.")
+    book_name = next(iter(price_books))
+    if len(price_books) > 1:
+        book_name = st.sidebar.selectbox("Price Book", list(price_books), key="price_book", on_change=clear_line_state)
+        st.sidebar.caption(price_books[book_name]["description"])
     try:
-        all_sheets = pd.read_excel(service_file, sheet_name=None)
-        available_sheet_names = list(all_sheets.keys())
-
-        cisco_meraki = None
-        m365_sheet = None
-
-        for sheet_name, df in all_sheets.items():
-            lower_name = sheet_name.lower().replace(" ", "")
-            if "ciscomeraki" in lower_name:
-                cisco_meraki = df
-            if "m365" in lower_name:
-                m365_sheet = df
-
-        if cisco_meraki is None or m365_sheet is None:
-            st.error("Required sheets (Cisco Meraki, M365) not found. Available: " + ", ".join(available_sheet_names))
-            st.stop()
-
-        # Clean Cisco & M365
-        def filter_sheet(df, required_cols):
-            df.columns = df.columns.str.strip()
-            for col in required_cols:
-                if col in df.columns:
-                    df = df.dropna(subset=[col])
-            if "Price" in df.columns:
-                df = df[~df["Price"].astype(str).str.strip().isin(["Quote Only", "Custom", "Ad Hoc as needed"])]
-            for col in ["Notes", "Minimum Specs"]:
-                if col in df.columns:
-                    df = df.drop(columns=[col])
-            return df
-
-        cisco_meraki = filter_sheet(cisco_meraki, ["Price"])
-        m365 = filter_sheet(m365_sheet, ["Billing Cycle", "Term Commit", "Price"])
-
-        if "Segment" in m365.columns:
-            m365 = m365[~m365["Segment"].isin(["Education", "Charity", "GCC-High GOV ONLY"])]
-
-    except Exception as e:
-        st.error(f"Error loading Service Catalogue Excel file: {e}")
+        shards = PRICE_BOOK_CACHE.get(price_books[book_name])
+    except CatalogError as e:
+        st.error(f"{book_name}: {e}")
         st.stop()
-
-    # Resale Sheet — OUTSIDE the try block
-    resale_sheet = all_sheets.get("Third Party Resale ", pd.DataFrame())
-    if not resale_sheet.empty:
-        resale_sheet.columns = resale_sheet.columns.str.strip()
-        resale_sheet = resale_sheet[
-            ~resale_sheet["Price"].astype(str).str.strip().isin(["Quote Only", "Custom", "Ad Hoc as needed"])
-        ]
-        resale_sheet = resale_sheet.rename(columns={"SKU": "Item"})
-    else:
-        resale_sheet = pd.DataFrame()
-
-    return ariento_plans, license_types, cisco_meraki, m365, resale_sheet
-
-def get_default_segment(plan):
-    if "GCC-H" in plan or "GCCH" in plan:
-        return "GCC-High NON GOV"
-    elif "GCC" in plan:
-        return "GCC"
-    elif "Commercial" in plan:
-        return "Commercial"
-    else:
-        return None
+    return book_name, price_books, shards
 
 # Load data
-ariento_plans, license_types, cisco_meraki, m365, resale_sheet = load_data()
+price_book, price_books, shards = load_data()
+ariento_plans, cisco_meraki, resale_sheet = (
+    shards.tables["ariento_plans"], shards.tables["cisco_meraki"], shards.tables["resale_sheet"]
+)
+price_index = shards.price_index()
+seat_tiers = price_index["seat_tiers"]
+
+# ----------------------------------------
+# Shared Quote Links
+# A ?q= link (see share_links.py) sets every widget's session state before
+# any widget is drawn, so the whole quote is rebuilt in this one run. Widgets
+# that state can set only pass their default value when it has not (see
+# widget_default), as Streamlit warns about a widget given both.
+# ----------------------------------------
+CUSTOM_ENCLAVE_OPTIONS = {
+    "Commercial": ["Professional Plan (Commercial)", "Enterprise Plan (Commercial)"],
+    "GCC": ["Turnkey CMMC Level 2 Plan (GCC)", "Turnkey CMMC Level 3 Plan (GCC)"],
+    "GCC-H": ["Turnkey CMMC Level 2 Plan (GCC-High)", "Turnkey CMMC Level 3 Plan (GCC-High)"],
+}
+
+def widget_default(key, value):
+    # value= for the widget with this key, unless session state already sets it
+    return {} if key in st.session_state else {"value": value}
+
+def link_widget_state(spec):
+    business_model = spec["business_model"]
+    state = {
+        "company_name": spec["company_name"],
+        "business_model": business_model,
+        "ariento_billing": spec["ariento_billing"],
+        "m365_term": spec["m365_term"],
+        "m365_billing": spec["m365_billing"],
+        "onboarding_type": spec["onboarding_type"],
+        "discount_option": spec["discount_option"],
+        "discount_scope": spec["discount_scope"],
+    }
+    if business_model == "Enclave One":
+        state["enclave_option"] = spec["plan"]
+    elif business_model == "Custom Enclave":
+        segment = next(seg for seg, plans in CUSTOM_ENCLAVE_OPTIONS.items() if spec["plan"] in plans)
+        state["custom_segment"] = segment
+        state[f"custom_option_{segment}"] = spec["plan"]
+    if spec["onboarding_type"] == "Other":
+        state["other_onboarding_price"] = spec["onboarding_price"]
+    if spec["discount_option"] == "Percentage Discount":
+        state["discount_percentage"] = spec["discount_percentage"]
+    for i, sel in enumerate(spec["seats"]):
+        state.update({f"seat_type_{i}": sel["seat_type"], f"seat_qty_{i}": sel["quantity"]})
+    for i, sel in enumerate(spec["resale"]):
+        state.update({f"resale_vendor_{i}": sel["vendor"], f"resale_item_{i}": sel["item"], f"resale_qty_{i}": sel["quantity"]})
+    for i, sel in enumerate(spec["m365"]):
+        state.update({f"m365_sku_{i}": sel["sku_title"], f"m365_qty_{i}": sel["quantity"]})
+    for i, sel in enumerate(spec["meraki"]):
+        state.update({f"meraki_desc_{i}": sel["description"], f"meraki_qty_{i}": sel["quantity"]})
+    return state
+
+if LINK_PARAM in st.query_params and not st.session_state.get("link_restored"):
+    # Once per session: later reruns keep whatever the user changes
+    st.session_state["link_restored"] = True
+    try:
+        st.session_state.update(link_widget_state(decode_quote(st.query_params[LINK_PARAM], price_index)))
+    except ValueError as e:
+        st.warning(f"Could not open the shared quote: {e}")
 
 # ----------------------------------------
 # Title, Logo, and Description
 # ----------------------------------------
-logo_url = "https://raw.githubusercontent.com/Robi-Show/Quote-Tool/main/Ariento%20Logo%20Blue.png"
-response_logo = requests.get(logo_url)
-if response_logo.status_code == 200:
-    logo = Image.open(BytesIO(response_logo.content))
+logo_bytes = load_logo(LOGO_URL)
+if logo_bytes is not None:
+    logo = Image.open(BytesIO(logo_bytes))
     st.image(logo, width=200)
 else:
     st.error("Logo file not found. Please ensure 'Ariento Logo Blue.png' is in the repository.")
@@ -128,26 +148,48 @@ st.markdown('<h1 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Ar
 st.markdown('<hr style="border: 1px solid #E8A33D;">', unsafe_allow_html=True)
 st.markdown('<p style="font-family: Arial; font-size: 12pt; color: #3265A7;">This tool generates a quote based on Ariento Pricing and Service Catalogue data.</p>', unsafe_allow_html=True)
 
+# ----------------------------------------
+# Quote Templates
+# Applying a template (see quote_templates.py) replaces the plan, choices and
+# lines with the template's, scaled to the chosen number of units, in one
+# rerun; the company name is kept. Templates are resolved once per catalog
+# version, so the preview total is priced on every rerun without lookups.
+# ----------------------------------------
+def apply_template_state(entry, units):
+    # Runs before the next rerun draws any widget
+    clear_line_state()
+    spec, _ = apply_template(entry, units, st.session_state.get("company_name", ""))
+    st.session_state.update(link_widget_state(spec))
+
+try:
+    quote_templates = TEMPLATE_CACHE.get(shards.version, price_index)
+except (OSError, ValueError) as e:
+    quote_templates = {}
+    st.warning(f"Quote templates are unavailable: {e}")
+if quote_templates:
+    with st.expander("Start from a Template"):
+        template_name = st.selectbox("Template", list(quote_templates), key="template_name")
+        template_entry = quote_templates[template_name]
+        template_units = st.number_input(f"Number of {template_entry['template']['unit']}s", min_value=1, value=1, key="template_units")
+        _, template_quote = apply_template(template_entry, template_units)
+        st.caption(f"{template_entry['template']['description']} | Quote total: ${template_quote['totals']['quote_total']:,.2f}")
+        st.button("Apply Template", on_click=apply_template_state, args=(template_entry, template_units))
+
 # ----------------------------------------
 # Company Name & Business Model
 # ----------------------------------------
-company_name = st.text_input("Enter Company Name")
+company_name = st.text_input("Enter Company Name", key="company_name")
 def sanitize_filename(name):
     return re.sub(r'[^a-zA-Z0-9_\-]', '_', name)
 
 st.markdown("### Business Model Selection")
-business_model = st.radio("Select Business Model", options=["Enclave One", "Custom Enclave", "MSSP", "Resale"])
+business_model = st.radio("Select Business Model", options=["Enclave One", "Custom Enclave", "MSSP", "Resale"], key="business_model")
 
 if business_model == "Enclave One":
-    enclave_option = st.selectbox("Select Enclave One Option", ["Enclave One (GCC)", "Enclave One (GCC-H)"])
+    enclave_option = st.selectbox("Select Enclave One Option", ["Enclave One (GCC)", "Enclave One (GCC-H)"], key="enclave_option")
 elif business_model == "Custom Enclave":
-    custom_segment = st.selectbox("Select Custom Enclave Segment", ["Commercial", "GCC", "GCC-H"])
-    if custom_segment == "Commercial":
-        custom_option = st.selectbox("Select Option", ["Professional Plan (Commercial)", "Enterprise Plan (Commercial)"])
-    elif custom_segment == "GCC":
-        custom_option = st.selectbox("Select Option", ["Turnkey CMMC Level 2 Plan (GCC)", "Turnkey CMMC Level 3 Plan (GCC)"])
-    elif custom_segment == "GCC-H":
-        custom_option = st.selectbox("Select Option", ["Turnkey CMMC Level 2 Plan (GCC-High)", "Turnkey CMMC Level 3 Plan (GCC-High)"])
+    custom_segment = st.selectbox("Select Custom Enclave Segment", list(CUSTOM_ENCLAVE_OPTIONS), key="custom_segment")
+    custom_option = st.selectbox("Select Option", CUSTOM_ENCLAVE_OPTIONS[custom_segment], key=f"custom_option_{custom_segment}")
 elif business_model == "MSSP":
     mssp_option = "MSSP"
 elif business_model == "Resale":
@@ -182,7 +224,8 @@ if business_model != "Resale":
     else:
         ariento_billing_options = ["Monthly", "Annual"]
     ariento_billing = st.radio("Ariento Billing Cycle", options=ariento_billing_options, index=0, key="ariento_billing")
-    filtered_licenses = license_types[license_types["Plan"] == ariento_plan]
+    # The validated catalog has one row per (Plan, Seat Type)
+    seat_prices = shards.license_types(ariento_plan).set_index("Seat Type")["Price"]
     
     # Set up the tooltip link based on business model
     if business_model in ["Custom Enclave", "MSSP"]:
@@ -194,15 +237,17 @@ if business_model != "Resale":
     st.markdown(f"<strong>Select a Seat Type</strong> {see_types_link}", unsafe_allow_html=True)
     
     seat_types = {}
-    seat_type_options = filtered_licenses["Seat Type"].unique()
+    seat_type_options = seat_prices.index
     while True:
-        seat_type = st.selectbox("", ["Select Seat Type"] + list(seat_type_options), key=f"seat_type_{len(seat_types)}")
+        seat_type = st.selectbox("Select Seat Type", ["Select Seat Type"] + list(seat_type_options), key=f"seat_type_{len(seat_types)}", label_visibility="collapsed")
         if seat_type == "Select Seat Type" or seat_type == "":
             break
-        quantity = st.number_input(f"Quantity for {seat_type}", min_value=0, value=1, key=f"seat_qty_{len(seat_types)}")
+        qty_key = f"seat_qty_{len(seat_types)}"
+        quantity = st.number_input(f"Quantity for {seat_type}", min_value=0, key=qty_key, **widget_default(qty_key, 1))
         if quantity > 0:
-            price = filtered_licenses.loc[filtered_licenses["Seat Type"] == seat_type, "Price"].values[0]
-            cost = quantity * price
+            # Seat types with volume tiers show their average unit price
+            cost = seat_cost(seat_tiers, ariento_plan, seat_type, quantity, seat_prices[seat_type])
+            price = cost / quantity
             st.write(f"Price: ${price:.2f} | Quantity: {quantity} | Cost: ${cost:.2f}")
             seat_types[seat_type] = quantity
 else:
@@ -215,68 +260,51 @@ if business_model == "Resale":
     st.markdown('<h2 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Third Party Licenses</h2>', unsafe_allow_html=True)
 
     resale_selections = []
+    resale_prices = resale_sheet.set_index(["Vendor", "Item"])["Price"]
+    vendor_options = resale_sheet["Vendor"].unique()
 
-    try:
-        # Validate required columns
-        required_cols = {"Vendor", "Item", "Price"}
-        if not required_cols.issubset(set(resale_sheet.columns)):
-            st.error(f"Missing one or more required columns in Resale sheet: {', '.join(required_cols)}")
-            st.stop()
-
-        vendor_options = resale_sheet["Vendor"].dropna().unique()
-
-        while True:
-            cols = st.columns(3)
-
-            with cols[0]:
-                vendor = st.selectbox(
-                    "Select Vendor",
-                    ["Select Vendor"] + list(vendor_options),
-                    key=f"resale_vendor_{len(resale_selections)}"
-                )
-            if vendor == "Select Vendor" or vendor == "":
-                break
-
-            # Get SKUs for selected vendor
-            vendor_items = resale_sheet[resale_sheet["Vendor"] == vendor]["Item"].dropna().unique()
-            with cols[1]:
-                item = st.selectbox(
-                    "Select Item",
-                    ["Select Item"] + list(vendor_items),
-                    key=f"resale_item_{len(resale_selections)}"
-                )
-            if item == "Select Item" or item == "":
-                break
-
-            with cols[2]:
-                quantity = st.number_input(
-                    f"Quantity for {vendor} - {item}",
-                    min_value=0,
-                    value=1,
-                    key=f"resale_qty_{len(resale_selections)}"
-                )
-
-            if quantity > 0:
-                row_match = resale_sheet[
-                    (resale_sheet["Vendor"] == vendor) & (resale_sheet["Item"] == item)
-                ]
-
-                if not row_match.empty:
-                    try:
-                        price = float(row_match["Price"].values[0])
-                        cost = price * quantity
-                        st.write(f"Price: ${price:.2f} | Quantity: {quantity} | Cost: ${cost:.2f}")
-                        resale_selections.append({
-                            "Vendor": vendor,
-                            "Item": item,
-                            "Price": price,
-                            "Quantity": quantity
-                        })
-                    except (ValueError, TypeError):
-                        st.warning("Selected item has an invalid price value.")
-
-    except Exception as e:
-        st.error(f"An error occurred while processing Resale Licenses: {str(e)}")
+    while True:
+        cols = st.columns(3)
+
+        with cols[0]:
+            vendor = st.selectbox(
+                "Select Vendor",
+                ["Select Vendor"] + list(vendor_options),
+                key=f"resale_vendor_{len(resale_selections)}"
+            )
+        if vendor == "Select Vendor" or vendor == "":
+            break
+
+        # Get SKUs for selected vendor
+        vendor_items = resale_sheet.loc[resale_sheet["Vendor"] == vendor, "Item"].unique()
+        with cols[1]:
+            item = st.selectbox(
+                "Select Item",
+                ["Select Item"] + list(vendor_items),
+                key=f"resale_item_{len(resale_selections)}"
+            )
+        if item == "Select Item" or item == "":
+            break
+
+        with cols[2]:
+            qty_key = f"resale_qty_{len(resale_selections)}"
+            quantity = st.number_input(
+                f"Quantity for {vendor} - {item}",
+                min_value=0,
+                key=qty_key,
+                **widget_default(qty_key, 1)
+            )
+
+        if quantity > 0:
+            price = resale_prices[(vendor, item)]
+            cost = price * quantity
+            st.write(f"Price: ${price:.2f} | Quantity: {quantity} | Cost: ${cost:.2f}")
+            resale_selections.append({
+                "Vendor": vendor,
+                "Item": item,
+                "Price": price,
+                "Quantity": quantity
+            })
 
 
 # ----------------------------------------
@@ -301,30 +329,16 @@ with col_m365_1:
 with col_m365_2:
     m365_billing = st.radio("M365 Billing Cycle", options=m365_billing_options, index=0, key="m365_billing")
 
-if default_segment:
-    m365_filtered = m365[m365["Segment"].astype(str).str.strip() == default_segment]
-else:
-    m365_filtered = m365.copy()
-
-# Normalize term and billing values from Excel to match your UI selections
-m365_filtered["Term Commit"] = m365_filtered["Term Commit"].astype(str).str.strip().replace({
-    "Month": "Monthly",
-    "month": "Monthly",
-    "Annual": "Annual"
-})
-m365_filtered["Billing Cycle"] = m365_filtered["Billing Cycle"].astype(str).str.strip().replace({
-    "Month": "Monthly",
-    "month": "Monthly",
-    "Annual": "Annual"
-})
-
-# Now filter based on UI selections
+# Segment, term and billing values are normalized when the catalog is validated
+m365_filtered = shards.m365(default_segment)
 m365_filtered = m365_filtered[
     (m365_filtered["Term Commit"] == m365_term) &
     (m365_filtered["Billing Cycle"] == m365_billing)
 ]
 
-m365_options = m365_filtered["SkuTitle"].unique()
+# Without a segment the same SkuTitle can appear once per segment; the first row wins
+m365_rows = m365_filtered.drop_duplicates("SkuTitle").set_index("SkuTitle")
+m365_options = m365_rows.index
 m365_selections = []
 while True:
     cols = st.columns(2)
@@ -333,30 +347,29 @@ while True:
     if selected_sku == "Select License" or selected_sku == "":
         break
     with cols[1]:
-        quantity = st.number_input(f"Quantity for {selected_sku}", min_value=0, value=1, key=f"m365_qty_{len(m365_selections)}")
+        qty_key = f"m365_qty_{len(m365_selections)}"
+        quantity = st.number_input(f"Quantity for {selected_sku}", min_value=0, key=qty_key, **widget_default(qty_key, 1))
     if quantity > 0:
-        row_match = m365_filtered[m365_filtered["SkuTitle"] == selected_sku]
-        if not row_match.empty:
-            price = row_match["Price"].values[0]
-            productID = row_match["ProductId"].values[0]
-            skuId = row_match["SkuId"].values[0]
-            cost = price * quantity
-            st.write(f"Price: ${price:.2f} | Quantity: {quantity} | Cost: ${cost:.2f}")
-            m365_selections.append({
-                "SkuTitle": selected_sku,
-                "ProductID": productID,
-                "SkuId": skuId,
-                "Price": price,
-                "Quantity": quantity
-            })
-        else:
-            st.warning("No matching row found for this SkuTitle with the selected Term/Billing combination.")
+        row_match = m365_rows.loc[selected_sku]
+        price = row_match["Price"]
+        productID = row_match["ProductId"]
+        skuId = row_match["SkuId"]
+        cost = price * quantity
+        st.write(f"Price: ${price:.2f} | Quantity: {quantity} | Cost: ${cost:.2f}")
+        m365_selections.append({
+            "SkuTitle": selected_sku,
+            "ProductID": productID,
+            "SkuId": skuId,
+            "Price": price,
+            "Quantity": quantity
+        })
 
 # ----------------------------------------
 # Cisco Meraki Section (same font as Ariento Licenses)
 # ----------------------------------------
 st.markdown('<h2 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Cisco Meraki Licenses</h2>', unsafe_allow_html=True)
-meraki_options = cisco_meraki["Description"].unique()
+meraki_rows = cisco_meraki.set_index("Description")
+meraki_options = meraki_rows.index
 meraki_selections = []
 while True:
     cols = st.columns(2)
@@ -365,244 +378,122 @@ while True:
     if selected_desc == "Select License" or selected_desc == "":
         break
     with cols[1]:
-        quantity = st.number_input(f"Quantity for {selected_desc}", min_value=0, value=1, key=f"meraki_qty_{len(meraki_selections)}")
+        qty_key = f"meraki_qty_{len(meraki_selections)}"
+        quantity = st.number_input(f"Quantity for {selected_desc}", min_value=0, key=qty_key, **widget_default(qty_key, 1))
     if quantity > 0:
-        row_match = cisco_meraki[cisco_meraki["Description"] == selected_desc]
-        if not row_match.empty:
-            price = row_match["Price"].values[0]
-            sku_val = row_match["SKU"].values[0]
-            cost = price * quantity
-            st.write(f"Price: ${price:.2f} | Quantity: {quantity} | Cost: ${cost:.2f}")
-            meraki_selections.append({
-                "Description": selected_desc,
-                "SKU": sku_val,
-                "Price": price,
-                "Quantity": quantity
-            })
-        else:
-            st.warning("No matching row found for this description.")
+        row_match = meraki_rows.loc[selected_desc]
+        price = row_match["Price"]
+        sku_val = row_match["SKU"]
+        cost = price * quantity
+        st.write(f"Price: ${price:.2f} | Quantity: {quantity} | Cost: ${cost:.2f}")
+        meraki_selections.append({
+            "Description": selected_desc,
+            "SKU": sku_val,
+            "Price": price,
+            "Quantity": quantity
+        })
 
-if business_model != "Resale":
-    ariento_base_cost = sum(
-        qty * (license_types.loc[
-            (license_types["Plan"] == ariento_plan) & (license_types["Seat Type"] == seat),
-            "Price"
-        ].values[0] if not license_types.loc[
-            (license_types["Plan"] == ariento_plan) & (license_types["Seat Type"] == seat),
-            "Price"
-        ].empty else 0.0)
-        for seat, qty in seat_types.items()
-    )
-    if ariento_billing == "Annual" and ("GCC-H" not in ariento_plan and "GCCH" not in ariento_plan):
-        raw_ariento_cost = 12 * ariento_base_cost
-    else:
-        raw_ariento_cost = ariento_base_cost
-else:
-    ariento_base_cost = 0
-    raw_ariento_cost = 0
-    
 # ----------------------------------------
 # Onboarding Section (same font as Ariento Licenses)
+# The onboarding price is filled in once the quote is priced below
 # ----------------------------------------
+onboarding_type, onboarding_price = "None", 3000.0
+onboarding_slot = None
 if business_model != "Resale":
     st.markdown('<h2 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Onboarding</h2>', unsafe_allow_html=True)
 
-    onboarding_type = st.selectbox("Select Onboarding Payment Type", ["One Time Onboarding Payment", "Other", "None"])
-
-    if onboarding_type == "None":
-        onboarding_price = 0
-        show_onboarding = False
-
-    elif onboarding_type == "Other":
-        onboarding_price = st.number_input("Enter Onboarding Price", min_value=0.0, value=3000.0)
-        show_onboarding = True
-
-    else:  # "One Time Onboarding Payment"
-        if ariento_billing == "Annual":
-            base = ariento_base_cost
-        else:
-            base = ariento_base_cost * 2  # Approximate monthly logic
-
-        onboarding_price = max(base, 3000)
-        show_onboarding = True
-
-    if show_onboarding:
-        st.write(f"Onboarding Price: ${onboarding_price:,.2f}")
-else:
-    onboarding_price = 0
-    show_onboarding = False
+    onboarding_type = st.selectbox("Select Onboarding Payment Type", ["One Time Onboarding Payment", "Other", "None"], key="onboarding_type")
+    if onboarding_type == "Other":
+        onboarding_price = st.number_input("Enter Onboarding Price", min_value=0.0, key="other_onboarding_price", **widget_default("other_onboarding_price", 3000.0))
+    onboarding_slot = st.empty()
 
 # ----------------------------------------
 # Discount Options (applied only to Ariento Licenses and Onboarding)
+# Whether the scope can include onboarding depends on the priced quote, so
+# the scope radio is drawn below; until then its value is read from session state
 # ----------------------------------------
 st.markdown('<h2 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Discount</h2>', unsafe_allow_html=True)
-discount_option = st.selectbox("Select Discount Option", ["No Discount", "30 Days Free", "10% Discount", "Percentage Discount"])
-
-if discount_option == "10% Discount":
-    discount_percentage = 0.10
-elif discount_option == "Percentage Discount":
-    discount_percentage = st.number_input("Enter Discount Percentage", min_value=0.0, max_value=100.0, value=10.0, step=0.1) / 100.0
-else:
-    discount_percentage = 0.0
-
-if discount_option != "No Discount" and show_onboarding:
-    discount_scope = st.radio(
-        "Apply Discount To:",
-        options=["Ariento Licenses Only", "Ariento Licenses + Onboarding"],
-        index=0
-    )
-else:
-    discount_scope = "Ariento Licenses Only"  # Default fallback
-
-# Calculate total discount and apply it proportionally
-if discount_option != "No Discount":
-    discount_base = raw_ariento_cost
-    apply_onboarding_discount = False
+discount_option = st.selectbox("Select Discount Option", ["No Discount", "30 Days Free", "10% Discount", "Percentage Discount"], key="discount_option")
 
-    if discount_scope == "Ariento Licenses + Onboarding" and show_onboarding:
-        discount_base += onboarding_price
-        apply_onboarding_discount = True
+discount_percentage = 10.0
+if discount_option == "Percentage Discount":
+    discount_percentage = st.number_input("Enter Discount Percentage", min_value=0.0, max_value=100.0, step=0.1, key="discount_percentage", **widget_default("discount_percentage", 10.0))
+discount_scope_slot = st.empty()
 
-    total_discount = discount_percentage * discount_base
-
-    discount_ariento = discount_percentage * raw_ariento_cost
-    new_ariento_cost = raw_ariento_cost - discount_ariento
-
-    if show_onboarding:
-        if apply_onboarding_discount:
-            discount_onboarding = discount_percentage * onboarding_price
-            new_onboarding_price = onboarding_price - discount_onboarding
-            if new_onboarding_price < 3000 and onboarding_type == "One Time Onboarding Payment":
-                new_onboarding_price = 3000
-        else:
-            discount_onboarding = 0
-            new_onboarding_price = onboarding_price
-    else:
-        discount_onboarding = 0
-        new_onboarding_price = onboarding_price
-else:
-    total_discount = 0
-    discount_ariento = 0
-    discount_onboarding = 0
-    new_ariento_cost = raw_ariento_cost
-    new_onboarding_price = onboarding_price
+# ----------------------------------------
+# Quote Spec
+# The selections above as a plain quote spec (see pricing.trace_quote): the
+# quote is priced from it, and the audit log, share link and scenario and
+# volume what-if sections below use it too
+# ----------------------------------------
+base_spec = {
+    "business_model": business_model,
+    "plan": ariento_plan,
+    "ariento_billing": ariento_billing if business_model != "Resale" else "Monthly",
+    "seats": [{"seat_type": seat, "quantity": qty} for seat, qty in seat_types.items()],
+    "m365_term": m365_term,
+    "m365_billing": m365_billing,
+    "m365": [{"sku_title": sel["SkuTitle"], "quantity": sel["Quantity"]} for sel in m365_selections],
+    "meraki": [{"description": sel["Description"], "quantity": sel["Quantity"]} for sel in meraki_selections],
+    "resale": [{"vendor": sel["Vendor"], "item": sel["Item"], "quantity": sel["Quantity"]} for sel in resale_selections] if business_model == "Resale" else [],
+    "onboarding_type": onboarding_type,
+    "onboarding_price": onboarding_price,
+    "discount_option": discount_option,
+    "discount_percentage": discount_percentage,
+    "discount_scope": st.session_state.get("discount_scope", DISCOUNT_SCOPES[0]) if discount_option != "No Discount" else DISCOUNT_SCOPES[0],
+}
 
 # ----------------------------------------
 # Final Cost Calculation
+# Priced once, as in the service and exports; quote_pricing is what the
+# quote was priced from, for the audit log
 # ----------------------------------------
+priced_quote, quote_pricing = trace_quote(base_spec, price_index)
+for warning in priced_quote["warnings"]:
+    st.warning(warning)
+if onboarding_slot is not None and priced_quote["totals"]["show_onboarding"]:
+    onboarding_slot.write(f"Onboarding Price: ${priced_quote['totals']['onboarding_price']:,.2f}")
+if discount_option != "No Discount" and priced_quote["totals"]["show_onboarding"]:
+    with discount_scope_slot:
+        st.radio("Apply Discount To:", options=DISCOUNT_SCOPES, index=0, key="discount_scope")
 
-raw_m365_cost = sum(
-    msel["Price"] * msel["Quantity"] for msel in m365_selections
-) if m365_selections else 0
-
-raw_meraki_cost = sum(
-    msel["Price"] * msel["Quantity"] for msel in meraki_selections
-) if meraki_selections else 0
-
-raw_resale_cost = sum(
-    item["Price"] * item["Quantity"] for item in resale_selections
-) if business_model == "Resale" else 0
-
-microsoft_cost = raw_m365_cost
-service_cost = raw_meraki_cost + raw_resale_cost
-
-if business_model != "Resale" and business_model != "Enclave One":
-    raw_onboarding = max(2 * raw_ariento_cost / (12 if ariento_billing == "Annual" else 1), 3000)
-else:
-    raw_onboarding = 0
-
-if discount_option != "No Discount":
-    discount_ariento = discount_percentage * raw_ariento_cost
-    new_ariento_cost = raw_ariento_cost - discount_ariento
-
-    if show_onboarding:
-        discount_onboarding = discount_percentage * onboarding_price
-        new_onboarding_price = onboarding_price - discount_onboarding
-        if new_onboarding_price < 3000 and onboarding_type == "One Time Onboarding Payment":
-            new_onboarding_price = 3000
-    else:
-        discount_onboarding = 0
-        new_onboarding_price = onboarding_price
-else:
-    new_ariento_cost = raw_ariento_cost
-    new_onboarding_price = onboarding_price
-    discount_ariento = 0
-    discount_onboarding = 0
-    
-if ariento_plan is not None and (( "GCC-H" in ariento_plan or "GCCH" in ariento_plan) or (m365_billing == "Annual")):
-    microsoft_label = "Microsoft Licenses Costs (Annual Recurring)"
-else:
-    microsoft_label = "Microsoft Licenses Costs (Monthly Recurring)"
+# ----------------------------------------
+# Quote Currency
+# The quote is priced in USD and converted as a whole at the chosen rate
+# (see pricing.convert_quote); the catalog prices above stay in USD.
+# ----------------------------------------
+currency_cols = st.columns(2)
+quote_currency = currency_cols[0].selectbox("Quote Currency", list(CURRENCIES), key="quote_currency")
+fx_rate, fx_rate_date = 1.0, None
+if quote_currency != BASE_CURRENCY:
+    try:
+        rate_dates = [str(rate_date) for rate_date in reversed(FX_RATES.dates(quote_currency))]
+        fx_rate, fx_rate_date = FX_RATES.rate(quote_currency, currency_cols[1].selectbox("FX Rate Date", rate_dates, key="fx_rate_date"))
+        currency_cols[1].caption(f"1 {BASE_CURRENCY} = {fx_rate} {quote_currency}")
+    except ValueError as e:
+        st.error(f"Quoting in {BASE_CURRENCY}: {e}")
+        quote_currency = BASE_CURRENCY
 
 # ----------------------------------------
-# Display Separate Costs
+# Summary Table
 # ----------------------------------------
-if new_ariento_cost > 0:
-    st.markdown(f"### Ariento Licenses Cost ({ariento_billing} Recurring): ${new_ariento_cost:.2f}")
-if microsoft_cost > 0:
-    st.markdown(f"### {microsoft_label}: ${microsoft_cost:.2f}")
-if service_cost > 0:
-    st.markdown(f"### Service License Costs (Recurring): ${service_cost:.2f}")
+converted = convert_quote(priced_quote, quote_currency, fx_rate, fx_rate_date)
+line_items, quote_totals = converted["line_items"], converted["totals"]
 
 # ----------------------------------------
-# Build Summary Table
+# Display Separate Costs
 # ----------------------------------------
+if quote_totals["new_ariento_cost"] > 0:
+    st.markdown(f"### Ariento Licenses Cost ({quote_totals['ariento_billing']} Recurring): {format_money(quote_totals['new_ariento_cost'], quote_currency)}")
+if quote_totals["microsoft_cost"] > 0:
+    st.markdown(f"### {quote_totals['microsoft_label']}: {format_money(quote_totals['microsoft_cost'], quote_currency)}")
+if quote_totals["service_cost"] > 0:
+    st.markdown(f"### Service License Costs (Recurring): {format_money(quote_totals['service_cost'], quote_currency)}")
+
 st.markdown('<h2 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Summary of Selected Items</h2>', unsafe_allow_html=True)
-data = []
 
-# Ariento Licenses
-if business_model != "Resale":
-    for seat, qty in seat_types.items():
-        price_row = license_types.loc[
-            (license_types["Plan"] == ariento_plan) & (license_types["Seat Type"] == seat),
-            "Price"
-        ]
-        price = price_row.values[0] if not price_row.empty else 0.0
-
-        if ariento_billing == "Annual" and ("GCC-H" not in ariento_plan and "GCCH" not in ariento_plan):
-            display_price = price * 12
-        else:
-            display_price = price
-
-        cost = qty * display_price
-        data.append(["Ariento License", seat, qty, f"${display_price:.2f}", f"${cost:.2f}"])
-
-# M365 Licenses
-for msel in m365_selections:
-    stitle = msel["SkuTitle"]
-    productID = msel["ProductID"]
-    skuId = msel["SkuId"]
-    price = msel["Price"]
-    qty = msel["Quantity"]
-    cost = price * qty
-    data.append(["M365", f"{stitle} (ProductId: {productID}, SkuId: {skuId})", qty, f"${price:.2f}", f"${cost:.2f}"])
-
-# Cisco Meraki
-for msel in meraki_selections:
-    price = msel["Price"]
-    qty = msel["Quantity"]
-    cost = price * qty
-    data.append(["Cisco Meraki", f"{msel['Description']} (SKU: {msel['SKU']})", qty, f"${price:.2f}", f"${cost:.2f}"])
-
-# Resale
-if business_model == "Resale":
-    for item in resale_selections:
-        price = item["Price"]
-        qty = item["Quantity"]
-        cost = price * qty
-        data.append(["Resale License", f"{item['Vendor']} - {item['Item']}", qty, f"${price:.2f}", f"${cost:.2f}"])
-
-# Onboarding
-if business_model != "Resale" and show_onboarding:
-    data.append(["Onboarding", business_model, 1, f"${onboarding_price:.2f}", f"${onboarding_price:.2f}"])
-
-# Discounts
-if discount_option != "No Discount" and total_discount > 0:
-    data.append(["Discount", discount_option, "-", f"-${total_discount:.2f}", f"-${total_discount:.2f}"])
-
-# Render table
-summary_df = pd.DataFrame(data, columns=["Category", "Item", "Quantity", "Price Per Unit", "Total Cost"])
-summary_df = summary_df.astype(str)
+# Render table (exports below use the numeric line items)
+summary_df = format_summary(line_items, quote_currency)
 st.table(summary_df.style.hide(axis='index'))
 
 # ----------------------------------------
@@ -621,98 +512,210 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ----------------------------------------
-# CSV Download
+# Pricing Audit Log
+# Every download queues its quotes, as exported, for the audit log (see
+# audit_log.py); the record is built and written off the script thread
+# ----------------------------------------
+audit_context = {"price_book": price_book, "catalog_version": shards.version}
+
+def record_exports(event, quotes, context):
+    # quotes: (name, spec, exported result, what it was priced from) per quote in the download
+    for name, spec, result, pricing in quotes:
+        AUDIT_LOG.record(event, name, spec, result, pricing, **context)
+
+# ----------------------------------------
+# CSV / XLSX / JSON Downloads
+# Numeric cells streamed from the line items (see exports.py); each file is
+# only built (and audited) when its button is clicked
 # ----------------------------------------
 def convert_df_to_csv(df):
     return df.to_csv(index=False).encode('utf-8')
 
-csv_data = convert_df_to_csv(summary_df)
-st.download_button(
-    label="Download Summary as CSV",
-    data=csv_data,
-    file_name=f"{sanitize_filename(file_prefix)}_quote.csv",
-    mime="text/csv"
-)
+def audited_export(export_format):
+    record_exports(export_format, [(export_quote[0][0], base_spec, export_quote[0][1], quote_pricing)], audit_context)
+    return export_bytes(export_quote, export_format)
+
+export_quote = [(company_name if company_name else "Company_Name", {"line_items": line_items, "totals": quote_totals})]
+for export_label, export_format in (("CSV", "csv"), ("Excel", "xlsx"), ("JSON", "json")):
+    st.download_button(
+        label=f"Download Summary as {export_label}",
+        data=lambda export_format=export_format: audited_export(export_format),
+        file_name=f"{sanitize_filename(file_prefix)}_quote.{export_format}",
+        mime=EXPORT_FORMATS[export_format],
+    )
 
 # ----------------------------------------
 # PDF Generation
+# PDFs render in the shared background queue (see pdf_queue.py) rather than
+# on this script thread. Until a file is ready the section shows a status
+# and polls for it; a full queue is retried on the next poll.
+# ----------------------------------------
+PDF_POLL_SECONDS = 1.0
+
+@st.fragment(run_every=PDF_POLL_SECONDS)
+def poll_pdf(kind, args):
+    state, _ = RENDER_QUEUE.request(kind, *args)
+    if state in ("done", "failed"):
+        st.rerun()
+    elif state == "busy":
+        st.info("Rendering PDF... (waiting for a free slot in the render queue)")
+    else:
+        st.info("Rendering PDF...")
+
+def pdf_download(label, file_name, kind, *args, audit=None):
+    # audit: record_exports arguments for the quotes in this PDF
+    state, value = RENDER_QUEUE.request(kind, *args)
+    if state == "done":
+        st.download_button(label=label, data=value, file_name=file_name, mime="application/pdf",
+                           on_click=record_exports if audit else "rerun", args=audit)
+    elif state == "failed":
+        st.error(f"Could not render the PDF: {value}")
+    else:
+        poll_pdf(kind, args)
+
+pdf_download(
+    "Download Summary as PDF", f"{sanitize_filename(file_prefix)}_quote.pdf",
+    "quote", summary_df, company_name if company_name else "Company_Name", quote_totals, logo_bytes,
+    audit=("pdf", [(export_quote[0][0], base_spec, export_quote[0][1], quote_pricing)], audit_context),
+)
+
+with st.expander("PDF Render Queue"):
+    pdf_metrics = RENDER_QUEUE.metrics()
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Queue Depth", f"{pdf_metrics['queue_depth']} / {pdf_metrics['max_pending']}")
+    metric_cols[1].metric("Rendering", f"{pdf_metrics['rendering']} / {pdf_metrics['workers']}")
+    wait_ms, render_ms = pdf_metrics["wait_ms"], pdf_metrics["render_ms"]
+    metric_cols[2].metric("Wait p50 / p95", f"{wait_ms['p50']} / {wait_ms['p95']} ms" if wait_ms["p50"] is not None else "-")
+    metric_cols[3].metric("Render p50 / p95", f"{render_ms['p50']} / {render_ms['p95']} ms" if render_ms["p50"] is not None else "-")
+    st.caption(f"Completed: {pdf_metrics['completed']} | Failed: {pdf_metrics['failed']} | Turned away while full: {pdf_metrics['rejected']}")
+
+with st.expander("Catalog Cache"):
+    book_stats, shard_stats = PRICE_BOOK_CACHE.stats(), shards.cache_stats()
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Price Books Loaded", len(book_stats["books"]))
+    metric_cols[1].metric("Price Book Memory", f"{book_stats['bytes'] / 2**20:.1f} / {book_stats['max_bytes'] / 2**20:.0f} MB")
+    metric_cols[2].metric("Price Book Hits / Misses", f"{book_stats['hits']} / {book_stats['misses']}")
+    metric_cols[3].metric("Shard Memory", f"{shard_stats['bytes'] / 2**20:.1f} / {shard_stats['max_bytes'] / 2**20:.0f} MB")
+    st.caption(f"Price book: {price_book} | Refreshed unchanged: {book_stats['refreshes']} | "
+               f"Evicted: {book_stats['evictions']} price books, {shard_stats['evictions']} shards")
+
+    # Rows that failed catalog validation are left out of the pickers above
+    validation_report = shards.validation_report
+    if validation_report.empty:
+        st.caption("Catalog validation: no rows quarantined.")
+    else:
+        st.warning(f"{len(validation_report)} catalog rows failed validation and are not offered for quoting.")
+        st.dataframe(
+            validation_report.groupby(["Table", "Reason"]).size().rename("Rows").reset_index(), hide_index=True
+        )
+        st.dataframe(validation_report, hide_index=True)
+        st.download_button(
+            label="Download Quarantined Rows as CSV",
+            data=convert_df_to_csv(validation_report),
+            file_name=f"{sanitize_filename(price_book)}_quarantined_rows.csv",
+            mime="text/csv"
+        )
+
 # ----------------------------------------
-def generate_pdf(df, company_name):
-    buffer = BytesIO()
-    pdf_doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
+# Share Link
+# This quote as a ?q= link that rebuilds it when opened
+# ----------------------------------------
+with st.expander("Share This Quote"):
     try:
-        logo_path = "https://raw.githubusercontent.com/Robi-Show/Quote-Tool/main/Ariento%20Logo%20Blue.png"
-        response_logo = requests.get(logo_path)
-        if response_logo.status_code == 200:
-            pil_image = PILImage.open(BytesIO(response_logo.content))
-            original_width, original_height = pil_image.size
-            max_width, max_height = 150, 75
-            aspect_ratio = original_width / original_height
-            if original_width > max_width:
-                resized_width = max_width
-                resized_height = max_width / aspect_ratio
+        share_token = encode_quote(dict(base_spec, company_name=company_name), price_index)
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        app_url = (st.context.url or "").split("?")[0]
+        book_param = f"&{PRICE_BOOK_PARAM}={quote_plus(price_book)}" if price_book != next(iter(price_books)) else ""
+        st.code(f"{app_url}?{LINK_PARAM}={share_token}{book_param}", language=None)
+        st.caption("Anyone opening this link sees the quote exactly as selected above.")
+
+# ----------------------------------------
+# Scenario Comparison
+# Prices the selections above under several plan / billing / term / discount
+# variants in one batch and shows them side by side.
+# ----------------------------------------
+st.markdown('<h2 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Scenario Comparison</h2>', unsafe_allow_html=True)
+if st.checkbox("Compare pricing scenarios", key="scenario_mode"):
+    scenario_count = st.number_input("Number of Scenarios", min_value=2, max_value=4, value=2, key="scenario_count")
+    variants = []
+    for i, col in enumerate(st.columns(int(scenario_count))):
+        with col:
+            name = st.text_input("Scenario Name", value=f"Scenario {i + 1}", key=f"scenario_name_{i}")
+            variant = {"name": name}
+            if business_model != "Resale":
+                plan_options = PLAN_OPTIONS[business_model]
+                variant["plan"] = st.selectbox("Plan", plan_options, index=plan_options.index(ariento_plan), key=f"scenario_plan_{i}")
+                if business_model == "Enclave One" and ("GCC-H" in variant["plan"] or "GCCH" in variant["plan"]):
+                    billing_options = ["Annual"]
+                else:
+                    billing_options = ["Monthly", "Annual"]
+                variant["ariento_billing"] = st.radio("Ariento Billing", billing_options, key=f"scenario_billing_{i}")
+                gcc_high = "GCC-H" in variant["plan"] or "GCCH" in variant["plan"]
             else:
-                resized_width = original_width
-                resized_height = original_height
-            if resized_height > max_height:
-                resized_height = max_height
-                resized_width = max_height * aspect_ratio
-            elements.append(ReportLabImage(BytesIO(response_logo.content), width=resized_width, height=resized_height))
-            elements.append(Spacer(1, 12))
-        else:
-            elements.append(Paragraph("Logo not found.", styles['Normal']))
-    except Exception as e:
-        elements.append(Paragraph(f"Error loading logo: {str(e)}", styles['Normal']))
-    elements.append(Paragraph(f"Company: {company_name}", styles['Normal']))
-    current_datetime = datetime.datetime.now().strftime('%B %d, %Y %H:%M:%S')
-    elements.append(Paragraph(f"Date and Time: {current_datetime}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-    if raw_ariento_cost > 0:
-        elements.append(Paragraph(f"Ariento Licenses Cost ({ariento_billing} Recurring): ${new_ariento_cost:.2f}", styles['Heading2']))
-    if microsoft_cost > 0:
-        elements.append(Paragraph(f"{microsoft_label}: ${microsoft_cost:.2f}", styles['Heading2']))
-    if raw_meraki_cost > 0:
-        elements.append(Paragraph(f"Cisco Meraki Costs: ${raw_meraki_cost:.2f}", styles['Normal']))
-    if raw_resale_cost > 0:
-        elements.append(Paragraph(f"Resale License Costs: ${raw_resale_cost:.2f}", styles['Normal']))
-    if service_cost > 0:
-        elements.append(Paragraph(f"Other Resale Licenses Costs: ${service_cost:.2f}", styles['Heading2']))
-    if business_model != "Resale" and show_onboarding:
-        elements.append(Paragraph(f"{business_model} Onboarding (One-Time): ${onboarding_price:.2f}", styles['Heading2']))
-    elements.append(Spacer(1, 12))
-    wrap_style = ParagraphStyle(name="WrappedText", fontName="Helvetica", fontSize=10, leading=12, wordWrap="LTR")
-    table_data = [list(df.columns)]
-    for row in df.values.tolist():
-        row[1] = Paragraph(str(row[1]), wrap_style)
-        table_data.append(row)
-    table = Table(table_data, colWidths=[100, 150, 50, 100, 100])
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8A33D")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#F5F5F5")),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ])
-    table.setStyle(table_style)
-    elements.append(table)
-    elements.append(Spacer(1, 12))
-    legal_notice = (
-        "Legal Notice: This quote is valid for 30 days from the date of issuance. Prices are subject to change after this period "
-        "and are contingent upon availability and market conditions at the time of order placement. This quote does not constitute "
-        "a binding agreement and is provided for informational purposes only. Terms and conditions may apply. Please contact us with "
-        "any questions or for further clarification."
+                gcc_high = False
+            m365_options_scenario = ["Annual"] if gcc_high else ["Annual", "Monthly"]
+            variant["m365_term"] = st.radio("M365 Term", m365_options_scenario, key=f"scenario_m365_term_{i}")
+            variant["m365_billing"] = st.radio("M365 Billing", m365_options_scenario, key=f"scenario_m365_billing_{i}")
+            variant["discount_option"] = st.selectbox("Discount", DISCOUNT_OPTIONS, key=f"scenario_discount_{i}")
+            if variant["discount_option"] == "Percentage Discount":
+                variant["discount_percentage"] = st.number_input("Discount %", min_value=0.0, max_value=100.0, value=10.0, step=0.1, key=f"scenario_discount_pct_{i}")
+            if variant["discount_option"] != "No Discount" and base_spec["onboarding_type"] != "None":
+                variant["discount_scope"] = st.radio("Apply Discount To:", DISCOUNT_SCOPES, key=f"scenario_discount_scope_{i}")
+            variants.append(variant)
+
+    comparison, scenario_spec_list = compare_scenarios(
+        base_spec, variants, shards.price_tables([variant.get("plan", ariento_plan) for variant in variants])
     )
-    elements.append(Paragraph(legal_notice, styles['Normal']))
-    pdf_doc.build(elements)
-    pdf_data = buffer.getvalue()
-    buffer.close()
-    return pdf_data
-
-pdf_bytes = generate_pdf(summary_df, company_name if company_name else "Company_Name")
-st.download_button(label="Download Summary as PDF", data=pdf_bytes, file_name=f"{sanitize_filename(file_prefix)}_quote.pdf", mime="application/pdf")
+    comparison_display = format_comparison(comparison)
+    st.table(comparison_display)
+    if comparison.loc["Unmatched Lines"].astype(int).sum() > 0:
+        st.warning("Some selected items have no price under one or more scenarios (for example an M365 SKU outside the scenario's segment) and are left out of those totals.")
+
+    scenario_priced = price_scenarios(scenario_spec_list, variants, price_index)
+    scenario_results = [(name, result) for name, result, _ in scenario_priced]
+    pdf_download(
+        "Download Scenario Comparison as PDF", f"{sanitize_filename(file_prefix)}_scenarios.pdf",
+        "scenarios", comparison_display, scenario_results, company_name if company_name else "Company_Name", logo_bytes,
+        audit=("scenario_pdf", [(name, spec, result, pricing) for (name, result, pricing), spec in zip(scenario_priced, scenario_spec_list)],
+               audit_context),
+    )
+
+# ----------------------------------------
+# Volume What-If
+# Prices the quote above over ranges of seat or M365 quantities in one pass
+# and plots the quote total against the first quantity.
+# ----------------------------------------
+st.markdown('<h2 style="font-family: Arial; font-size: 14pt; color: #E8A33D;">Volume What-If</h2>', unsafe_allow_html=True)
+if st.checkbox("Price this quote over a range of quantities", key="sweep_mode"):
+    sweep_options = []
+    if business_model != "Resale":
+        sweep_options += [{"kind": "seats", "item": seat} for seat in seat_prices.index]
+    sweep_options += [{"kind": "m365", "item": title} for title in m365_options]
+    sweep_labels = {axis_label(axis): axis for axis in sweep_options}
+    chosen = st.multiselect("Quantities to vary (up to 3)", list(sweep_labels), max_selections=3, key="sweep_items")
+    axes = []
+    for label in chosen:
+        text = st.text_input(f"Quantities for {label} (e.g. 25, 50, 100 or 10-500:10)", value="25, 50, 100, 500", key=f"sweep_qty_{label}")
+        axes.append(dict(sweep_labels[label], quantities=text))
+
+    if axes:
+        try:
+            for axis in axes:
+                axis["quantities"] = parse_quantities(axis["quantities"])
+            curve = sweep_quote(base_spec, axes, price_index)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.line_chart(curve_chart_data(curve, axes))
+            st.dataframe(
+                curve, hide_index=True,
+                column_config={col: st.column_config.NumberColumn(format="$%.2f") for col in SWEEP_COLUMNS},
+            )
+            st.download_button(
+                label="Download Price Curve as CSV",
+                data=convert_df_to_csv(curve),
+                file_name=f"{sanitize_filename(file_prefix)}_price_curve.csv",
+                mime="text/csv"
+            )
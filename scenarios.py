@@ -0,0 +1,76 @@
+import pandas as pd
+
+from pricing import price_quotes_batch, trace_quote
+
+# ----------------------------------------
+# Scenario Comparison
+# A scenario is a variant of one quote: the seat, M365, Meraki and resale
+# selections stay fixed while the plan, billing, term and discount change.
+# All scenarios are priced together in one batch.
+# ----------------------------------------
+SCENARIO_FIELDS = [
+    "plan", "ariento_billing", "m365_term", "m365_billing",
+    "discount_option", "discount_percentage", "discount_scope",
+]
+COMPARISON_ROWS = [
+    ("Plan", "ariento_plan"),
+    ("Ariento Billing", "ariento_billing"),
+    ("M365 Term / Billing", None),
+    ("Discount", None),
+    ("Ariento Licenses", "new_ariento_cost"),
+    ("Microsoft Licenses", "microsoft_cost"),
+    ("Service Licenses", "service_cost"),
+    ("Onboarding", "onboarding_price"),
+    ("Discount Amount", "total_discount"),
+    ("Quote Total", "quote_total"),
+    ("Unmatched Lines", "unmatched_lines"),
+]
+MONEY_ROWS = ["Ariento Licenses", "Microsoft Licenses", "Service Licenses", "Onboarding", "Discount Amount", "Quote Total"]
+
+
+def scenario_names(variants):
+    return [variant.get("name") or f"Scenario {i + 1}" for i, variant in enumerate(variants)]
+
+
+def scenario_specs(base_spec, variants):
+    specs = []
+    for variant in variants:
+        spec = dict(base_spec)
+        spec.update({k: v for k, v in variant.items() if k in SCENARIO_FIELDS})
+        specs.append(spec)
+    return specs
+
+
+def compare_scenarios(base_spec, variants, tables):
+    specs = scenario_specs(base_spec, variants)
+    totals = price_quotes_batch(specs, tables)
+    columns = {}
+    for name, spec, (_, row) in zip(scenario_names(variants), specs, totals.iterrows()):
+        discount = spec.get("discount_option", "No Discount")
+        if discount == "Percentage Discount":
+            discount = f"{float(spec.get('discount_percentage', 10.0)):g}%"
+        values = []
+        for label, col in COMPARISON_ROWS:
+            if label == "M365 Term / Billing":
+                values.append(f"{row['m365_term']} / {row['m365_billing']}")
+            elif label == "Discount":
+                values.append(discount)
+            else:
+                values.append(row[col])
+        columns[name] = values
+    comparison = pd.DataFrame(columns, index=[label for label, _ in COMPARISON_ROWS])
+    comparison.index.name = "Scenario"
+    return comparison, specs
+
+
+def format_comparison(comparison):
+    formatted = comparison.astype(object).copy()
+    for label in MONEY_ROWS:
+        formatted.loc[label] = [f"${value:,.2f}" for value in comparison.loc[label]]
+    return formatted.fillna("-").astype(str)
+
+
+def price_scenarios(specs, variants, index):
+    # (name, full line items, what they were priced from) per scenario, for
+    # the combined PDF and its audit log records (see pricing.trace_quote)
+    return [(name, *trace_quote(spec, index)) for name, spec in zip(scenario_names(variants), specs)]
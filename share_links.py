@@ -0,0 +1,199 @@
+import zlib
+import base64
+import struct
+import binascii
+
+from pricing import BUSINESS_MODELS, PLAN_OPTIONS, BILLING_CYCLES, M365_TERMS, ONBOARDING_TYPES, DISCOUNT_OPTIONS, DISCOUNT_SCOPES, get_default_segment, resolve_plan
+
+# ----------------------------------------
+# Shareable Quote Links
+# A quote spec (see pricing.price_quote, plus an optional company_name) packed
+# into a short URL-safe token for a ?q= query parameter. Choices are stored
+# as their position in the option lists above, and line items as their
+# position in the price index's option lists (the plan's seat types, the
+# segment/term/billing M365 titles, the Meraki descriptions and the resale
+# items) instead of the full SkuTitle/Description strings. A CRC of the
+# item names travels with the IDs, so a link made against another catalog
+# version is turned away instead of restoring the wrong items.
+#   token = encode_quote(spec, price_index)
+#   spec = decode_quote(token, price_index)
+# Layout (little-endian, then raw deflate and unpadded URL-safe base64):
+#   header  version, business model, plan, Ariento billing, M365 term,
+#           M365 billing, onboarding type, discount option and scope (u8),
+#           onboarding price in cents (u64), discount percent x 100 (u32)
+#   company name length (u16) and UTF-8 bytes
+#   line counts for seats, M365, Meraki, resale (4 x u16)
+#   item IDs (u16 each), then quantities (u32 each), in the same order
+#   CRC32 of the item names (u32)
+# ----------------------------------------
+LINK_VERSION = 1
+LINK_PARAM = "q"
+LINE_KINDS = ["seats", "m365", "meraki", "resale"]
+# A 4 KB deflate window covers a large quote; zlib's default 32 KB window
+# costs more to set up than the whole encode
+WINDOW_BITS = -12
+
+_HEADER = struct.Struct("<9BQI")
+_COUNTS = struct.Struct("<4H")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+# id(option list) -> (option list, names, {name: position}); the list is kept
+# so its id is not reused while cached
+_POSITIONS = {}
+_POSITIONS_LIMIT = 256
+
+
+def _options(index, kind, spec):
+    # The option list a line kind's IDs index into
+    if kind == "seats":
+        return index["seat_options"].get(spec["plan"], [])
+    if kind == "m365":
+        segment = get_default_segment(spec["plan"]) if spec["plan"] else None
+        return index["m365_options"].get((segment, spec["m365_term"], spec["m365_billing"]), [])
+    # Dicts: their keys, in catalog order
+    return index[kind]
+
+
+def _positions(options):
+    entry = _POSITIONS.get(id(options))
+    if entry is None or entry[0] is not options:
+        if len(_POSITIONS) >= _POSITIONS_LIMIT:
+            _POSITIONS.clear()
+        names = list(options)
+        entry = (options, names, {name: i for i, name in enumerate(names)})
+        _POSITIONS[id(options)] = entry
+    return entry[1], entry[2]
+
+
+def _line_names(spec, kind):
+    if kind == "seats":
+        return [(sel["seat_type"], sel["quantity"]) for sel in spec.get("seats", [])]
+    if kind == "m365":
+        return [(sel["sku_title"], sel["quantity"]) for sel in spec.get("m365", [])]
+    if kind == "meraki":
+        return [(sel["description"], sel["quantity"]) for sel in spec.get("meraki", [])]
+    return [((sel["vendor"], sel["item"]), sel["quantity"]) for sel in spec.get("resale", [])]
+
+
+def _line_spec(kind, name, quantity):
+    if kind == "seats":
+        return {"seat_type": name, "quantity": quantity}
+    if kind == "m365":
+        return {"sku_title": name, "quantity": quantity}
+    if kind == "meraki":
+        return {"description": name, "quantity": quantity}
+    return {"vendor": name[0], "item": name[1], "quantity": quantity}
+
+
+def _names_crc(names):
+    return zlib.crc32("\x1f".join("\x1e".join(n) if isinstance(n, tuple) else str(n) for n in names).encode("utf-8"))
+
+
+def _choice(options, value, field):
+    try:
+        return options.index(value)
+    except ValueError:
+        raise ValueError(f"Cannot share a quote with {field} {value!r}")
+
+
+def encode_quote(spec, index):
+    business_model, plan = resolve_plan(spec)
+    choices = {
+        "plan": plan,
+        "ariento_billing": spec.get("ariento_billing", "Monthly"),
+        "m365_term": spec.get("m365_term", "Annual"),
+        "m365_billing": spec.get("m365_billing", "Annual"),
+    }
+    header = _HEADER.pack(
+        LINK_VERSION,
+        BUSINESS_MODELS.index(business_model),
+        PLAN_OPTIONS[business_model].index(plan),
+        _choice(BILLING_CYCLES, choices["ariento_billing"], "Ariento billing"),
+        _choice(M365_TERMS, choices["m365_term"], "M365 term"),
+        _choice(M365_TERMS, choices["m365_billing"], "M365 billing"),
+        _choice(ONBOARDING_TYPES, spec.get("onboarding_type", ONBOARDING_TYPES[0]), "onboarding type"),
+        _choice(DISCOUNT_OPTIONS, spec.get("discount_option", "No Discount"), "discount option"),
+        _choice(DISCOUNT_SCOPES, spec.get("discount_scope", DISCOUNT_SCOPES[0]), "discount scope"),
+        round(float(spec.get("onboarding_price", 3000.0)) * 100),
+        round(float(spec.get("discount_percentage", 10.0)) * 100),
+    )
+    company = (spec.get("company_name") or "").encode("utf-8")
+    counts, ids, quantities, names = [], [], [], []
+    for kind in LINE_KINDS:
+        lines = _line_names(spec, kind)
+        _, positions = _positions(_options(index, kind, choices))
+        for name, quantity in lines:
+            if name not in positions:
+                raise ValueError(f"Cannot share a quote with {name!r}: it is not in the catalog")
+            ids.append(positions[name])
+            quantities.append(int(quantity))
+            names.append(name)
+        counts.append(len(lines))
+    try:
+        payload = b"".join([
+            header, _U16.pack(len(company)), company, _COUNTS.pack(*counts),
+            struct.pack(f"<{len(ids)}H", *ids), struct.pack(f"<{len(quantities)}I", *quantities),
+            _U32.pack(_names_crc(names)),
+        ])
+    except struct.error:
+        raise ValueError("Cannot share a quote with a negative or very large quantity, or an overlong company name")
+    compressor = zlib.compressobj(9, zlib.DEFLATED, WINDOW_BITS)
+    packed = compressor.compress(payload) + compressor.flush()
+    return base64.urlsafe_b64encode(packed).rstrip(b"=").decode("ascii")
+
+
+def decode_quote(token, index):
+    # The quote spec in a token from encode_quote; ValueError for a malformed
+    # link or one made against a different catalog
+    try:
+        payload = zlib.decompress(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)), WINDOW_BITS)
+        (version, model, plan, ariento_billing, m365_term, m365_billing, onboarding_type, discount_option,
+         discount_scope, onboarding_cents, discount_hundredths) = _HEADER.unpack_from(payload)
+        if version != LINK_VERSION:
+            raise ValueError(f"Unsupported quote link version {version}")
+        offset = _HEADER.size
+        (company_length,) = _U16.unpack_from(payload, offset)
+        offset += _U16.size
+        company = payload[offset:offset + company_length].decode("utf-8")
+        offset += company_length
+        counts = _COUNTS.unpack_from(payload, offset)
+        offset += _COUNTS.size
+        n = sum(counts)
+        ids = struct.unpack_from(f"<{n}H", payload, offset)
+        offset += 2 * n
+        quantities = struct.unpack_from(f"<{n}I", payload, offset)
+        offset += 4 * n
+        (crc,) = _U32.unpack_from(payload, offset)
+        business_model = BUSINESS_MODELS[model]
+        spec = {
+            "company_name": company,
+            "business_model": business_model,
+            "plan": PLAN_OPTIONS[business_model][plan],
+            "ariento_billing": BILLING_CYCLES[ariento_billing],
+            "m365_term": M365_TERMS[m365_term],
+            "m365_billing": M365_TERMS[m365_billing],
+            "onboarding_type": ONBOARDING_TYPES[onboarding_type],
+            "onboarding_price": onboarding_cents / 100.0,
+            "discount_option": DISCOUNT_OPTIONS[discount_option],
+            "discount_percentage": discount_hundredths / 100.0,
+            "discount_scope": DISCOUNT_SCOPES[discount_scope],
+        }
+    except (binascii.Error, zlib.error, struct.error, UnicodeDecodeError, IndexError):
+        raise ValueError("This quote link is damaged or incomplete")
+
+    names = []
+    start = 0
+    for kind, count in zip(LINE_KINDS, counts):
+        options, _ = _positions(_options(index, kind, spec))
+        lines = []
+        for i in range(start, start + count):
+            if ids[i] >= len(options):
+                raise ValueError("This quote link was made with a different catalog version")
+            names.append(options[ids[i]])
+            lines.append(_line_spec(kind, options[ids[i]], quantities[i]))
+        spec[kind] = lines
+        start += count
+    if _names_crc(names) != crc:
+        raise ValueError("This quote link was made with a different catalog version")
+    return spec
@@ -0,0 +1,137 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from pricing import resolve_plan, get_default_segment, terms_inputs, choice_inputs, price_quote
+from pricing_rules import RULES
+from tiers import key_seat_costs
+
+# ----------------------------------------
+# Quantity Sweeps (price curves)
+# Prices one quote over a grid of quantities for some of its seat types or
+# M365 SKUs, e.g. "what does this look like at 25, 50, 100 and 500 seats?".
+# The lines that are not swept are priced once; every grid point then only
+# adds the cost of each axis quantity (volume tiers included), and the
+# onboarding, discount and totals rules run as one column pass over the grid.
+#   axes = [{"kind": "seats", "item": "Standard", "quantities": [25, 50, 100, 500]}]
+# ----------------------------------------
+SWEEP_KINDS = ["seats", "m365"]
+SWEEP_COLUMNS = [
+    "raw_ariento_cost", "new_ariento_cost", "microsoft_cost", "service_cost",
+    "onboarding_price", "total_discount", "quote_total",
+]
+MAX_SWEEP_POINTS = 1_000_000
+
+
+def parse_quantities(text):
+    # "25, 50, 100" or ranges "10-100" / "10-1000:10" (inclusive, step defaults to 1)
+    quantities = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                bounds, _, step = part.partition(":")
+                start, stop = (int(v) for v in bounds.split("-"))
+                step = int(step) if step else 1
+                if step <= 0 or stop < start:
+                    raise ValueError
+                quantities.extend(range(start, stop + 1, step))
+            else:
+                quantities.append(int(part))
+        except ValueError:
+            raise ValueError(f"Invalid quantity or range: {part!r}")
+    if not quantities or min(quantities) < 0:
+        raise ValueError("Enter one or more non-negative quantities, e.g. 25, 50, 100 or 10-500:10")
+    return quantities
+
+
+def axis_label(axis):
+    return f"{'Seats' if axis['kind'] == 'seats' else 'M365'}: {axis['item']}"
+
+
+def _unit_price(axis, plan, terms, index):
+    if axis["kind"] == "seats":
+        price = index["seats"].get((plan, axis["item"]))
+        if price is None:
+            raise ValueError(f"Seat type {axis['item']!r} is not available for {plan}")
+        return price
+    segment = get_default_segment(plan) if plan else None
+    row = index["m365"].get((segment, terms["m365_term"], terms["m365_billing"], axis["item"]))
+    if row is None:
+        raise ValueError(f"No M365 row for {axis['item']!r} with the selected Term/Billing combination")
+    return row["Price"]
+
+
+def sweep_quote(spec, axes, index):
+    business_model, plan = resolve_plan(spec)
+    if not axes:
+        raise ValueError("A sweep needs at least one quantity axis")
+    for axis in axes:
+        if axis["kind"] not in SWEEP_KINDS:
+            raise ValueError(f"Sweep kind must be one of: {', '.join(SWEEP_KINDS)}")
+        if axis["kind"] == "seats" and business_model == "Resale":
+            raise ValueError("Resale quotes have no Ariento seats to sweep")
+    values = terms_inputs(spec, business_model, plan)
+    values.update(RULES.evaluate("terms", values))
+
+    # Everything that is not swept is priced once, as a normal quote
+    swept = {(axis["kind"], axis["item"]) for axis in axes}
+    fixed_spec = dict(
+        spec,
+        seats=[s for s in spec.get("seats", []) if ("seats", s["seat_type"]) not in swept],
+        m365=[s for s in spec.get("m365", []) if ("m365", s["sku_title"]) not in swept],
+    )
+    fixed = price_quote(fixed_spec, index)["totals"]
+
+    grid = np.meshgrid(*[np.asarray(axis["quantities"], dtype=np.int64) for axis in axes], indexing="ij")
+    quantities = [g.ravel() for g in grid]
+    n = quantities[0].size
+    if n > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep grid has {n:,} points; the limit is {MAX_SWEEP_POINTS:,}")
+
+    ariento_base_cost = np.full(n, float(fixed["ariento_base_cost"]))
+    microsoft_cost = np.full(n, float(fixed["microsoft_cost"]))
+    for axis, qty in zip(axes, quantities):
+        price = _unit_price(axis, plan, values, index)
+        if axis["kind"] == "seats":
+            ariento_base_cost += key_seat_costs(index["seat_tiers"], plan, axis["item"], qty, price)
+        else:
+            microsoft_cost += qty * price
+
+    values.update({
+        "ariento_base_cost": ariento_base_cost,
+        "microsoft_cost": microsoft_cost,
+        "raw_meraki_cost": fixed["raw_meraki_cost"],
+        "raw_resale_cost": fixed["raw_resale_cost"],
+    })
+    values.update(choice_inputs(spec))
+    values.update(RULES.evaluate_columns("totals", values, n))
+
+    curve = pd.DataFrame({axis_label(axis): qty for axis, qty in zip(axes, quantities)})
+    for col in SWEEP_COLUMNS:
+        curve[col] = np.broadcast_to(values[col], n)
+    return curve
+
+
+def _chart_name(name):
+    # Vega-Lite reads ":" and "." in field names as type and nesting markers
+    return re.sub(r"[:.\[\]\\]", " ", str(name)).strip()
+
+
+def curve_chart_data(curve, axes, value="quote_total"):
+    # Wide frame for st.line_chart: the first axis along x, one line per
+    # combination of the other axes
+    labels = [axis_label(axis) for axis in axes]
+    if len(labels) == 1:
+        chart = curve.groupby(labels[0], sort=True)[[value]].first()
+    else:
+        legend = f"{labels[1]} = " + curve[labels[1]].astype(str)
+        for label in labels[2:]:
+            legend = legend + f", {label} = " + curve[label].astype(str)
+        chart = curve.assign(Line=legend).pivot_table(index=labels[0], columns="Line", values=value, aggfunc="first")
+    chart.index.name = _chart_name(chart.index.name)
+    chart.columns = [_chart_name(c) for c in chart.columns]
+    return chart
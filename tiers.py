@@ -0,0 +1,116 @@
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------
+# Volume Tiers
+# Optional "Ariento Volume Tiers" sheet in the Ariento Pricing workbook, one
+# row per tier:
+#   Plan | Seat Type | Min Quantity | Price | Tier Mode
+# A tier's Price applies from its Min Quantity up to the next tier's. The
+# first tier of each (Plan, Seat Type) starts at 1. Tier Mode is
+#   Graduated  each seat is priced at the tier it falls in (default)
+#   Volume     every seat is priced at the tier the total quantity reaches
+# Seat types without tiers keep the flat Price from "Ariento License Type".
+#
+# Tiers are compiled once per catalog into one sorted table with the
+# cumulative cost at the start of every tier, so any quantity is priced with
+# one binary search: bisect for a single quote, np.searchsorted for batches
+# and sweeps.
+# ----------------------------------------
+TIER_SHEET = "Ariento Volume Tiers"
+TIER_MODES = ["Graduated", "Volume"]
+TIER_COLUMNS = ["Plan", "Seat Type", "Min Quantity", "Price", "Tier Mode"]
+# Encoded search keys are (key id << 32) | quantity
+_QUANTITY_BITS = 32
+_MAX_QUANTITY = (1 << _QUANTITY_BITS) - 1
+
+
+def compile_tiers(seat_tiers=None):
+    # seat_tiers is the validated tier table (see catalog.validate_catalog)
+    if seat_tiers is None or seat_tiers.empty:
+        seat_tiers = pd.DataFrame(columns=TIER_COLUMNS)
+    df = seat_tiers.sort_values(["Plan", "Seat Type", "Min Quantity"], kind="stable")
+    plans = df["Plan"].to_numpy()
+    seats = df["Seat Type"].to_numpy()
+    starts = df["Min Quantity"].to_numpy(dtype=np.int64)
+    prices = df["Price"].to_numpy(dtype=float)
+    first = np.ones(len(df), dtype=bool)
+    first[1:] = (plans[1:] != plans[:-1]) | (seats[1:] != seats[:-1])
+    key_ids = np.cumsum(first) - 1
+    keys = list(zip(plans[first], seats[first]))
+    graduated = df["Tier Mode"].to_numpy()[first] != "Volume"
+
+    # Cost of all seats below each tier's start, restarting at every key
+    step = np.zeros(len(df))
+    step[1:] = (starts[1:] - starts[:-1]) * prices[:-1]
+    step[first] = 0.0
+    cumulative = np.cumsum(step)
+    group_start = np.maximum.accumulate(np.where(first, np.arange(len(df)), 0))
+    cumulative = cumulative - cumulative[group_start]
+
+    # Per key Python lists for single-quote lookups
+    by_key = {}
+    bounds = np.append(np.flatnonzero(first), len(df))
+    for key_id, key in enumerate(keys):
+        lo, hi = bounds[key_id], bounds[key_id + 1]
+        by_key[key] = (
+            starts[lo:hi].tolist(), prices[lo:hi].tolist(), cumulative[lo:hi].tolist(), bool(graduated[key_id])
+        )
+
+    return {
+        "keys": pd.MultiIndex.from_tuples(keys, names=["Plan", "Seat Type"]) if keys else None,
+        "by_key": by_key,
+        "encoded": (key_ids << _QUANTITY_BITS) | starts,
+        "starts": starts,
+        "prices": prices,
+        "cumulative": cumulative,
+        "graduated": graduated,
+    }
+
+
+def seat_cost(tiers, plan, seat, quantity, flat_price):
+    # Monthly cost of `quantity` seats of one type
+    entry = tiers["by_key"].get((plan, seat))
+    if entry is None or quantity <= 0:
+        return quantity * flat_price
+    starts, prices, cumulative, graduated = entry
+    i = bisect_right(starts, quantity) - 1
+    if graduated:
+        return cumulative[i] + (quantity - starts[i] + 1) * prices[i]
+    return quantity * prices[i]
+
+
+def _key_costs(tiers, key_ids, quantities):
+    q = np.minimum(quantities, _MAX_QUANTITY)
+    pos = np.searchsorted(tiers["encoded"], (key_ids << _QUANTITY_BITS) | q, side="right") - 1
+    graduated = tiers["graduated"][key_ids]
+    return np.where(
+        graduated,
+        tiers["cumulative"][pos] + (q - tiers["starts"][pos] + 1) * tiers["prices"][pos],
+        q * tiers["prices"][pos],
+    )
+
+
+def seat_costs(tiers, plans, seats, quantities, flat_costs):
+    # Vectorized seat_cost: flat_costs (quantity * flat price) is kept for
+    # lines whose seat type has no tiers
+    flat_costs = np.asarray(flat_costs, dtype=float)
+    if tiers["keys"] is None or len(flat_costs) == 0:
+        return flat_costs
+    quantities = np.asarray(quantities, dtype=np.int64)
+    key_ids = tiers["keys"].get_indexer(pd.MultiIndex.from_arrays([np.asarray(plans), np.asarray(seats)]))
+    tiered = (key_ids >= 0) & (quantities > 0)
+    costs = flat_costs.copy()
+    costs[tiered] = _key_costs(tiers, key_ids[tiered], quantities[tiered])
+    return costs
+
+
+def key_seat_costs(tiers, plan, seat, quantities, flat_price):
+    # seat_costs for many quantities of one seat type, e.g. a quantity sweep
+    quantities = np.asarray(quantities, dtype=np.int64)
+    if (plan, seat) not in tiers["by_key"]:
+        return quantities * flat_price
+    key_ids = np.full(len(quantities), tiers["keys"].get_loc((plan, seat)), dtype=np.int64)
+    return np.where(quantities > 0, _key_costs(tiers, key_ids, quantities), 0.0)